@@ -10,6 +10,7 @@ from alembic import context
 import os
 import sys
 sys.path.append(os.getcwd())
+from pata.config import DATABASES, set_pragmas  # noqa
 from pata.models.units import BASE as units_base  # noqa
 
 USE_TWOPHASE = False
@@ -108,6 +109,7 @@ def run_migrations_online():
             prefix="sqlalchemy.",
             poolclass=pool.NullPool,
         )
+        set_pragmas(rec["engine"], DATABASES.get(name, {}).get("pragmas"))
 
     for name, rec in engines.items():
         engine = rec["engine"]
@@ -0,0 +1,130 @@
+"""add fingerprint columns
+
+Revision ID: 3c1d9a4e7b52
+Revises: fee7030659ca
+Create Date: 2026-10-17 09:12:31.114273+00:00
+
+"""
+import json
+
+from hashlib import sha256
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d9a4e7b52'
+down_revision = 'fee7030659ca'
+branch_labels = None
+depends_on = None
+
+
+# Columns fingerprinted at this revision (the models may change later).
+units = sa.table(
+    'units',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('wiki_path', sa.String),
+    sa.column('image_url', sa.String),
+    sa.column('panel_url', sa.String),
+    sa.column('fingerprint', sa.String),
+    )
+
+unit_versions = sa.table(
+    'unit_versions',
+    sa.column('id', sa.Integer),
+    sa.column('gold', sa.Integer),
+    sa.column('green', sa.Integer),
+    sa.column('blue', sa.Integer),
+    sa.column('red', sa.Integer),
+    sa.column('energy', sa.Integer),
+    sa.column('attack', sa.Integer),
+    sa.column('health', sa.Integer),
+    sa.column('supply', sa.Integer),
+    sa.column('unit_spell', sa.String),
+    sa.column('frontline', sa.Boolean),
+    sa.column('fragile', sa.Boolean),
+    sa.column('blocker', sa.Boolean),
+    sa.column('prompt', sa.Boolean),
+    sa.column('stamina', sa.Integer),
+    sa.column('lifespan', sa.Integer),
+    sa.column('build_time', sa.Integer),
+    sa.column('exhaust_turn', sa.Integer),
+    sa.column('exhaust_ability', sa.Integer),
+    sa.column('position', sa.String),
+    sa.column('abilities', sa.String),
+    sa.column('fingerprint', sa.String),
+    )
+
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def get_fingerprint(values):
+    """ Same as pata.models.utils.get_fingerprint at this revision. """
+    return sha256(
+        json.dumps(values, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+
+def backfill_fingerprints(table):
+    """ Calculate fingerprint for all existing rows of table. """
+    columns = tuple(
+        column.name for column in table.columns
+        if column.name not in ('id', 'fingerprint'))
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select([table.c.id] + [table.c[column] for column in columns]))
+    values = [
+        {
+            "row_id": row.id,
+            "row_fingerprint": get_fingerprint(
+                {column: row[column] for column in columns}),
+            }
+        for row in rows
+        ]
+    if values:
+        connection.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam("row_id"))
+            .values(fingerprint=sa.bindparam("row_fingerprint")),
+            values)
+
+
+def upgrade_sqlite():
+    op.add_column(
+        'units',
+        sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    op.add_column(
+        'unit_versions',
+        sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    backfill_fingerprints(units)
+    backfill_fingerprints(unit_versions)
+
+
+def downgrade_sqlite():
+    # The view depends on both tables, which are recreated by batch mode.
+    op.execute("DROP VIEW latest_unit_version")
+    with op.batch_alter_table('unit_versions') as batch_op:
+        batch_op.drop_column('fingerprint')
+    with op.batch_alter_table('units') as batch_op:
+        batch_op.drop_column('fingerprint')
+    op.execute(
+        """
+        CREATE VIEW latest_unit_version AS
+        SELECT *
+        FROM units u, unit_versions uv
+        WHERE u.id = uv.unit_id
+        AND uv.id = (
+            SELECT max(uv1.id)
+            FROM unit_versions uv1
+            WHERE uv1.unit_id = u.id
+            )
+        """
+        )
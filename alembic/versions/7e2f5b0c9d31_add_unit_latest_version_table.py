@@ -0,0 +1,80 @@
+"""add unit latest version table
+
+Revision ID: 7e2f5b0c9d31
+Revises: 3c1d9a4e7b52
+Create Date: 2026-10-17 11:40:02.318532+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2f5b0c9d31'
+down_revision = '3c1d9a4e7b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_sqlite():
+    op.create_table(
+        'unit_latest_version',
+        sa.Column('created_by', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('modified_by', sa.String(length=64), nullable=False),
+        sa.Column('modified_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('unit_id', sa.Integer(), nullable=False),
+        sa.Column('version_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['unit_id'], ['units.id'], ),
+        sa.ForeignKeyConstraint(['version_id'], ['unit_versions.id'], ),
+        sa.PrimaryKeyConstraint('unit_id')
+        )
+    op.execute(
+        """
+        INSERT INTO unit_latest_version (
+            created_by, created_at, modified_by, modified_at,
+            unit_id, version_id
+            )
+        SELECT
+            'python', CURRENT_TIMESTAMP, 'python', CURRENT_TIMESTAMP,
+            unit_id, max(id)
+        FROM unit_versions
+        GROUP BY unit_id
+        """
+        )
+    op.execute("DROP VIEW latest_unit_version")
+    op.execute(
+        """
+        CREATE VIEW latest_unit_version AS
+        SELECT u.*, uv.*
+        FROM unit_latest_version ulv
+        JOIN units u ON u.id = ulv.unit_id
+        JOIN unit_versions uv ON uv.id = ulv.version_id
+        """
+        )
+
+
+def downgrade_sqlite():
+    op.execute("DROP VIEW latest_unit_version")
+    op.execute(
+        """
+        CREATE VIEW latest_unit_version AS
+        SELECT *
+        FROM units u, unit_versions uv
+        WHERE u.id = uv.unit_id
+        AND uv.id = (
+            SELECT max(uv1.id)
+            FROM unit_versions uv1
+            WHERE uv1.unit_id = u.id
+            )
+        """
+        )
+    op.drop_table('unit_latest_version')
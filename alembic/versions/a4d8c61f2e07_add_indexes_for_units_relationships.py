@@ -0,0 +1,35 @@
+"""add indexes for units relationships
+
+Revision ID: a4d8c61f2e07
+Revises: 7e2f5b0c9d31
+Create Date: 2026-10-17 13:05:47.902116+00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8c61f2e07'
+down_revision = '7e2f5b0c9d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def upgrade_sqlite():
+    op.create_index(
+        'ix_unit_versions_unit_id_id', 'unit_versions', ['unit_id', 'id'])
+    op.create_index(
+        'ix_unit_changes_unit_id_day', 'unit_changes', ['unit_id', 'day'])
+
+
+def downgrade_sqlite():
+    op.drop_index('ix_unit_changes_unit_id_day', table_name='unit_changes')
+    op.drop_index('ix_unit_versions_unit_id_id', table_name='unit_versions')
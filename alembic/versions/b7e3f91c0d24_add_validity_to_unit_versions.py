@@ -0,0 +1,115 @@
+"""add validity to unit versions
+
+Revision ID: b7e3f91c0d24
+Revises: a4d8c61f2e07
+Create Date: 2026-10-17 15:26:08.431907+00:00
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3f91c0d24'
+down_revision = 'a4d8c61f2e07'
+branch_labels = None
+depends_on = None
+
+
+unit_versions = sa.table(
+    'unit_versions',
+    sa.column('id', sa.Integer),
+    sa.column('unit_id', sa.Integer),
+    sa.column('created_at', sa.TIMESTAMP),
+    sa.column('valid_from', sa.Date),
+    sa.column('valid_to', sa.Date),
+    )
+
+unit_changes = sa.table(
+    'unit_changes',
+    sa.column('unit_id', sa.Integer),
+    sa.column('day', sa.Date),
+    )
+
+
+def upgrade(engine_name):
+    globals()["upgrade_%s" % engine_name]()
+
+
+def downgrade(engine_name):
+    globals()["downgrade_%s" % engine_name]()
+
+
+def backfill_validity():
+    """
+    Versions are valid since the latest change of their unit when they
+    were created (or their creation day), until the next version is.
+    """
+    connection = op.get_bind()
+    days = defaultdict(list)
+    for unit_id, day in connection.execute(
+            sa.select([unit_changes.c.unit_id, unit_changes.c.day])
+            .order_by(unit_changes.c.unit_id, unit_changes.c.day)):
+        days[unit_id].append(day)
+
+    values = []
+    previous = {}
+    for row in connection.execute(
+            sa.select([
+                unit_versions.c.id, unit_versions.c.unit_id,
+                unit_versions.c.created_at])
+            .order_by(unit_versions.c.unit_id, unit_versions.c.id)):
+        created = row.created_at.date()
+        valid_from = max(
+            (day for day in days[row.unit_id] if day <= created),
+            default=created)
+        last = previous.get(row.unit_id)
+        if last is not None:
+            valid_from = max(valid_from, last["row_valid_from"])
+            last["row_valid_to"] = valid_from
+        previous[row.unit_id] = {
+            "row_id": row.id,
+            "row_valid_from": valid_from,
+            "row_valid_to": None,
+            }
+        values.append(previous[row.unit_id])
+    if values:
+        connection.execute(
+            unit_versions.update()
+            .where(unit_versions.c.id == sa.bindparam("row_id"))
+            .values(
+                valid_from=sa.bindparam("row_valid_from"),
+                valid_to=sa.bindparam("row_valid_to")),
+            values)
+
+
+def upgrade_sqlite():
+    op.add_column(
+        'unit_versions', sa.Column('valid_from', sa.Date(), nullable=True))
+    op.add_column(
+        'unit_versions', sa.Column('valid_to', sa.Date(), nullable=True))
+    backfill_validity()
+    op.create_index(
+        'ix_unit_versions_unit_id_valid_from', 'unit_versions',
+        ['unit_id', 'valid_from'])
+
+
+def downgrade_sqlite():
+    op.drop_index(
+        'ix_unit_versions_unit_id_valid_from', table_name='unit_versions')
+    # The view depends on the table, which is recreated by batch mode.
+    op.execute("DROP VIEW latest_unit_version")
+    with op.batch_alter_table('unit_versions') as batch_op:
+        batch_op.drop_column('valid_to')
+        batch_op.drop_column('valid_from')
+    op.execute(
+        """
+        CREATE VIEW latest_unit_version AS
+        SELECT u.*, uv.*
+        FROM unit_latest_version ulv
+        JOIN units u ON u.id = ulv.unit_id
+        JOIN unit_versions uv ON uv.id = ulv.version_id
+        """
+        )
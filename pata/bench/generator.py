@@ -0,0 +1,361 @@
+"""
+Synthetic unit dumps generator.
+
+Creates dumps with the same structure as the wiki ones (see
+alembic/fixtures/units.json) for any amount of units. The same count and
+seed always give the same units, so a dump with modified units can be
+compared with (or migrated after) the one without modifications.
+
+Usage:
+
+    python -m pata.bench.generator -n COUNT [-l HISTORY_LENGTH]
+        [-m MODIFIED] [-s SEED] OUTPUT
+
+Two consecutive dumps of 1000 units (10% of them modified in the second):
+
+    python -m pata.bench.generator -n 1000 units-1.json
+    python -m pata.bench.generator -n 1000 -m 10 units-2.json
+
+"""
+import json
+import sys
+
+from argparse import (
+    ArgumentParser,
+    Namespace,
+    )
+from datetime import (
+    date,
+    timedelta,
+    )
+from random import Random
+from typing import (
+    Any,
+    Dict,
+    List,
+    )
+
+
+# Day of the first change of every unit.
+FIRST_DAY = date(2014, 10, 4)
+
+NAME_PREFIXES = (
+    "Arka", "Bore", "Cryo", "Drone", "Endo", "Feral", "Gauss", "Hive",
+    "Iso", "Lumi", "Mega", "Nivo", "Omni", "Plasma", "Rhino", "Tarsier",
+    )
+NAME_SUFFIXES = (
+    "Blade", "Cannon", "Engine", "Forge", "Guard", "Lancer", "Matrix",
+    "Pod", "Reactor", "Sentry", "Shell", "Thorax", "Wall", "Wisp",
+    )
+POSITIONS = (
+    "Top", "Middle", "Middle Right", "Middle Far Right", "Bottom",
+    )
+ABILITIES = (
+    "",
+    "Gain 1 gold.",
+    "Gain 1 energy.",
+    "Deal 2 damage to a random enemy unit.",
+    "At the start of your turn, gain 1 attack.",
+    "At the start of your turn, destroy a random enemy unit with {0} "
+    "or less health.",
+    "Construct {0} Drones.",
+    "Sacrifice this unit: gain {0} attack.",
+    )
+HISTORY_CHANGES = (
+    "Cost increased from {0} to {1}.",
+    "Cost decreased from {1} to {0}.",
+    "Health increased from {0} to {1}.",
+    "Attack decreased from {1} to {0}.",
+    "Supply decreased from {1} to {0}.",
+    "Buildtime increased from {0} to {1} turns.",
+    )
+
+
+def generate_history(
+        rng: Random, history_length: int) -> Dict[str, List[str]]:
+    """
+    Generate the change history of a unit.
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random numbers generator.
+    history_length : int
+        Amount of days with changes (the first one adds the unit).
+
+    Returns
+    -------
+    dict
+
+    Example
+    -------
+    output:
+        {
+            "2014-10-04": ["Added."],
+            "2014-11-01": ["Cost increased from 15 to 17."],
+        }
+
+    """
+    result: Dict[str, List[str]] = {}
+    day = FIRST_DAY
+    for index in range(history_length):
+        if index:
+            day += timedelta(days=rng.randint(7, 60))
+            low = rng.randint(1, 15)
+            high = low + rng.randint(1, 3)
+            result[day.isoformat()] = [
+                rng.choice(HISTORY_CHANGES).format(low, high)
+                for _ in range(rng.randint(1, 3))
+                ]
+        else:
+            result[day.isoformat()] = ["Added."]
+    return result
+
+
+def generate_unit(
+        index: int, rng: Random, history_length: int = 3) -> Dict[str, Any]:
+    """
+    Generate the data of a unit.
+
+    Parameters
+    ----------
+    index : int
+        Position of the unit in the dump (makes the name unique).
+    rng : random.Random
+        Random numbers generator.
+    history_length : int, optional
+        Amount of days in the change history. Defaults to 3.
+
+    Returns
+    -------
+    dict
+        Same structure as the units in the wiki dumps.
+
+    """
+    name = (
+        f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)} {index}")
+    spell = rng.random() < 0.1
+    return {
+        "name": name,
+        "type": rng.randint(1, 9),
+        "unit_spell": "Spell" if spell else "Unit",
+        "position": rng.choice(POSITIONS),
+        "abilities": rng.choice(ABILITIES).format(rng.randint(1, 8)),
+        "attributes": {
+            "blocker": not spell and rng.random() < 0.4,
+            "build_time": rng.choice((0, 1, 1, 1, 2, 3)),
+            "exhaust_ability": rng.choice((0, 0, 1)),
+            "exhaust_turn": rng.choice((0, 0, 0, 1, 2)),
+            "fragile": rng.random() < 0.2,
+            "frontline": rng.random() < 0.1,
+            "lifespan": rng.choice((0, 0, 0, 1, 2)),
+            "prompt": rng.random() < 0.1,
+            "stamina": rng.choice((0, 0, 0, 1, 2)),
+            "supply": rng.choice((1, 2, 4, 10, 20)),
+            },
+        "change_history": generate_history(rng, history_length),
+        "costs": {
+            "blue": rng.choice((0, 0, 1, 2)),
+            "energy": rng.choice((0, 0, 1, 3)),
+            "gold": rng.randint(1, 20),
+            "green": rng.choice((0, 0, 1, 2)),
+            "red": rng.choice((0, 0, 1, 2)),
+            },
+        "links": {
+            "image": rng.choice((None, f"/images/{index}.png")),
+            "panel": rng.choice((None, f"/panels/{index}.png")),
+            "path": f"/{name.replace(' ', '_')}",
+            },
+        "stats": {
+            "attack": rng.randint(0, 8),
+            "health": rng.randint(1, 30),
+            },
+        }
+
+
+def modify_unit(data: Dict[str, Any], rng: Random) -> Dict[str, Any]:
+    """
+    Modify a unit like a new patch would.
+
+    Stats or costs are changed (new version) and the change is added to the
+    history (new change). Sometimes links are changed too.
+
+    Parameters
+    ----------
+    data : dict
+        Unit data (see generate_unit), left untouched.
+    rng : random.Random
+        Random numbers generator.
+
+    Returns
+    -------
+    dict
+        Modified copy of the unit.
+
+    """
+    result = {
+        key: dict(value) if isinstance(value, dict) else value
+        for key, value in data.items()
+        }
+    group, field = rng.choice((
+        ("stats", "attack"), ("stats", "health"), ("costs", "gold"),
+        ("attributes", "supply"), ("attributes", "build_time"),
+        ))
+    old_value = result[group][field]
+    new_value = old_value + rng.choice((-1, 1, 2)) if old_value else 1
+    result[group][field] = new_value
+
+    last_day = max(result["change_history"], default=FIRST_DAY.isoformat())
+    day = date.fromisoformat(last_day) + timedelta(days=rng.randint(1, 30))
+    result["change_history"][day.isoformat()] = [
+        f"{field.capitalize()} changed from {old_value} to {new_value}."]
+
+    if rng.random() < 0.2:
+        result["links"]["image"] = f"/images/{data['name']}-{day}.png"
+    return result
+
+
+def generate_units(
+        count: int, history_length: int = 3, modified: float = 0.0,
+        seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Generate a dump of units.
+
+    Parameters
+    ----------
+    count : int
+        Amount of units.
+    history_length : int, optional
+        Amount of days in the change history of every unit. Defaults to 3.
+    modified : float, optional
+        Percentage of units modified (see modify_unit). Defaults to 0.
+    seed : int, optional
+        Seed of the random numbers. Defaults to 0.
+
+    Returns
+    -------
+    dict
+        Units data by unit name.
+
+    """
+    rng = Random(seed)
+    result = {}
+    for index in range(count):
+        data = generate_unit(index, rng, history_length)
+        result[data["name"]] = data
+    return modify_units(result, modified, seed)
+
+
+def modify_units(
+        units: Dict[str, Dict[str, Any]], modified: float,
+        seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Modify a percentage of the units of a dump.
+
+    Parameters
+    ----------
+    units : dict
+        Units data by unit name (see generate_units), left untouched.
+    modified : float
+        Percentage of units modified (see modify_unit).
+    seed : int, optional
+        Seed of the random numbers. Defaults to 0.
+
+    Returns
+    -------
+    dict
+        Units data by unit name (same order).
+
+    """
+    amount = round(len(units) * min(max(modified, 0.0), 100.0) / 100)
+    if not amount:
+        return units
+    rng = Random(f"modify-{seed}")
+    names = set(rng.sample(list(units), amount))
+    return {
+        name: modify_unit(data, rng) if name in names else data
+        for name, data in units.items()
+        }
+
+
+def write_dump(path: str, units: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Write units to a JSON dump (see pata.migrate_units.load_version).
+
+    Parameters
+    ----------
+    path : str
+        Path to the dump.
+    units : dict
+        Units data by unit name.
+
+    """
+    with open(path, "w", encoding="utf-8") as dump_file:
+        json.dump(units, dump_file, indent=1)
+
+
+def add_arguments(parser_obj: ArgumentParser, modified: float) -> None:
+    """
+    Add the options of generated units (shared with pata.bench.runner).
+
+    Parameters
+    ----------
+    parser_obj : ArgumentParser
+        Parser to add the options to.
+    modified : float
+        Default percentage of modified units.
+
+    """
+    parser_obj.add_argument(
+        "-l", "--history-length",
+        type=int, default=3,
+        help="Days in the change history of every unit.")
+    parser_obj.add_argument(
+        "-m", "--modified",
+        type=float, default=modified,
+        help="Percentage of modified units.")
+    parser_obj.add_argument(
+        "-s", "--seed",
+        type=int, default=0,
+        help="Seed of the random numbers.")
+
+
+def create_parser(args: List[str]) -> Namespace:
+    """
+    Create parser for the generator options.
+
+    Parameters
+    ----------
+    args : list(str)
+        List of commands to parse.
+
+    Returns
+    -------
+    ArgumentParser
+
+    """
+    parser_obj = ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser_obj.add_argument(
+        "-n", "--count",
+        type=int, default=1000,
+        help="Amount of units.")
+    add_arguments(parser_obj, modified=0.0)
+    parser_obj.add_argument(
+        "output",
+        help="Path to the dump.")
+    return parser_obj.parse_args(args)
+
+
+def main(args: List[str]) -> None:
+    """ Generate dump and write it to the output. """
+    options = create_parser(args)
+    write_dump(
+        options.output,
+        generate_units(
+            options.count, options.history_length, options.modified,
+            options.seed))
+
+
+# Executed when ran from the command line.
+if __name__ == "__main__":
+    main(sys.argv[1:])
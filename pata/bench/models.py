@@ -0,0 +1,149 @@
+"""
+Micro-benchmark for CommonMixin.diff/copy.
+
+Compares the current implementation (cached columns and tuple based
+comparisons) with the previous one (columns filtered from the table
+metadata and compared one getattr at a time on every call).
+
+Usage:
+
+    python -m pata.bench.models [-n NUMBER] [-r REPEAT]
+
+"""
+import sys
+
+from argparse import (
+    ArgumentParser,
+    Namespace,
+    )
+from timeit import repeat
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    )
+
+from pata.models.units import UnitVersions
+
+
+def legacy_get_columns(obj: Any) -> Iterator[str]:
+    """ CommonMixin.get_columns before columns were cached. """
+    return (
+        column.name
+        for column in obj.metadata.tables[obj.__tablename__].columns
+        if column.name not in obj.reserved_fields
+        )
+
+
+def legacy_diff(obj: Any, target: Any) -> Dict[str, Dict[str, Any]]:
+    """ CommonMixin.diff before columns were cached. """
+    result = {}
+    for column in legacy_get_columns(obj):
+        old_value = getattr(obj, column)
+        new_value = getattr(target, column)
+        if old_value != new_value:
+            result[column] = {"old": old_value, "new": new_value}
+    return result
+
+
+def legacy_copy(obj: Any) -> Any:
+    """ CommonMixin.copy before columns were cached. """
+    new_obj = type(obj)()
+    for column in legacy_get_columns(obj):
+        setattr(new_obj, column, getattr(obj, column))
+    return new_obj
+
+
+def create_version(**values: Any) -> UnitVersions:
+    """ Create a UnitVersions object with all columns set. """
+    data = {
+        "gold": 5, "green": 0, "blue": 1, "red": 0, "energy": 0,
+        "attack": 1, "health": 2, "supply": 20, "unit_spell": "Unit",
+        "frontline": False, "fragile": False, "blocker": True,
+        "prompt": False, "stamina": 0, "lifespan": 0, "build_time": 1,
+        "exhaust_turn": 0, "exhaust_ability": 0, "position": "Middle",
+        "abilities": "ability X",
+        }
+    data.update(values)
+    return UnitVersions(**data)
+
+
+def create_parser(args: List[str]) -> Namespace:
+    """
+    Create parser for the benchmark options.
+
+    Parameters
+    ----------
+    args : list(str)
+        List of commands to parse.
+
+    Returns
+    -------
+    ArgumentParser
+
+    """
+    parser_obj = ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser_obj.add_argument(
+        "-n", "--number",
+        type=int, default=10000,
+        help="Calls per measurement.")
+    parser_obj.add_argument(
+        "-r", "--repeat",
+        type=int, default=5,
+        help="Measurements per case (best one is reported).")
+    return parser_obj.parse_args(args)
+
+
+def run(number: int = 10000, repeat_count: int = 5) -> Dict[str, float]:
+    """
+    Time diff (with and without changes) and copy for both implementations.
+
+    Parameters
+    ----------
+    number : int, optional
+        Calls per measurement.
+    repeat_count : int, optional
+        Measurements per case (best one is used).
+
+    Returns
+    -------
+    dict
+        Microseconds per call by case name.
+
+    """
+    base = create_version()
+    same = create_version()
+    changed = create_version(attack=2, abilities="ability Y")
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "diff_nochange_legacy": lambda: legacy_diff(base, same),
+        "diff_nochange": lambda: base.diff(same),
+        "diff_change_legacy": lambda: legacy_diff(base, changed),
+        "diff_change": lambda: base.diff(changed),
+        "copy_legacy": lambda: legacy_copy(base),
+        "copy": base.copy,
+        }
+    return {
+        name: min(repeat(case, number=number, repeat=repeat_count))
+        / number * 1e6
+        for name, case in cases.items()
+        }
+
+
+def main(args: List[str]) -> None:
+    """ Execute benchmark and print results. """
+    options = create_parser(args)
+    result = run(options.number, options.repeat)
+    for name in ("diff_nochange", "diff_change", "copy"):
+        legacy = result[f"{name}_legacy"]
+        current = result[name]
+        print(
+            f"{name:15} legacy {legacy:8.2f}us  current {current:8.2f}us  "
+            f"speedup {legacy / current:5.2f}x")
+
+
+# Executed when ran from the command line.
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,370 @@
+"""
+Benchmark of the units migration pipeline.
+
+Times every stage of pata.migrate_units (parsing, loading into models,
+diffs, applying changes and whole runs against a temporary SQLite database)
+with synthetic dumps (see pata.bench.generator) of increasing sizes.
+
+Usage:
+
+    python -m pata.bench.runner [-n COUNT [COUNT ...]] [-l HISTORY_LENGTH]
+        [-m MODIFIED] [-s SEED] [-b BATCH_SIZE] [-o OUTPUT]
+        [-c PREVIOUS_OUTPUT]
+
+Results are written as JSON (-o) and can be compared with previous ones
+(-c), e.g. before and after an optimization:
+
+    python -m pata.bench.runner -n 1000 10000 -o before.json
+    python -m pata.bench.runner -n 1000 10000 -o after.json -c before.json
+
+"""
+import json
+import logging
+import os
+import platform
+import sys
+
+from argparse import (
+    ArgumentParser,
+    Namespace,
+    )
+from datetime import (
+    datetime,
+    timezone,
+    )
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    )
+
+import sqlalchemy
+
+from pata.bench.generator import (
+    add_arguments,
+    generate_units,
+    modify_units,
+    write_dump,
+    )
+from pata.config import (
+    BASE,
+    DATABASES,
+    )
+from pata.migrate_units import (
+    load_to_models,
+    load_to_values,
+    load_version,
+    Migrator,
+    models_diff,
+    process_transaction,
+    )
+from pata.models.units import Units
+
+
+# Amounts of units benchmarked by default.
+SIZES = (1000, 10000, 100000, 1000000)
+
+# Stages in the order they are timed.
+STAGES = (
+    "load_version",
+    "load_to_models",
+    "models_diff",
+    "process_transaction",
+    "run_insert",
+    "run_update",
+    "run_nochange",
+    )
+
+# Name of the (temporary) database configuration, see create_migrator.
+DATABASE = "bench"
+
+
+def timed(function: Callable[[], Any]) -> float:
+    """ Seconds taken by a call to function. """
+    start = perf_counter()
+    function()
+    return perf_counter() - start
+
+
+def create_migrator(path: str) -> Migrator:
+    """
+    Create a migrator for a new SQLite database (with all the tables).
+
+    Same configuration as the default database, but stored in path.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file.
+
+    Returns
+    -------
+    pata.migrate_units.Migrator
+
+    """
+    DATABASES[DATABASE] = dict(DATABASES["sqlite"], database=path)
+    migrator = Migrator(DATABASE)
+    BASE.metadata.create_all(migrator.engine)
+    return migrator
+
+
+def bench_size(  # pylint: disable=too-many-arguments
+        directory: str, count: int, history_length: int = 3,
+        modified: float = 10.0, seed: int = 0,
+        batch_size: Optional[int] = None) -> Dict[str, float]:
+    """
+    Time every stage (see STAGES) for an amount of units.
+
+    The dump is parsed and loaded into models, which are then compared
+    with (models_diff) and updated from (process_transaction, without
+    database) a second dump with modified units. Finally, the first dump
+    is inserted into an empty database (run_insert), the second one is
+    applied (run_update) and applied again without changes (run_nochange).
+
+    Parameters
+    ----------
+    directory : str
+        Directory for the dumps and the database.
+    count : int
+        Amount of units.
+    history_length : int, optional
+        Days in the change history of every unit. Defaults to 3.
+    modified : float, optional
+        Percentage of units modified in the second dump. Defaults to 10.
+    seed : int, optional
+        Seed of the random numbers. Defaults to 0.
+    batch_size : int, optional
+        Units per transaction in runs. Defaults to None (single transaction).
+
+    Returns
+    -------
+    dict
+        Seconds by stage.
+
+    """
+    base = generate_units(count, history_length, seed=seed)
+    changed = modify_units(base, modified, seed)
+    base_path = os.path.join(directory, f"units-{count}.json")
+    write_dump(base_path, base)
+
+    result = {"load_version": timed(lambda: load_version(base_path))}
+
+    models: Dict[str, Units] = {}
+    result["load_to_models"] = timed(lambda: models.update(
+        (name, load_to_models(data)) for name, data in base.items()))
+
+    values = {name: load_to_values(data) for name, data in changed.items()}
+    result["models_diff"] = timed(lambda: [
+        models_diff(models[name], value) for name, value in values.items()])
+
+    migrator = create_migrator(os.path.join(directory, f"units-{count}.db"))
+    try:
+        session = migrator.session_class()
+        result["process_transaction"] = timed(lambda: [
+            process_transaction(
+                session, value, insert=True, update=True,
+                existing_units=models, new_units=[])
+            for value in values.values()])
+        session.close()
+
+        result["run_insert"] = timed(lambda: migrator.run(
+            base, insert=True, update=True, batch_size=batch_size))
+        result["run_update"] = timed(lambda: migrator.run(
+            changed, insert=True, update=True, batch_size=batch_size))
+        result["run_nochange"] = timed(lambda: migrator.run(
+            changed, batch_size=batch_size))
+    finally:
+        migrator.close()
+        DATABASES.pop(DATABASE, None)
+    return result
+
+
+def run(  # pylint: disable=too-many-arguments
+        sizes: Sequence[int] = SIZES, history_length: int = 3,
+        modified: float = 10.0, seed: int = 0,
+        batch_size: Optional[int] = None,
+        report: Optional[Callable[[Dict[str, Any]], None]] = None,
+        ) -> Dict[str, Any]:
+    """
+    Benchmark every stage for every size, in a temporary directory.
+
+    Logging is disabled meanwhile (it would be timed as well).
+
+    Parameters
+    ----------
+    sizes : list(int), optional
+        Amounts of units. Defaults to SIZES.
+    history_length : int, optional
+        Days in the change history of every unit. Defaults to 3.
+    modified : float, optional
+        Percentage of modified units. Defaults to 10.
+    seed : int, optional
+        Seed of the random numbers. Defaults to 0.
+    batch_size : int, optional
+        Units per transaction in runs. Defaults to None (single transaction).
+    report : callable, optional
+        Called with every result as soon as it's available.
+
+    Returns
+    -------
+    dict
+
+    Example
+    -------
+    output:
+        {
+            "created": "2000-01-01T00:00:00+00:00",
+            "python": "3.11.2",
+            "sqlalchemy": "1.3.24",
+            "options": {"history_length": 3, "modified": 10.0, ...},
+            "results": [
+                {
+                    "units": 1000,
+                    "stage": "load_version",
+                    "seconds": 0.01,
+                    "units_per_second": 100000.0,
+                },
+                ...
+            ],
+        }
+
+    """
+    output: Dict[str, Any] = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "options": {
+            "history_length": history_length,
+            "modified": modified,
+            "seed": seed,
+            "batch_size": batch_size,
+            },
+        "results": [],
+        }
+    disabled = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        with TemporaryDirectory() as directory:
+            for count in sizes:
+                timings = bench_size(
+                    directory, count, history_length, modified, seed,
+                    batch_size)
+                for stage in STAGES:
+                    item = {
+                        "units": count,
+                        "stage": stage,
+                        "seconds": timings[stage],
+                        "units_per_second": (
+                            count / timings[stage] if timings[stage] else 0),
+                        }
+                    output["results"].append(item)
+                    if report is not None:
+                        report(item)
+    finally:
+        logging.disable(disabled)
+    return output
+
+
+def compare(
+        results: Dict[str, Any],
+        previous: Dict[str, Any]) -> Dict[str, Dict[int, float]]:
+    """
+    Speedup of results over previous ones (for the same units and stage).
+
+    Parameters
+    ----------
+    results : dict
+        Output of run.
+    previous : dict
+        Output of a previous run.
+
+    Returns
+    -------
+    dict
+        Speedup (previous seconds / seconds) by stage and units.
+
+    """
+    previous_seconds = {
+        (item["units"], item["stage"]): item["seconds"]
+        for item in previous.get("results", [])
+        }
+    result: Dict[str, Dict[int, float]] = {}
+    for item in results["results"]:
+        seconds = previous_seconds.get((item["units"], item["stage"]))
+        if seconds and item["seconds"]:
+            result.setdefault(item["stage"], {})[item["units"]] = (
+                seconds / item["seconds"])
+    return result
+
+
+def create_parser(args: List[str]) -> Namespace:
+    """
+    Create parser for the benchmark options.
+
+    Parameters
+    ----------
+    args : list(str)
+        List of commands to parse.
+
+    Returns
+    -------
+    ArgumentParser
+
+    """
+    parser_obj = ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser_obj.add_argument(
+        "-n", "--count",
+        type=int, nargs="+", default=list(SIZES),
+        help="Amounts of units (default: 1k, 10k, 100k and 1M).")
+    add_arguments(parser_obj, modified=10.0)
+    parser_obj.add_argument(
+        "-b", "--batch-size",
+        type=int, default=None,
+        help="Units per transaction in runs.")
+    parser_obj.add_argument(
+        "-o", "--output",
+        default=None,
+        help="Write results as JSON to this file.")
+    parser_obj.add_argument(
+        "-c", "--compare",
+        default=None,
+        help="Show speedups over the results in this (JSON) file.")
+    return parser_obj.parse_args(args)
+
+
+def main(args: List[str]) -> None:
+    """ Execute benchmark and print results. """
+    options = create_parser(args)
+    previous = None
+    if options.compare:
+        with open(options.compare, "r", encoding="utf-8") as previous_file:
+            previous = json.load(previous_file)
+
+    def report(item: Dict[str, Any]) -> None:
+        """ Print a result. """
+        print(
+            f"{item['units']:>8} {item['stage']:20} "
+            f"{item['seconds']:10.3f}s {item['units_per_second']:12.0f}/s",
+            flush=True)
+
+    results = run(
+        options.count, options.history_length, options.modified,
+        options.seed, options.batch_size, report)
+
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=4)
+    if previous is not None:
+        for stage, speedups in compare(results, previous).items():
+            for count, speedup in speedups.items():
+                print(f"{count:>8} {stage:20} speedup {speedup:6.2f}x")
+
+
+# Executed when ran from the command line.
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,189 @@
+"""
+Startup benchmark for the command line entry point.
+
+Runs the entry point in new interpreters with "python -X importtime" and
+reports the wall time, the slowest imports and whether modules that should
+only be loaded on demand (SQLAlchemy, the models) were imported.
+
+Usage:
+
+    python -m pata.bench.startup [-r REPEAT] [-t TOP] [--lazy]
+        [--max-ms MS] [-- ARGS]
+
+As a regression guard for --help (the default arguments):
+
+    python -m pata.bench.startup --lazy --max-ms 150
+
+"""
+import subprocess
+import sys
+
+from argparse import (
+    ArgumentParser,
+    Namespace,
+    )
+from time import perf_counter
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+    )
+
+
+# Entry point measured.
+MODULE = "pata.cli"
+
+# Modules that must not be imported for --help or usage errors.
+LAZY_MODULES = ("sqlalchemy", "pata.models", "pata.migrate_units")
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse the output of "python -X importtime".
+
+    Parameters
+    ----------
+    output : str
+        Standard error of the interpreter.
+
+    Returns
+    -------
+    list(tuple(str, int, int))
+        Module, self and cumulative time (microseconds), in import order.
+
+    Example
+    -------
+    input:
+        import time: self [us] | cumulative | imported package
+        import time:       180 |        180 |   _io
+        import time:        95 |        275 | io
+
+    output:
+        [("_io", 180, 180), ("io", 95, 275)]
+
+    """
+    result = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        result.append((
+            fields[2].strip(), int(fields[0]), int(fields[1])))
+    return result
+
+
+def measure(args: List[str], repeat_count: int = 5) -> Dict[str, Any]:
+    """
+    Time the entry point with args in new interpreters.
+
+    Parameters
+    ----------
+    args : list(str)
+        Arguments for the entry point.
+    repeat_count : int, optional
+        Measurements (best one is reported).
+
+    Returns
+    -------
+    dict
+
+    Example
+    -------
+    output:
+        {
+            "wall_ms": 80.5,
+            "imports": [("pata.cli", 10, 2500), ...],
+            "lazy_imported": ["sqlalchemy"],
+        }
+
+    """
+    result: Dict[str, Any] = {}
+    for _ in range(repeat_count):
+        start = perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", MODULE, *args],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            text=True, check=False)
+        wall_ms = (perf_counter() - start) * 1000
+        if not result or wall_ms < result["wall_ms"]:
+            result = {
+                "wall_ms": wall_ms,
+                "imports": parse_importtime(process.stderr),
+                }
+    result["lazy_imported"] = sorted({
+        module.split(".")[0] if module.startswith("sqlalchemy") else module
+        for module, _, _ in result["imports"]
+        if any(
+            module == lazy or module.startswith(f"{lazy}.")
+            for lazy in LAZY_MODULES)
+        })
+    return result
+
+
+def create_parser(args: List[str]) -> Namespace:
+    """
+    Create parser for the benchmark options.
+
+    Parameters
+    ----------
+    args : list(str)
+        List of commands to parse.
+
+    Returns
+    -------
+    ArgumentParser
+
+    """
+    parser_obj = ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser_obj.add_argument(
+        "-r", "--repeat",
+        type=int, default=5,
+        help="Measurements (best one is reported).")
+    parser_obj.add_argument(
+        "-t", "--top",
+        type=int, default=10,
+        help="Slowest imports to show.")
+    parser_obj.add_argument(
+        "--lazy",
+        action="store_true", default=False,
+        help="Fail when SQLAlchemy or the models are imported.")
+    parser_obj.add_argument(
+        "--max-ms",
+        type=float, default=None,
+        help="Fail when the wall time is over MS milliseconds.")
+    parser_obj.add_argument(
+        "args",
+        nargs="*", default=["--help"],
+        help="Arguments for the entry point (default: --help).")
+    return parser_obj.parse_args(args)
+
+
+def main(args: List[str]) -> int:
+    """ Execute benchmark, print results and return exit status. """
+    options = create_parser(args)
+    result = measure(options.args, options.repeat)
+    print(f"{MODULE} {' '.join(options.args)}: {result['wall_ms']:.1f}ms")
+    slowest = sorted(
+        result["imports"], key=lambda item: item[2], reverse=True)
+    for module, self_us, cumulative_us in slowest[:options.top]:
+        print(
+            f"  {module:40} self {self_us / 1000:7.2f}ms  "
+            f"cumulative {cumulative_us / 1000:7.2f}ms")
+
+    status = 0
+    if result["lazy_imported"]:
+        print(f"Imported on startup: {', '.join(result['lazy_imported'])}")
+        if options.lazy:
+            status = 1
+    if options.max_ms is not None and result["wall_ms"] > options.max_ms:
+        print(f"Slower than {options.max_ms:.1f}ms")
+        status = 1
+    return status
+
+
+# Executed when ran from the command line.
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,136 @@
+""" Unit tests for pata.bench.generator """
+import json
+import logging
+import unittest
+
+from mock import (
+    mock_open,
+    patch,
+    )
+
+from pata.bench.generator import (
+    generate_units,
+    modify_units,
+    write_dump,
+    )
+from pata.migrate_units import (
+    load_to_values,
+    models_diff,
+    )
+
+
+logging.disable(logging.CRITICAL)
+
+
+class GenerateUnitsCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.bench.generator.generate_units """
+
+    def test_count(self):
+        """ Test units are generated by unique name. """
+        # When
+        result = generate_units(50)
+
+        # Then
+        self.assertEqual(len(result), 50)
+        self.assertEqual(
+            list(result), [data["name"] for data in result.values()])
+
+    def test_seed(self):
+        """ Test the same seed gives the same units. """
+        # Given
+        data = {
+            "same": (0, True),
+            "other": (1, False),
+            }
+
+        # When/Then
+        for name, (seed, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    generate_units(10) == generate_units(10, seed=seed),
+                    expected_result)
+
+    def test_history_length(self):
+        """ Test every unit has history_length days of changes. """
+        # When
+        result = generate_units(10, history_length=5)
+
+        # Then
+        for data in result.values():
+            self.assertEqual(len(data["change_history"]), 5)
+            self.assertEqual(
+                data["change_history"]["2014-10-04"], ["Added."])
+
+    def test_load(self):
+        """ Test units can be loaded (same structure as wiki dumps). """
+        # When
+        units = generate_units(10)
+        result = [load_to_values(data) for data in units.values()]
+
+        # Then
+        for unit in result:
+            self.assertEqual(len(unit.versions), 1)
+            self.assertEqual(
+                len(unit.changes),
+                sum(map(len, units[unit.name]["change_history"].values())))
+
+
+class ModifyUnitsCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.bench.generator.modify_units """
+
+    def test_modified(self):
+        """ Test percentage of units is modified (new version/change). """
+        # Given
+        units = generate_units(40)
+
+        # When
+        result = modify_units(units, 25)
+
+        # Then
+        diffs = [
+            models_diff(
+                load_to_values(units[name]).to_model(),
+                load_to_values(data))
+            for name, data in result.items()
+            ]
+        changed = [diff for diff in diffs if diff.get("unit_versions")]
+        self.assertEqual(len(changed), 10)
+        for diff in changed:
+            self.assertEqual(len(diff.get("unit_changes")), 1)
+        self.assertEqual(units, generate_units(40))
+
+    def test_nochange(self):
+        """ Test units are returned when nothing is modified. """
+        # Given
+        units = generate_units(10)
+
+        # When/Then
+        for modified in (0, -5, 1):
+            with self.subTest(modified):
+                self.assertIs(modify_units(units, modified), units)
+
+    def test_generate(self):
+        """ Test generate_units modifies the same units. """
+        # When/Then
+        self.assertEqual(
+            generate_units(20, modified=50),
+            modify_units(generate_units(20), 50))
+
+
+class WriteDumpTests(unittest.TestCase):
+    """ Tests for pata.bench.generator.write_dump """
+
+    @patch("pata.bench.generator.open", new_callable=mock_open)
+    def test_write(self, open_mock):
+        """ Test units are written as JSON. """
+        # Given
+        units = generate_units(2)
+
+        # When
+        write_dump("units.json", units)
+
+        # Then
+        open_mock.assert_called_once_with("units.json", "w", encoding="utf-8")
+        written = "".join(
+            call.args[0] for call in open_mock().write.call_args_list)
+        self.assertEqual(json.loads(written), units)
@@ -0,0 +1,57 @@
+""" Unit tests for pata.bench.models """
+import unittest
+
+from pata.bench.models import (
+    create_version,
+    legacy_copy,
+    legacy_diff,
+    run,
+    )
+
+
+class LegacyCleanTests(unittest.TestCase):
+    """ Tests legacy implementations match the current ones. """
+
+    def test_diff(self):
+        """ Test same differences are found. """
+        # Given
+        base = create_version()
+        data = {
+            "nochange": create_version(),
+            "change": create_version(attack=2, abilities="ability Y"),
+            }
+
+        # When/Then
+        for name, target in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    legacy_diff(base, target), base.diff(target))
+
+    def test_copy(self):
+        """ Test same values are copied. """
+        # Given
+        base = create_version()
+
+        # When
+        result = legacy_copy(base)
+
+        # Then
+        self.assertEqual(base.copy().diff(result), {})
+
+
+class RunCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.bench.models.run """
+
+    def test_cases(self):
+        """ Test a timing is returned for every case. """
+        # When
+        result = run(number=1, repeat_count=1)
+
+        # Then
+        self.assertEqual(
+            sorted(result),
+            sorted([
+                "copy", "copy_legacy",
+                "diff_change", "diff_change_legacy",
+                "diff_nochange", "diff_nochange_legacy",
+                ]))
@@ -0,0 +1,67 @@
+""" Unit tests for pata.bench.runner """
+import logging
+import unittest
+
+from mock import patch
+
+from pata.bench.runner import (
+    compare,
+    DATABASE,
+    run,
+    STAGES,
+    )
+from pata.config import DATABASES
+
+
+logging.disable(logging.CRITICAL)
+
+
+class RunCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.bench.runner.run """
+
+    @patch("pata.migrate_units.setup_logging")
+    def test_stages(self, _):
+        """ Test every stage is timed for every size. """
+        # Given
+        reported = []
+
+        # When
+        result = run(
+            [5, 10], history_length=2, modified=20, batch_size=4,
+            report=reported.append)
+
+        # Then
+        self.assertEqual(
+            [(item["units"], item["stage"]) for item in result["results"]],
+            [(count, stage) for count in (5, 10) for stage in STAGES])
+        self.assertEqual(reported, result["results"])
+        self.assertEqual(
+            result["options"],
+            {"history_length": 2, "modified": 20, "seed": 0,
+             "batch_size": 4})
+        self.assertNotIn(DATABASE, DATABASES)
+        self.assertEqual(logging.root.manager.disable, logging.CRITICAL)
+
+
+class CompareTests(unittest.TestCase):
+    """ Tests for pata.bench.runner.compare """
+
+    def test_compare(self):
+        """ Test speedups of stages in both results. """
+        # Given
+        results = {"results": [
+            {"units": 10, "stage": "run_insert", "seconds": 1.0},
+            {"units": 10, "stage": "run_update", "seconds": 2.0},
+            {"units": 20, "stage": "run_insert", "seconds": 0.0},
+            ]}
+        previous = {"results": [
+            {"units": 10, "stage": "run_insert", "seconds": 4.0},
+            {"units": 20, "stage": "run_insert", "seconds": 1.0},
+            {"units": 30, "stage": "run_insert", "seconds": 1.0},
+            ]}
+
+        # When
+        result = compare(results, previous)
+
+        # Then
+        self.assertEqual(result, {"run_insert": {10: 4.0}})
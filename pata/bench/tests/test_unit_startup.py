@@ -0,0 +1,86 @@
+""" Unit tests for pata.bench.startup """
+import unittest
+
+from mock import (
+    MagicMock,
+    patch,
+    )
+
+from pata.bench.startup import (
+    main,
+    measure,
+    parse_importtime,
+    )
+
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       180 |        180 |   _io
+import time:        95 |        275 | io
+import time:       120 |        200 |     sqlalchemy.util
+import time:       300 |        500 |   sqlalchemy
+import time:        40 |         40 | pata.models.units
+usage: cli.py [-h] source
+"""
+
+
+class ParseImporttimeTests(unittest.TestCase):
+    """ Tests for pata.bench.startup.parse_importtime """
+
+    def test_parse(self):
+        """ Test modules and times are parsed (other lines ignored). """
+        # Given
+        expected_result = [
+            ("_io", 180, 180),
+            ("io", 95, 275),
+            ("sqlalchemy.util", 120, 200),
+            ("sqlalchemy", 300, 500),
+            ("pata.models.units", 40, 40),
+            ]
+
+        # When
+        result = parse_importtime(IMPORTTIME)
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+
+class MeasureTests(unittest.TestCase):
+    """ Tests for pata.bench.startup.measure and pata.bench.startup.main """
+
+    @patch("pata.bench.startup.subprocess")
+    def test_measure(self, subprocess_mock):
+        """ Test imports of lazy modules are reported. """
+        # Given
+        subprocess_mock.run.return_value = MagicMock(stderr=IMPORTTIME)
+
+        # When
+        result = measure(["--help"], 2)
+
+        # Then
+        self.assertEqual(subprocess_mock.run.call_count, 2)
+        self.assertEqual(len(result["imports"]), 5)
+        self.assertEqual(
+            result["lazy_imported"], ["pata.models.units", "sqlalchemy"])
+        self.assertGreater(result["wall_ms"], 0)
+
+    @patch("pata.bench.startup.measure")
+    def test_main(self, measure_mock):
+        """ Test exit status for lazy imports and wall time limits. """
+        # Given
+        data = {
+            "ok": ([], [], 0),
+            "lazy_reported": ([], ["sqlalchemy"], 0),
+            "lazy": (["--lazy"], ["sqlalchemy"], 1),
+            "slow": (["--max-ms", "10"], [], 1),
+            }
+
+        # When/Then
+        for name, (args, lazy_imported, expected_result) in data.items():
+            with self.subTest(name), patch("builtins.print"):
+                measure_mock.return_value = {
+                    "wall_ms": 20.0,
+                    "imports": [("io", 95, 275)],
+                    "lazy_imported": lazy_imported,
+                    }
+
+                self.assertEqual(main(args), expected_result)
@@ -0,0 +1,151 @@
+""" Checkpoint of the source units committed by a running migration. """
+import json
+import os
+
+from itertools import islice
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    )
+
+from pata.config import LOGGER as logger
+
+
+class Checkpoint():
+    """
+    Progress of a migration through a source file.
+
+    Advanced after each committed batch, so a failed migration can be
+    resumed skipping the units already committed.
+
+    """
+
+    def __init__(
+            self, path: str, database: str = "", file_digest: str = "",
+            last_unit: str = "", count: int = 0) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            Path to the checkpoint file.
+        database : str, optional
+            Database the units were committed to.
+        file_digest : str, optional
+            Digest of the whole source file.
+        last_unit : str, optional
+            Name of the last unit committed.
+        count : int, optional
+            Amount of source units committed.
+
+        """
+        self.path = path
+        self.database = database
+        self.file_digest = file_digest
+        self.last_unit = last_unit
+        self.count = count
+
+    @classmethod
+    def load(cls, path: str, database: str, file_digest: str) -> "Checkpoint":
+        """
+        Load checkpoint from file.
+
+        An empty checkpoint is returned when the file doesn't exist,
+        is invalid or belongs to another database or source file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the checkpoint file.
+        database : str
+            Database the units are committed to.
+        file_digest : str
+            Digest of the whole source file.
+
+        Returns
+        -------
+        pata.checkpoint.Checkpoint
+
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return cls(path, database, file_digest)
+        except (OSError, ValueError):
+            logger.warning("Invalid checkpoint, ignoring: %s", path)
+            return cls(path, database, file_digest)
+
+        if (not isinstance(data, dict)
+                or data.get("database") != database
+                or not file_digest
+                or data.get("file_digest") != file_digest):
+            return cls(path, database, file_digest)
+
+        return cls(
+            path, database, file_digest,
+            last_unit=data.get("last_unit") or "",
+            count=data.get("count") or 0)
+
+    def save(self) -> None:
+        """ Write checkpoint to file (replacing the previous one). """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(
+                {
+                    "database": self.database,
+                    "file_digest": self.file_digest,
+                    "last_unit": self.last_unit,
+                    "count": self.count,
+                    },
+                checkpoint_file)
+        os.replace(temp_path, self.path)
+
+    def clear(self) -> None:
+        """ Remove checkpoint file (migration finished). """
+        self.last_unit = ""
+        self.count = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def advance(self, items: List[Tuple[str, Any]]) -> None:
+        """
+        Record a batch of source units as committed.
+
+        Parameters
+        ----------
+        items : list(tuple(str, dict))
+            (unit name, unit data) pairs committed, in source order.
+
+        """
+        if not items:
+            return
+        self.last_unit = items[-1][0]
+        self.count += len(items)
+        self.save()
+
+    def skip(
+            self, items: Iterable[Tuple[str, Any]]
+            ) -> Iterator[Tuple[str, Any]]:
+        """
+        Skip (unit name, unit data) pairs already committed.
+
+        Parameters
+        ----------
+        items : iterable(tuple(str, dict))
+            Source units, in source order.
+
+        Returns
+        -------
+        generator(tuple(str, dict))
+
+        """
+        if self.count:
+            logger.info(
+                "Resuming after unit %s (%d units committed)",
+                self.last_unit, self.count)
+        return islice(items, self.count, None)
@@ -0,0 +1,243 @@
+"""
+Command line entry points for units migrations (pata-migrate-units) and
+exports (pata-export-units).
+
+Only the argument parsers are loaded at import time. SQLAlchemy, the models
+and file logging are loaded once the arguments are valid, so --help and
+usage errors return right away.
+
+"""
+import sys
+
+from argparse import (
+    ArgumentParser,
+    ArgumentTypeError,
+    Namespace,
+    )
+from typing import (
+    List,
+    Optional,
+    )
+
+
+def positive_int(value: str) -> int:
+    """
+    Argument type for sizes and counts (the parser reports invalid values).
+
+    Parameters
+    ----------
+    value : str
+        Value from the command line.
+
+    Returns
+    -------
+    int
+
+    Raises
+    ------
+    ArgumentTypeError
+        If the value isn't an integer greater than 0.
+
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ArgumentTypeError(f"invalid positive int value: {value!r}")
+    return number
+
+
+def create_parser(args: List[str]) -> Namespace:
+    """
+    Create parser to call units migrations from the command line.
+
+    Parameters
+    ----------
+    args : list(str)
+        List of commands to parse.
+
+    Returns
+    -------
+    ArgumentParser
+
+    """
+    parser_obj = ArgumentParser(prog="pata-migrate-units")
+
+    # Required positional argument
+    parser_obj.add_argument(
+        "source",
+        help=(
+            "Path to JSON file with information to update, or directory/glob"
+            " of dated dumps (processed in chronological order)"))
+    # Optional/Flags
+    parser_obj.add_argument(
+        "-d", "--diff",
+        action="store_true", default=False,
+        help="Only show differences (no insertd/updat).")
+    parser_obj.add_argument(
+        "-i", "--insert",
+        action="store_true", default=False,
+        help="Only insert new units (no updates)")
+    parser_obj.add_argument(
+        "-u", "--update",
+        action="store_true", default=False,
+        help="Only update new units (no inserts)")
+    parser_obj.add_argument(
+        "-f", "--force",
+        action="store_true", default=False,
+        help="Process all units (ignore manifest from previous runs)")
+    parser_obj.add_argument(
+        "-b", "--batch-size",
+        type=positive_int, default=None,
+        help="Commit every BATCH_SIZE units (default: single transaction)")
+    parser_obj.add_argument(
+        "-r", "--resume",
+        action="store_true", default=False,
+        help="Continue after the last batch committed by a failed run")
+    parser_obj.add_argument(
+        "-p", "--profile",
+        action="store_true", default=False,
+        help="Profile the run (cProfile stats written next to the log)")
+    parser_obj.add_argument(
+        "-s", "--sql-stats",
+        action="store_true", default=False,
+        help=(
+            "Summarize the SQL statements executed (slow and repeated ones"
+            " are logged)"))
+    parser_obj.add_argument(
+        "-m", "--metrics",
+        default=None, metavar="PATH",
+        help=(
+            "Write metrics of the run to PATH, in the Prometheus text format"
+            " (for the node_exporter textfile collector)"))
+    parser_obj.add_argument(
+        "-o", "--output",
+        default=None, metavar="PATH",
+        help=(
+            "Stream the changes of every unit to PATH as JSON Lines ('-' for"
+            " stdout), only the counts are logged"))
+
+    return parser_obj.parse_args(args)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """
+    Execute units migrations from the command line.
+
+    Parameters
+    ----------
+    args : list(str), optional
+        List of commands to parse. Defaults to sys.argv.
+
+    Returns
+    -------
+    int
+        Exit status (1 when the run failed, see Migrator.run_command).
+
+    """
+    options = create_parser(sys.argv[1:] if args is None else args)
+
+    # pylint: disable=import-outside-toplevel
+    from pprint import pformat
+
+    from pata.config import (
+        get_profile_path,
+        LOGGER as logger,
+        ROOT_LOGGER as root_logger,
+        setup_logging,
+        )
+    from pata.migrate_units import run_command
+
+    setup_logging()
+    arguments = (
+        options.source, options.diff, options.insert, options.update,
+        options.force, options.batch_size, options.resume,
+        options.sql_stats, options.metrics, options.output)
+    # Keep the standard output for the changes when streamed there.
+    console = logger if options.output == "-" else root_logger
+    if options.profile:
+        from cProfile import Profile
+
+        profile = Profile()
+        result = profile.runcall(run_command, *arguments)
+        profile_path = get_profile_path()
+        profile.dump_stats(profile_path)
+        console.info("Profile written to: %s", profile_path)
+    else:
+        result = run_command(*arguments)
+    console.info(pformat(result))
+    return 1 if result.get("status") == "Failed" else 0
+
+
+def create_export_parser(args: List[str]) -> Namespace:
+    """
+    Create parser to export units from the command line.
+
+    Parameters
+    ----------
+    args : list(str)
+        List of commands to parse.
+
+    Returns
+    -------
+    ArgumentParser
+
+    """
+    parser_obj = ArgumentParser(prog="pata-export-units")
+
+    # Required positional argument
+    parser_obj.add_argument(
+        "path",
+        help=(
+            "Path to the units file to write (replaced atomically, see"
+            " pata.units_file to read it)"))
+    # Optional/Flags
+    parser_obj.add_argument(
+        "-D", "--database",
+        default="sqlite",
+        help="Database configuration to export (default: sqlite)")
+
+    return parser_obj.parse_args(args)
+
+
+def export_main(args: Optional[List[str]] = None) -> int:
+    """
+    Export units based on command line arguments.
+
+    Parameters
+    ----------
+    args : list(str), optional
+        List of commands to parse. Defaults to sys.argv.
+
+    Returns
+    -------
+    int
+        Exit status.
+
+    """
+    options = create_export_parser(sys.argv[1:] if args is None else args)
+
+    # pylint: disable=import-outside-toplevel
+    from pprint import pformat
+
+    from pata.config import (
+        ROOT_LOGGER as root_logger,
+        setup_logging,
+        )
+    from pata.export import export_units
+    from pata.migrate_units import get_migrator
+
+    setup_logging()
+    session = get_migrator(options.database).session_class()
+    try:
+        result = export_units(session, options.path)
+    finally:
+        session.close()
+    root_logger.info(pformat(result))
+    return 0
+
+
+# Executed when ran from the command line.
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,26 @@
 """ Global configurations for pata. """
+from datetime import datetime
+from functools import lru_cache
 from logging import (
     config as loggingConfig,
     getLogger,
     )
 from os import path
-from typing import Dict
+from typing import (
+    Any,
+    Dict,
+    Mapping,
+    Optional,
+    )
 
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 
 
 BASE = declarative_base()
 
-DATABASES = {
+DATABASES: Dict[str, Dict[str, Any]] = {
     "sqlite": {
         "engine": "sqlite",  # required
         "driver": "",
@@ -20,18 +29,76 @@ DATABASES = {
         "host": "",
         "port": "",
         "database": "db.sqlite",
+        # Applied on every new connection, see set_pragmas.
+        "pragmas": {
+            "journal_mode": "wal",
+            "synchronous": "normal",
+            "cache_size": -64000,  # negative values are KiB
+            "mmap_size": 268435456,
+            "temp_store": "memory",
+            "busy_timeout": 5000,  # milliseconds
+            },
         },
     }
 
 CURRENT_DIR = path.dirname(path.abspath(__file__))
-loggingConfig.fileConfig(
-    path.join(CURRENT_DIR, "logging.conf"),
-    defaults={"logfilename": path.join(CURRENT_DIR, "../log")})
+LOG_PATH = path.join(CURRENT_DIR, "../log")
+# Handlers are added by setup_logging.
 LOGGER = getLogger("pata")
 ROOT_LOGGER = getLogger("root")
 
+# Digests of the source units applied by the last successful migration.
+MANIFEST_PATH = path.join(CURRENT_DIR, "../manifest.json")
+
+# Progress of the last migration in batches (to resume it after a failure).
+CHECKPOINT_PATH = path.join(CURRENT_DIR, "../checkpoint.json")
+
+
+# Statements instrumentation (see pata.instrumentation), when enabled:
+# statements slower than this (milliseconds) are logged...
+SLOW_STATEMENT_MS = 100
+# ...as well as statements executed more times than this in a single run.
+REPEATED_STATEMENT_LIMIT = 100
+
+# Reads cached by pata.repository.UnitRepository (also invalidated whenever
+# a migrator commits): maximum entries and seconds an entry is kept.
+REPOSITORY_CACHE_SIZE = 4096
+REPOSITORY_CACHE_TTL = 300.0
+
+
+@lru_cache(maxsize=None)
+def setup_logging() -> None:
+    """
+    Configure logging (console and log file), see logging.conf.
+
+    Done once, when pata is about to do some work, so importing pata
+    doesn't open the log file.
+
+    """
+    loggingConfig.fileConfig(
+        path.join(CURRENT_DIR, "logging.conf"),
+        defaults={"logfilename": LOG_PATH},
+        disable_existing_loggers=False)
+
+
+def get_profile_path() -> str:
+    """
+    Path to a new profile (cProfile stats) of a command, next to the log.
+
+    Returns
+    -------
+    str
+
+    Example
+    -------
+    output:
+        /path/to/log-20000101-120000.pstats
 
-def get_database_url(data: Dict[str, str]) -> str:
+    """
+    return f"{LOG_PATH}-{datetime.now():%Y%m%d-%H%M%S}.pstats"
+
+
+def get_database_url(data: Mapping[str, Any]) -> str:
     """
     Create connection string based con configuration.
 
@@ -77,3 +144,36 @@ def get_database_url(data: Dict[str, str]) -> str:
         f"{username}{password}"
         f"{host}{port}{database}"
         )
+
+
+def set_pragmas(
+        engine: Engine, pragmas: Optional[Mapping[str, Any]]) -> None:
+    """
+    Apply SQLite pragmas to every new connection of an engine.
+
+    Engines for other databases are left untouched.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        Engine to tune
+    pragmas : dict
+        Pragma names and values, e.g. {"journal_mode": "wal"}
+
+    """
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    statements = [
+        f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+    def on_connect(dbapi_connection: Any, _: Any) -> None:
+        """ Run the pragmas for a new DBAPI connection. """
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", on_connect)
@@ -0,0 +1,87 @@
+"""
+Export of the units database to a units file (see pata.units_file and the
+pata-export-units command).
+
+"""
+import os
+
+from collections import defaultdict
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+    )
+
+from sqlalchemy import select
+from sqlalchemy.orm.session import Session
+
+from pata.models.units import (
+    UnitChanges,
+    UnitLatestVersions,
+    Units,
+    UnitVersions,
+    )
+from pata.units_file import (
+    UnitRecord,
+    write_units_file,
+    )
+
+
+# Fields of UnitRecord read from units (the others are from versions).
+UNIT_FIELDS = ("name", "wiki_path", "image_url", "panel_url")
+
+
+def export_units(session: Session, path: str) -> Dict[str, Any]:
+    """
+    Write all units, with their latest version and change history, to a
+    units file (one query per table, no ORM objects).
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    path : str
+        Path to the file (replaced atomically).
+
+    Returns
+    -------
+    dict
+
+    Example
+    -------
+    output:
+        {"path": "units.bin", "units": 145, "changes": 420, "bytes": 52000}
+
+    """
+    changes: Dict[int, List[Tuple[Any, str]]] = defaultdict(list)
+    for unit_id, day, description in session.execute(
+            select([
+                UnitChanges.unit_id, UnitChanges.day,
+                UnitChanges.description])
+            .order_by(
+                UnitChanges.unit_id, UnitChanges.day.desc(),
+                UnitChanges.id.desc())):
+        changes[unit_id].append((day, description))
+
+    fields = UnitRecord._fields[:-1]
+    query = select([
+        Units.id,
+        *[getattr(Units if field in UNIT_FIELDS else UnitVersions, field)
+          for field in fields],
+        ]).select_from(
+            Units.metadata.tables["unit_latest_version"]
+            .join(Units, Units.id == UnitLatestVersions.unit_id)
+            .join(
+                UnitVersions,
+                UnitVersions.id == UnitLatestVersions.version_id))
+    header = write_units_file(path, [
+        UnitRecord._make([*values, tuple(changes[unit_id])])
+        for unit_id, *values in session.execute(query)])
+
+    return {
+        "path": path,
+        "units": header.units,
+        "changes": header.changes,
+        "bytes": os.path.getsize(path),
+        }
@@ -0,0 +1,262 @@
+""" SQL statements executed by pata engines (opt-in instrumentation). """
+import re
+
+from time import perf_counter
+from typing import (
+    Any,
+    Dict,
+    List,
+    )
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from pata.config import LOGGER as logger
+
+
+# Amount of statements (slowest first) in the summary.
+TOP_STATEMENTS = 10
+
+# Maximum length of a statement in the summary.
+STATEMENT_WIDTH = 120
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+SELECT_COLUMNS = re.compile(r"^SELECT .+? FROM ")
+
+# Statements whose rows are counted as written.
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Normalize a statement so executions of the same query are grouped.
+
+    Whitespace is collapsed, literals are replaced by "?" and expanded
+    "IN (...)" lists by "IN (?...)".
+
+    Parameters
+    ----------
+    statement : str
+        SQL statement.
+
+    Returns
+    -------
+    str
+
+    Example
+    -------
+    input:
+        SELECT units.id
+        FROM units
+        WHERE units.name IN (?, ?, ?) LIMIT 10
+
+    output:
+        SELECT units.id FROM units WHERE units.name IN (?...) LIMIT ?
+
+    """
+    result = " ".join(statement.split())
+    result = STRING_LITERAL.sub("?", result)
+    result = NUMBER_LITERAL.sub("?", result)
+    return IN_LIST.sub("IN (?...)", result)
+
+
+class StatementStats():
+    """
+    Count and time statements by normalized statement.
+
+    Statements slower than slow_ms are logged, as well as statements
+    executed more than repeat_limit times since the last reset (one row at
+    a time, the classic N+1 of lazy loaded relationships). Batched
+    statements ("IN (...)" lists) aren't considered repeated.
+
+    Parameters
+    ----------
+    slow_ms : float
+        Duration (milliseconds) of slow statements.
+    repeat_limit : int
+        Executions of a statement (per reset) to consider it an N+1.
+
+    """
+
+    def __init__(self, slow_ms: float, repeat_limit: int) -> None:
+        self.slow_ms = slow_ms
+        self.repeat_limit = repeat_limit
+        self.statements: Dict[str, List[float]] = {}
+        self.slow = 0
+        self.rows = 0
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Start recording the statements executed by engine.
+
+        Parameters
+        ----------
+        engine : sqlalchemy.engine.Engine
+            Engine to instrument.
+
+        """
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        event.listen(engine, "after_cursor_execute", self.after_execute)
+
+    def detach(self, engine: Engine) -> None:
+        """
+        Stop recording the statements executed by engine.
+
+        Parameters
+        ----------
+        engine : sqlalchemy.engine.Engine
+            Engine instrumented (see attach).
+
+        """
+        event.remove(engine, "before_cursor_execute", self.before_execute)
+        event.remove(engine, "after_cursor_execute", self.after_execute)
+
+    def reset(self) -> None:
+        """ Forget recorded statements (e.g. before a new run). """
+        self.statements = {}
+        self.slow = 0
+        self.rows = 0
+
+    def before_execute(  # pylint: disable=too-many-arguments,unused-argument
+            self, conn: Any, cursor: Any, statement: str, parameters: Any,
+            context: Any, executemany: bool) -> None:
+        """ Record when a statement starts (before_cursor_execute). """
+        conn.info.setdefault("pata_statement_start", []).append(
+            perf_counter())
+
+    def after_execute(  # pylint: disable=too-many-arguments,unused-argument
+            self, conn: Any, cursor: Any, statement: str, parameters: Any,
+            context: Any, executemany: bool) -> None:
+        """ Record a statement once executed (after_cursor_execute). """
+        starts = conn.info.get("pata_statement_start")
+        if not starts:
+            return
+        seconds = perf_counter() - starts.pop()
+        rows = 0
+        if statement.lstrip()[:6].upper() in WRITE_STATEMENTS:
+            # Rows of all parameter sets for executemany (-1 if unknown).
+            rows = max(cursor.rowcount, 0)
+        self.record(statement, seconds, rows)
+
+    def record(self, statement: str, seconds: float, rows: int = 0) -> None:
+        """
+        Add an execution of a statement.
+
+        Parameters
+        ----------
+        statement : str
+            SQL statement.
+        seconds : float
+            Duration of the execution.
+        rows : int, optional
+            Rows written (inserted, updated or deleted).
+
+        """
+        key = normalize_statement(statement)
+        totals = self.statements.setdefault(key, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        self.rows += rows
+
+        if seconds * 1000 > self.slow_ms:
+            self.slow += 1
+            logger.warning(
+                "Slow statement (%.1fms): %s", seconds * 1000, key)
+        if totals[0] == self.repeat_limit + 1 and "IN (?...)" not in key:
+            logger.warning(
+                "Statement executed more than %d times (N+1?): %s",
+                self.repeat_limit, key)
+
+    def summary(self, units: int = 0) -> Dict[str, Any]:
+        """
+        Totals of the statements recorded since the last reset.
+
+        Parameters
+        ----------
+        units : int, optional
+            Units processed meanwhile (for statements per unit).
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        output:
+            {
+                "statements": 12,
+                "per_unit": 0.12,
+                "seconds": 0.034,
+                "slow": 0,
+                "rows": 10,
+                "top": [
+                    {
+                        "statement": "SELECT units.id ...",
+                        "count": 2,
+                        "seconds": 0.01,
+                    },
+                    ...
+                ],
+                "repeated": {"SELECT unit_versions.id ...": 100},
+            }
+
+        """
+        count = sum(int(totals[0]) for totals in self.statements.values())
+        slowest = sorted(
+            self.statements.items(), key=lambda item: item[1][1],
+            reverse=True)
+        return {
+            "statements": count,
+            "per_unit": round(count / units, 3) if units else 0,
+            "seconds": round(
+                sum(totals[1] for totals in self.statements.values()), 6),
+            "slow": self.slow,
+            "rows": self.rows,
+            "top": [
+                {
+                    "statement": shorten(key),
+                    "count": int(totals[0]),
+                    "seconds": round(totals[1], 6),
+                    }
+                for key, totals in slowest[:TOP_STATEMENTS]
+                ],
+            "repeated": {
+                shorten(key): int(totals[0])
+                for key, totals in self.statements.items()
+                if totals[0] > self.repeat_limit and "IN (?...)" not in key
+                },
+            }
+
+
+def shorten(statement: str) -> str:
+    """
+    Statement cut to STATEMENT_WIDTH characters (for the summary).
+
+    The columns of long SELECT statements are left out first.
+
+    Parameters
+    ----------
+    statement : str
+        Normalized statement.
+
+    Returns
+    -------
+    str
+
+    Example
+    -------
+    input:
+        SELECT units.id AS units_id, ... FROM units WHERE units.id = ?
+
+    output:
+        SELECT ... FROM units WHERE units.id = ?
+
+    """
+    if len(statement) <= STATEMENT_WIDTH:
+        return statement
+    statement = SELECT_COLUMNS.sub("SELECT ... FROM ", statement, count=1)
+    if len(statement) <= STATEMENT_WIDTH:
+        return statement
+    return f"{statement[:STATEMENT_WIDTH - 3]}..."
@@ -0,0 +1,182 @@
+""" Manifest of the source data applied by previous migrations. """
+import json
+import os
+
+from hashlib import sha256
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    )
+
+from pata.config import LOGGER as logger
+from pata.models.utils import get_fingerprint
+
+
+# Amount of bytes read at a time when calculating the digest of a file.
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_digest(path: str) -> str:
+    """
+    Calculate the digest for the content of a file.
+
+    Parameters
+    ----------
+    path : str
+        Path to file.
+
+    Returns
+    -------
+    str
+        Empty if the file doesn't exist.
+
+    """
+    if not os.path.isfile(path):
+        return ""
+
+    digest = sha256()
+    with open(path, "rb") as data_file:
+        for chunk in iter(lambda: data_file.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest():
+    """
+    Digests of the source file and units from the last successful run.
+
+    Digests of changed units are kept as pending until commit is called
+    (after the changes are committed to the database), or discarded by
+    rollback.
+
+    """
+
+    def __init__(
+            self, path: str, database: str = "", file_digest: str = "",
+            units: Optional[Dict[str, str]] = None) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            Path to the manifest file.
+        database : str, optional
+            Database the digests apply to.
+        file_digest : str, optional
+            Digest of the whole source file.
+        units : dict, optional
+            Digests of source units by name.
+
+        """
+        self.path = path
+        self.database = database
+        self.file_digest = file_digest
+        self.units: Dict[str, str] = units or {}
+        self.pending: Dict[str, str] = {}
+        self.failed = False
+
+    @classmethod
+    def load(cls, path: str, database: str) -> "Manifest":
+        """
+        Load manifest from file.
+
+        An empty manifest is returned when the file doesn't exist,
+        is invalid or belongs to another database.
+
+        Parameters
+        ----------
+        path : str
+            Path to the manifest file.
+        database : str
+            Database the digests apply to.
+
+        Returns
+        -------
+        pata.manifest.Manifest
+
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as manifest_file:
+                data = json.load(manifest_file)
+        except FileNotFoundError:
+            return cls(path, database)
+        except (OSError, ValueError):
+            logger.warning("Invalid manifest, ignoring: %s", path)
+            return cls(path, database)
+
+        if not isinstance(data, dict) or data.get("database") != database:
+            return cls(path, database)
+
+        return cls(
+            path, database,
+            file_digest=data.get("file_digest") or "",
+            units=data.get("units") or {})
+
+    def save(self) -> None:
+        """ Write manifest to file (replacing the previous one). """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(
+                {
+                    "database": self.database,
+                    "file_digest": self.file_digest,
+                    "units": self.units,
+                    },
+                manifest_file)
+        os.replace(temp_path, self.path)
+
+    def changed(self, name: str, data: Any) -> bool:
+        """
+        Check if data for a unit changed since the last successful run.
+
+        Digest for changed units is kept as pending.
+
+        Parameters
+        ----------
+        name : str
+            Name of the unit.
+        data : dict
+            Source data for the unit.
+
+        Returns
+        -------
+        bool
+
+        """
+        digest = get_fingerprint(data)
+        if self.units.get(name) == digest:
+            return False
+        self.pending[name] = digest
+        return True
+
+    def changed_items(
+            self, items: Iterable[Tuple[str, Any]]
+            ) -> Iterator[Tuple[str, Any]]:
+        """
+        Filter (unit name, unit data) pairs that changed.
+
+        Parameters
+        ----------
+        items : iterable(tuple(str, dict))
+            Source units.
+
+        Returns
+        -------
+        generator(tuple(str, dict))
+
+        """
+        return (
+            (name, data) for name, data in items if self.changed(name, data))
+
+    def commit(self) -> None:
+        """ Accept pending digests. """
+        self.units.update(self.pending)
+        self.pending.clear()
+
+    def rollback(self) -> None:
+        """ Discard pending digests, the run didn't complete. """
+        self.pending.clear()
+        self.failed = True
@@ -0,0 +1,241 @@
+"""
+Metrics of migrations in the Prometheus text format.
+
+Written to a file for the textfile collector of node_exporter (no network
+involved), replacing the previous file atomically.
+
+"""
+import os
+import sys
+
+from time import time
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    )
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None  # type: ignore
+
+
+# Help of every metric, in the order they are written.
+METRICS = {
+    "pata_migration_last_run_timestamp_seconds":
+        "Time the last migration finished.",
+    "pata_migration_units_processed":
+        "Units processed by the last migration.",
+    "pata_migration_units":
+        "Units processed by the last migration, by result.",
+    "pata_migration_duration_seconds":
+        "Wall time of the last migration.",
+    "pata_migration_phase_seconds":
+        "Wall time of the last migration by phase.",
+    "pata_migration_phase_cpu_seconds":
+        "CPU time of the last migration by phase.",
+    "pata_migration_commits":
+        "Commits of the last migration.",
+    "pata_migration_commit_latency_seconds":
+        "Average wall time of the commits of the last migration.",
+    "pata_migration_statements":
+        "SQL statements executed by the last migration.",
+    "pata_migration_statements_seconds":
+        "Wall time of the SQL statements executed by the last migration.",
+    "pata_migration_rows_written":
+        "Rows inserted, updated or deleted by the last migration.",
+    "pata_migration_peak_rss_bytes":
+        "Peak resident set size of the process (up to the last migration).",
+    }
+
+# Results of units, see pata.migrate_units.process_transaction.
+RESULTS = ("insert", "update", "nochange")
+
+
+class Sample(NamedTuple):
+    """ Value of a metric (for some labels). """
+    name: str
+    labels: Dict[str, str]
+    value: float
+
+
+def get_peak_rss() -> Optional[int]:
+    """
+    Peak resident set size of the process (bytes).
+
+    Returns
+    -------
+    int or None
+        None when it isn't available on the platform.
+
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def get_samples(
+        counts: Mapping[str, int], phases: Mapping[str, Mapping[str, Any]],
+        statements: Optional[Mapping[str, Any]] = None,
+        labels: Optional[Mapping[str, str]] = None) -> List[Sample]:
+    """
+    Samples of all metrics of a migration.
+
+    Parameters
+    ----------
+    counts : dict
+        Units by result (insert, update, nochange).
+    phases : dict
+        Phases of the migration (see pata.timing.PhaseTimer.summary).
+    statements : dict, optional
+        Statements executed (see
+        pata.instrumentation.StatementStats.summary). Statement metrics are
+        left out without it.
+    labels : dict, optional
+        Labels of all samples (e.g. the database).
+
+    Returns
+    -------
+    list(Sample)
+
+    """
+    labels = dict(labels or {})
+    commit = phases.get("commit") or {}
+    samples = [
+        Sample("pata_migration_last_run_timestamp_seconds", labels, time()),
+        Sample(
+            "pata_migration_units_processed", labels,
+            sum(counts.get(result, 0) for result in RESULTS)),
+        ]
+    samples.extend(
+        Sample(
+            "pata_migration_units", dict(labels, result=result),
+            counts.get(result, 0))
+        for result in RESULTS)
+    samples.append(Sample(
+        "pata_migration_duration_seconds", labels,
+        (phases.get("total") or {}).get("wall", 0)))
+    for key, name in (
+            ("wall", "pata_migration_phase_seconds"),
+            ("cpu", "pata_migration_phase_cpu_seconds")):
+        samples.extend(
+            Sample(name, dict(labels, phase=phase), totals[key])
+            for phase, totals in phases.items() if phase != "total")
+    samples.extend([
+        Sample("pata_migration_commits", labels, commit.get("count", 0)),
+        Sample(
+            "pata_migration_commit_latency_seconds", labels,
+            commit["wall"] / commit["count"] if commit.get("count") else 0),
+        ])
+    if statements is not None:
+        samples.extend([
+            Sample(
+                "pata_migration_statements", labels,
+                statements["statements"]),
+            Sample(
+                "pata_migration_statements_seconds", labels,
+                statements["seconds"]),
+            Sample("pata_migration_rows_written", labels, statements["rows"]),
+            ])
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        samples.append(
+            Sample("pata_migration_peak_rss_bytes", labels, peak_rss))
+    return samples
+
+
+def format_labels(labels: Mapping[str, str]) -> str:
+    """
+    Labels of a sample in the text format.
+
+    Parameters
+    ----------
+    labels : dict
+        Label values by name.
+
+    Returns
+    -------
+    str
+
+    Example
+    -------
+    input:
+        {"database": "sqlite", "phase": "parse"}
+
+    output:
+        {database="sqlite",phase="parse"}
+
+    """
+    if not labels:
+        return ""
+    values = ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in labels.items())
+    return f"{{{values}}}"
+
+
+def escape_label(value: str) -> str:
+    """ Escape backslashes, double quotes and line feeds of a label value. """
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n"))
+
+
+def format_samples(samples: Iterable[Sample]) -> str:
+    """
+    Samples in the Prometheus text format (all metrics are gauges).
+
+    Parameters
+    ----------
+    samples : iterable(Sample)
+        Samples (see get_samples).
+
+    Returns
+    -------
+    str
+
+    Example
+    -------
+    output:
+        # HELP pata_migration_units Units processed by ..., by result.
+        # TYPE pata_migration_units gauge
+        pata_migration_units{database="sqlite",result="insert"} 10
+        ...
+
+    """
+    by_name: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_name.setdefault(sample.name, []).append(sample)
+    lines = []
+    for name, items in by_name.items():
+        lines.append(f"# HELP {name} {METRICS.get(name, name)}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(
+            f"{name}{format_labels(item.labels)} {item.value}"
+            for item in items)
+    return "".join(f"{line}\n" for line in lines)
+
+
+def write_samples(path: str, samples: Iterable[Sample]) -> None:
+    """
+    Write samples to a textfile (replacing the previous one atomically, so
+    the collector never reads a partial file).
+
+    Parameters
+    ----------
+    path : str
+        Path to the file (*.prom for the textfile collector).
+    samples : iterable(Sample)
+        Samples (see get_samples).
+
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(format_samples(samples))
+    os.replace(temp_path, path)
@@ -1,75 +1,116 @@
 """ Command line tool to migrate data into pata.models.units models """
+# pylint: disable=too-many-lines
 import json
 import os
-import sys
+import re
+import runpy
 
-from argparse import (
-    ArgumentParser,
-    Namespace,
+from collections import (
+    Counter,
+    defaultdict,
     )
-from collections import defaultdict
-from datetime import date
+from datetime import (
+    date,
+    datetime,
+    )
+from glob import glob
+from itertools import islice
 from pprint import pformat
 from typing import (
     Any,
+    Container,
     Dict,
+    Iterable,
+    Iterator,
     List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
     Union,
     )
 
-from sqlalchemy import create_engine
+from sqlalchemy import (
+    and_,
+    bindparam,
+    create_engine,
+    event,
+    func,
+    )
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import (
+    configure_mappers,
+    selectinload,
+    sessionmaker,
+    )
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool
 
+from pata.checkpoint import Checkpoint
 from pata.config import (
+    CHECKPOINT_PATH,
     DATABASES,
     get_database_url,
     LOGGER as logger,
-    ROOT_LOGGER as root_logger,
+    MANIFEST_PATH,
+    REPEATED_STATEMENT_LIMIT,
+    set_pragmas,
+    setup_logging,
+    SLOW_STATEMENT_MS,
+    )
+from pata.instrumentation import StatementStats
+from pata.manifest import (
+    get_file_digest,
+    Manifest,
+    )
+from pata.metrics import (
+    get_samples,
+    RESULTS,
+    write_samples,
     )
 from pata.models.units import (
     UnitChanges,
+    UnitLatestVersions,
     Units,
     UnitVersions,
     )
+from pata.models.utils import get_values_getter
+from pata.models.values import (
+    get_class_columns,
+    UnitChangeValue,
+    UnitValue,
+    UnitVersionValue,
+    )
+from pata.report import (
+    DiffReport,
+    open_report,
+    )
+from pata.timing import PhaseTimer
 
 
-def create_parser(args: List[str]) -> Namespace:
-    """
-    Create parser to call units migrations from the command line.
+# Maximum amount of names sent in a single "IN (...)" clause
+# (SQLite limits the amount of bound parameters per statement).
+PREFETCH_CHUNK_SIZE = 500
 
-    Parameters
-    ----------
-    args : list(str)
-        List of commands to parse.
+# Amount of characters read from the source file at a time when streaming.
+READ_CHUNK_SIZE = 64 * 1024
 
-    Returns
-    -------
-    ArgumentParser
+NON_WHITESPACE = re.compile(r"\S")
 
-    """
-    parser_obj = ArgumentParser()
+# Characters that can continue a JSON number.
+NUMBER_CHARACTERS = frozenset(".eE+-0123456789")
+
+# Date in the name of dumps (YYYY-MM-DD, YYYY_MM_DD or YYYYMMDD).
+SOURCE_DATE = re.compile(r"(\d{4})[-_]?(\d{2})[-_]?(\d{2})")
+
+# Migrators by database name, see get_migrator.
+MIGRATORS: Dict[str, "Migrator"] = {}
 
-    # Required positional argument
-    parser_obj.add_argument(
-        "source",
-        help="Path to JSON file with information to update")
-    # Optional/Flags
-    parser_obj.add_argument(
-        "-d", "--diff",
-        action="store_true", default=False,
-        help="Only show differences (no insertd/updat).")
-    parser_obj.add_argument(
-        "-i", "--insert",
-        action="store_true", default=False,
-        help="Only insert new units (no updates)")
-    parser_obj.add_argument(
-        "-u", "--update",
-        action="store_true", default=False,
-        help="Only update new units (no inserts)")
 
-    return parser_obj.parse_args(args)
+class SourceError(ValueError):
+    """ Source file doesn't exist or couldn't be read to the end. """
 
 
 def load_version(path: str) -> Any:
@@ -99,9 +140,167 @@ def load_version(path: str) -> Any:
         return {}
 
 
-def load_to_models(data: Dict[str, Any]) -> Units:
+def _iter_object_items(
+        data_file: TextIO, chunk_size: int = READ_CHUNK_SIZE
+        ) -> Iterator[Tuple[str, Any]]:
     """
-    Load data into pata.models.units models.
+    Yield (key, value) pairs from the top level JSON object in data_file.
+
+    Only the current value (and the unread part of the current chunk)
+    is kept in memory.
+
+    Parameters
+    ----------
+    data_file : file
+        Opened file with a JSON object.
+    chunk_size : int, optional
+        Amount of characters to read at a time.
+
+    Returns
+    -------
+    generator(tuple(str, any))
+
+    Raises
+    ------
+    json.decoder.JSONDecodeError
+
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def read_more() -> bool:
+        nonlocal buffer, eof
+        chunk = data_file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        return not eof
+
+    def next_token(index: int) -> Tuple[str, int]:
+        while True:
+            match = NON_WHITESPACE.search(buffer, index)
+            if match:
+                return match.group(), match.start()
+            if not read_more():
+                raise json.decoder.JSONDecodeError(
+                    "Unexpected end of data", buffer, len(buffer))
+
+    def decode(index: int) -> Tuple[Any, int]:
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, index)
+            except json.decoder.JSONDecodeError:
+                if not read_more():
+                    raise
+                continue
+            # Numbers (e.g. "760." or "1e") might continue in the next
+            # chunk, values are only accepted once followed by a delimiter.
+            match = NON_WHITESPACE.search(buffer, end)
+            if ((match is None or match.group() in NUMBER_CHARACTERS)
+                    and read_more()):
+                continue
+            return value, end
+
+    def expect(token: str, index: int, expected: str) -> None:
+        if token != expected:
+            raise json.decoder.JSONDecodeError(
+                f"Expecting '{expected}'", buffer, index)
+
+    token, index = next_token(0)
+    expect(token, index, "{")
+    token, index = next_token(index + 1)
+    while token != "}":
+        expect(token, index, '"')
+        key, index = decode(index)
+        token, index = next_token(index)
+        expect(token, index, ":")
+        _, index = next_token(index + 1)
+        value, index = decode(index)
+        yield key, value
+
+        # Drop what was already consumed (amortized by chunk_size).
+        if index > chunk_size:
+            buffer, index = buffer[index:], 0
+
+        token, index = next_token(index)
+        if token == ",":
+            token, index = next_token(index + 1)
+            expect(token, index, '"')
+        else:
+            expect(token, index, "}")
+
+    buffer, index = buffer[index + 1:], 0
+    while not NON_WHITESPACE.search(buffer):
+        buffer = ""
+        if not read_more():
+            return
+    raise json.decoder.JSONDecodeError("Extra data", buffer, index)
+
+
+def iter_version(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream information for units from JSON file.
+
+    Same as load_version, but yields (unit name, unit data) pairs one at a
+    time, so memory doesn't depend on the size of the file.
+
+    Errors are logged and raised once the pairs before them are yielded,
+    so callers can discard what they processed (see Migrator.run_iter).
+
+    Parameters
+    ----------
+    path : str
+        Path to JSON file.
+
+    Returns
+    -------
+    generator(tuple(str, dict))
+
+    Raises
+    ------
+    SourceError
+        When the file doesn't exist or has an invalid format.
+
+    """
+    if not os.path.isfile(path):
+        logger.error("File doesn't exist")
+        raise SourceError(f"File doesn't exist: {path}")
+
+    try:
+        with open(path, "r", encoding="utf-8") as data_file:
+            yield from _iter_object_items(data_file, READ_CHUNK_SIZE)
+    except json.decoder.JSONDecodeError as exc:
+        logger.error("Invalid format")
+        raise SourceError(f"Invalid format: {path}") from exc
+
+
+def iter_batches(
+        items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Split items into lists of (at most) size elements.
+
+    Parameters
+    ----------
+    items : iterable
+        Items to split.
+    size : int
+        Maximum amount of items per batch.
+
+    Returns
+    -------
+    generator(list)
+
+    """
+    iterator = iter(items)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def load_to_values(data: Dict[str, Any]) -> UnitValue:
+    """
+    Load data into pata.models.values objects (no ORM objects).
 
     Parameters
     ----------
@@ -110,7 +309,7 @@ def load_to_models(data: Dict[str, Any]) -> Units:
 
     Returns
     -------
-    obj: pata.models.units.Units
+    obj: pata.models.values.UnitValue
 
     Example
     -------
@@ -157,20 +356,11 @@ def load_to_models(data: Dict[str, Any]) -> Units:
     """
     logger.info("Loading %s into model", data.get("name"))
 
-    # Units
-    links = data.get("links") or {}
-    unit = Units(
-        name=data.get("name"),
-        wiki_path=links.get("path"),
-        image_url=links.get("image"),
-        panel_url=links.get("panel"),
-        )
     # UnitVersions
     stats = data.get("stats") or {}
     costs = data.get("costs") or {}
     attributes = data.get("attributes") or {}
-    UnitVersions(
-        unit=unit,
+    version = UnitVersionValue(
         attack=stats.get("attack"),
         health=stats.get("health"),
         gold=costs.get("gold"),
@@ -193,31 +383,88 @@ def load_to_models(data: Dict[str, Any]) -> Units:
         abilities=data.get("abilities"),
         )
     # UnitChanges
-    for day, items in data.get("change_history", {}).items():
-        for change in items:
-            UnitChanges(
-                unit=unit,
-                day=date.fromisoformat(day),
-                description=change,
-                )
+    changes = tuple(
+        UnitChangeValue(day=date.fromisoformat(day), description=change)
+        for day, items in data.get("change_history", {}).items()
+        for change in items
+        )
+    # The version of a new unit is valid since its latest change (unknown
+    # without them), see get_valid_from for the versions of updates.
+    version = version._replace(
+        fingerprint=version.get_fingerprint(),
+        valid_from=max(
+            map(date.fromisoformat, data.get("change_history", {})),
+            default=None))
+    # Units
+    links = data.get("links") or {}
+    unit = UnitValue(
+        name=data.get("name"),
+        wiki_path=links.get("path"),
+        image_url=links.get("image"),
+        panel_url=links.get("panel"),
+        versions=(version,),
+        changes=changes,
+        )
+
+    return unit._replace(fingerprint=unit.get_fingerprint())
+
+
+def load_to_models(data: Dict[str, Any]) -> Units:
+    """
+    Load data into pata.models.units models.
+
+    Same as load_to_values, but creating ORM objects.
+
+    Parameters
+    ----------
+    data : dict
+        Units data (from JSON).
+
+    Returns
+    -------
+    obj: pata.models.units.Units
+
+    """
+    return load_to_values(data).to_model()
+
+
+def same_fingerprint(base: Any, target: Any) -> bool:
+    """
+    Check if both models have the same (known) fingerprint.
+
+    Parameters
+    ----------
+    base : pata.models.*
+        Model object (old/current state).
+    target : pata.models.*
+        Model object (new state).
 
-    return unit
+    Returns
+    -------
+    bool
+
+    """
+    return bool(base.fingerprint) and base.fingerprint == target.fingerprint
 
 
-def models_diff(base: Units, unit: Units) -> Dict[str, Any]:
+def models_diff(
+        base: Units, unit: Union[Units, UnitValue]) -> Dict[str, Any]:
     """
     Get all differences for a unit and its related models.
 
     Doesn't take under consideration missing/deleted/new records
     for Untis and UnitVersions.
 
+    Units and UnitVersions are only compared column by column when their
+    fingerprints don't match.
+
     For UnitChanges, doesn't look for differences, only for new records.
 
     Parameters
     ----------
     base : pata.models.units.Units
         Units objects (old/current state).
-    unit : pata.models.units.Units
+    unit : pata.models.units.Units or pata.models.values.UnitValue
         Units objects (new state).
 
     Returns
@@ -247,9 +494,11 @@ def models_diff(base: Units, unit: Units) -> Dict[str, Any]:
 
     """
     result: Dict[str, Any] = defaultdict(dict)
-    result["units"].update(base.diff(unit))
+    result["units"].update(
+        {} if same_fingerprint(base, unit) else base.diff(unit))
 
-    if unit.versions:
+    if unit.versions and not same_fingerprint(
+            base.versions[0], unit.versions[0]):
         result["unit_versions"].update(base.versions[0].diff(unit.versions[0]))
 
     base_days = [base_change.day for base_change in base.changes]
@@ -261,23 +510,244 @@ def models_diff(base: Units, unit: Units) -> Dict[str, Any]:
     return dict(result)
 
 
-def process_transaction(
-        session: Session, unit: Units,
-        insert: bool = False, update: bool = False
+def prefetch_units(
+        session: Session, names: Iterable[str]) -> Dict[str, Units]:
+    """
+    Load all existing units for names (with versions and changes).
+
+    Queries are sent in chunks of PREFETCH_CHUNK_SIZE names, so the amount
+    of queries depends on the chunks and not on the amount of units.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    names : iterable(str)
+        Names of the units to load.
+
+    Returns
+    -------
+    dict
+
+    Example
+    -------
+    output:
+        {
+            "unit1": pata.models.units.Units,
+            ...
+        }
+
+    """
+    result = {}
+    for chunk in iter_batches(names, PREFETCH_CHUNK_SIZE):
+        query = session.query(Units).options(
+            selectinload(Units.versions),
+            selectinload(Units.changes),
+            selectinload(Units.latest),
+            ).filter(Units.name.in_(chunk))
+        result.update({unit.name: unit for unit in query})
+    return result
+
+
+def bulk_insert_units(
+        session: Session, units: List[Union[Units, UnitValue]],
+        ) -> Dict[str, int]:
+    """
+    Insert new units, with their versions and changes, in bulk.
+
+    Each table is written with a single executemany (Core insert), without
+    going through the ORM unit of work. Primary keys for units (and their
+    latest version) are resolved with one query per PREFETCH_CHUNK_SIZE units.
+    Versions without a known validity are valid since today.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    units : list(pata.models.units.Units or pata.models.values.UnitValue)
+        Units objects (not in the database).
+
+    Returns
+    -------
+    dict
+        Ids of the new units by name.
+
+    """
+    if not units:
+        return {}
+
+    tables = Units.metadata.tables
+    session.execute(
+        tables["units"].insert(),
+        [{**unit.get_values(), "fingerprint": unit.fingerprint}
+         for unit in units])
+
+    unit_ids = {}
+    for chunk in iter_batches(
+            (unit.name for unit in units), PREFETCH_CHUNK_SIZE):
+        unit_ids.update(
+            session.query(Units.name, Units.id).filter(Units.name.in_(chunk)))
+
+    versions: List[Dict[str, Any]] = []
+    changes: List[Dict[str, Any]] = []
+    for unit in units:
+        unit_id = unit_ids[unit.name]
+        versions.extend(
+            {**version.get_values(),
+             "fingerprint": version.fingerprint,
+             "valid_from": version.valid_from or date.today(),
+             "valid_to": version.valid_to, "unit_id": unit_id}
+            for version in unit.versions)
+        changes.extend(
+            {**change.get_values(), "unit_id": unit_id}
+            for change in unit.changes)
+
+    if versions:
+        session.execute(tables["unit_versions"].insert(), versions)
+        latest = get_latest_versions(session, unit_ids.values())
+        if latest:
+            session.execute(tables["unit_latest_version"].insert(), latest)
+    if changes:
+        session.execute(tables["unit_changes"].insert(), changes)
+
+    return unit_ids
+
+
+def get_latest_versions(
+        session: Session, unit_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """
+    Get the newest version of units (rows for UnitLatestVersions).
+
+    Resolved with one query per PREFETCH_CHUNK_SIZE units.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    unit_ids : iterable(int)
+        Ids of the units.
+
+    Returns
+    -------
+    list(dict)
+
+    Example
+    -------
+    output:
+        [
+            {"unit_id": 1, "version_id": 10},
+            ...
+        ]
+
+    """
+    latest: List[Dict[str, Any]] = []
+    for chunk in iter_batches(unit_ids, PREFETCH_CHUNK_SIZE):
+        latest.extend(
+            {"unit_id": unit_id, "version_id": version_id}
+            for unit_id, version_id in session.query(
+                UnitVersions.unit_id, func.max(UnitVersions.id)
+                ).filter(UnitVersions.unit_id.in_(chunk)).group_by(
+                    UnitVersions.unit_id))
+    return latest
+
+
+def get_valid_from(
+        changes: Iterable[Any], known_days: Container[Optional[date]],
+        default: date) -> date:
+    """
+    Get the day a new version of an existing unit is valid since.
+
+    Only changes that aren't stored yet date the version: stats can change
+    without a new change (and older changes predate the current version).
+
+    Parameters
+    ----------
+    changes : iterable
+        Changes of the unit in the source (UnitChanges or UnitChangeValue).
+    known_days : container
+        Days of the changes already stored for the unit.
+    default : date
+        Day without new changes (date of the run or the dump).
+
+    Returns
+    -------
+    date
+
+    """
+    return max(
+        (change.day for change in changes if change.day not in known_days),
+        default=default)
+
+
+def close_version(previous: UnitVersions, version: UnitVersions) -> None:
+    """
+    End the validity of previous when version replaces it.
+
+    version is valid since its valid_from (today when unknown), but never
+    before previous, so the validity of versions doesn't overlap. previous
+    is valid until then (an empty range when both start the same day).
+
+    Parameters
+    ----------
+    previous : pata.models.units.UnitVersions
+        UnitVersions object (current latest version).
+    version : pata.models.units.UnitVersions
+        UnitVersions object (new latest version).
+
+    """
+    valid_from = version.valid_from or date.today()
+    if previous.valid_from is not None:
+        valid_from = max(valid_from, previous.valid_from)
+    version.valid_from = valid_from
+    previous.valid_to = valid_from
+
+
+def set_latest_version(unit: Units, version: UnitVersions) -> None:
+    """
+    Mark version as the latest one for unit (see UnitLatestVersions).
+
+    Parameters
+    ----------
+    unit : pata.models.units.Units
+        Units object.
+    version : pata.models.units.UnitVersions
+        UnitVersions object (new latest version).
+
+    """
+    if unit.latest is None:
+        unit.latest = UnitLatestVersions(version=version)
+    else:
+        unit.latest.version = version
+
+
+def process_transaction(  # pylint: disable=too-many-arguments
+        session: Session, unit: Union[Units, UnitValue],
+        insert: bool = False, update: bool = False,
+        existing_units: Optional[Mapping[Any, Units]] = None,
+        new_units: Optional[List[Union[Units, UnitValue]]] = None,
         ) -> Dict[str, Dict[str, Dict[str, Union[str, int]]]]:
     """
     Apply all changes based on the parameters received.
 
+    Model objects are only created (from values) when they need to be
+    inserted/updated.
+
     Parameters
     ----------
     session : sqlalchemy.orm.session.Session
         SQLAlchemy session object.
-    unit : pata.models.units.Units
+    unit : pata.models.units.Units or pata.models.values.UnitValue
         Units objects.
     insert : bool, optional
         Process inserts. Defaults to False.
     update : bool, optional
         Process updates. Defaults to False.
+    existing_units : dict, optional
+        Existing units by name (see prefetch_units).
+        When not provided, the unit is queried from the database.
+    new_units : list, optional
+        Units to insert are appended here (see bulk_insert_units),
+        instead of being added to the session.
 
     Returns
     -------
@@ -297,9 +767,16 @@ def process_transaction(
         }
 
     """
-    existing = session.query(Units).filter_by(name=unit.name).first()
+    if existing_units is None:
+        existing = session.query(Units).filter_by(name=unit.name).first()
+    else:
+        existing = existing_units.get(unit.name)
     if not existing:
-        insert and session.add(unit)  # pylint: disable=expression-not-assigned
+        if insert and new_units is not None:
+            new_units.append(unit)
+        elif insert:
+            session.add(
+                unit.to_model() if isinstance(unit, UnitValue) else unit)
         return {"insert": {}}
 
     diff = models_diff(existing, unit)
@@ -307,10 +784,20 @@ def process_transaction(
         # Update specific fields when a field from Units model changes
         for key, value in diff.get("units", {}).items():
             setattr(existing, key, value.get("new"))
+        if diff.get("units", {}):
+            existing.fingerprint = existing.get_fingerprint()
 
         # Always insert a new record when UnitVersions changes
         if diff.get("unit_versions", {}):
-            existing.versions.append(unit.versions[0].copy())
+            version = unit.versions[0].copy()
+            version.fingerprint = version.get_fingerprint()
+            version.valid_from = get_valid_from(
+                unit.changes, {change.day for change in existing.changes},
+                date.today())
+            if existing.versions:
+                close_version(existing.versions[0], version)
+            existing.versions.append(version)
+            set_latest_version(existing, version)
 
         # Always insert a new record when UnitChanges changes
         new_changes = [
@@ -329,21 +816,334 @@ def process_transaction(
     return {"update": diff} if updated else {"nochange": {}}
 
 
-def run(
-        data: Dict[str, Any],
-        insert: bool = False, update: bool = False
-        ) -> Dict[str, Any]:
+def iter_units(
+        session: Session,
+        items: Iterable[Tuple[str, Dict[str, Any]]],
+        insert: bool, update: bool,
+        timer: Optional[PhaseTimer] = None,
+        ) -> Iterator[Tuple[str, Dict[str, Any]]]:
     """
-    Insert/Update information in data into the database.
+    Insert/Update units (without committing), in chunks of
+    PREFETCH_CHUNK_SIZE units, yielding the result of every unit.
 
-    Returns the summary of changes.
+    Results are yielded once their chunk is in the session (new units
+    already inserted), so the caller can commit between any two of them.
+    The time taken by the caller isn't added to the phases.
 
     Parameters
     ----------
-    data : dict
-        Information to insert/update.
-    unit : pata.models.units.Units
-        Units objects.
+    session : sqlalchemy.orm.session.Session
+        Database session.
+    items : iterable(tuple(str, dict))
+        (unit name, unit data) pairs.
+    insert : bool
+        Process inserts.
+    update : bool
+        Process updates.
+    timer : pata.timing.PhaseTimer, optional
+        Times the load, prefetch, diff and flush phases.
+
+    Returns
+    -------
+    generator(tuple(str, dict))
+        (unit name, result) pairs (see process_transaction).
+
+    """
+    if timer is None:
+        timer = PhaseTimer()
+    for batch in iter_batches(items, PREFETCH_CHUNK_SIZE):
+        with timer.phase("load", len(batch)):
+            units = [load_to_values(unit_data) for _, unit_data in batch]
+        with timer.phase("prefetch", len(batch)):
+            existing_units = prefetch_units(
+                session, [unit.name for unit in units if unit.name])
+        new_units: List[Union[Units, UnitValue]] = []
+        with timer.phase("diff", len(batch)):
+            results = [
+                (unit_name, process_transaction(
+                    session, unit, insert, update, existing_units, new_units))
+                for (unit_name, _), unit in zip(batch, units)
+                ]
+        with timer.phase("flush", len(new_units)):
+            bulk_insert_units(session, new_units)
+        yield from results
+
+
+def process_batches(  # pylint: disable=too-many-arguments
+        session: Session,
+        items: Iterable[Tuple[str, Dict[str, Any]]],
+        insert: bool, update: bool,
+        batch_size: Optional[int], timer: PhaseTimer,
+        manifest: Optional[Manifest] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        commit: bool = True,
+        ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Insert/Update units in batches, yielding the result of every unit
+    (see iter_units).
+
+    The changes of every batch are flushed and, unless told otherwise,
+    committed (accepting the manifest, advancing the checkpoint and
+    clearing the session).
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        Database session.
+    items : iterable(tuple(str, dict))
+        (unit name, unit data) pairs.
+    insert : bool
+        Process inserts.
+    update : bool
+        Process updates.
+    batch_size : int or None
+        Units per batch (None for a single batch).
+    timer : pata.timing.PhaseTimer
+        Times the phases, including the flush and commit of changes.
+    manifest : pata.manifest.Manifest, optional
+        Digests from previous runs, unchanged units are skipped.
+    checkpoint : pata.checkpoint.Checkpoint, optional
+        Progress through the source units, advanced per batch.
+    commit : bool, optional
+        Commit every batch. Defaults to True.
+
+    Returns
+    -------
+    generator(tuple(str, dict))
+
+    """
+    for group in iter_batches(items, batch_size) if batch_size else [items]:
+        counts: Counter[str] = Counter()
+        for unit_name, result in iter_units(
+                session,
+                group if manifest is None else manifest.changed_items(group),
+                insert, update, timer):
+            counts.update(result.keys())
+            yield unit_name, result
+        logger.info("Diff/Changes: %s", dict(counts))
+        changed = (update or insert) and bool(
+            counts["insert"] or counts["update"])
+        if changed:
+            with timer.phase("flush"):
+                session.flush()
+        if not commit:
+            continue
+        if changed:
+            with timer.phase("commit", 1):
+                session.commit()
+            logger.info("Session: Committed")
+        if manifest is not None and insert and update:
+            manifest.commit()
+        if batch_size:
+            if checkpoint is not None and (insert or update):
+                checkpoint.advance(list(group))
+            # Keep the identity map bounded to a single batch.
+            session.expunge_all()
+    if commit and checkpoint is not None and (insert or update):
+        checkpoint.clear()
+
+
+def get_source_date(path: str) -> datetime:
+    """
+    Get the date of a dump, from its file name (e.g. units-2020-01-31.json or
+    units_20200131.json) or, when missing, its modification time.
+
+    Parameters
+    ----------
+    path : str
+        Path to the dump.
+
+    Returns
+    -------
+    datetime
+
+    """
+    match = SOURCE_DATE.search(os.path.basename(path))
+    if match:
+        try:
+            year, month, day = map(int, match.groups())
+            return datetime(year, month, day)
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def find_sources(source: str) -> List[str]:
+    """
+    Find the dumps (JSON files) in a directory or matching a glob,
+    in chronological order (see get_source_date).
+
+    Parameters
+    ----------
+    source : str
+        Directory or glob pattern.
+
+    Returns
+    -------
+    list(str)
+
+    """
+    pattern = (
+        os.path.join(source, "*.json") if os.path.isdir(source) else source)
+    paths = [path for path in glob(pattern) if os.path.isfile(path)]
+    return sorted(paths, key=lambda path: (get_source_date(path), path))
+
+
+def count_results(result: Mapping[str, Any]) -> Dict[str, int]:
+    """
+    Count units by result (insert, update, nochange).
+
+    Parameters
+    ----------
+    result : dict
+        Result by unit name (see iter_units).
+
+    Returns
+    -------
+    dict
+
+    Example
+    -------
+    output:
+        {"insert": 1, "update": 0, "nochange": 2}
+
+    """
+    counts = dict.fromkeys(RESULTS, 0)
+    for item in result.values():
+        for key in item:
+            if key in counts:
+                counts[key] += 1
+    return counts
+
+
+def summarize(
+        changes: Dict[str, Any], diff: bool, phases: Dict[str, Any],
+        statements: Optional[Dict[str, Any]] = None,
+        status: str = "Done") -> Dict[str, Any]:
+    """
+    Log the phases timed and create the summary of a command.
+
+    Parameters
+    ----------
+    changes : dict
+        Diff result.
+    diff : bool
+        Return the diff result instead of the status and the phases.
+    phases : dict
+        Phases of the command (see pata.timing.PhaseTimer.summary).
+    statements : dict, optional
+        Statements executed (see pata.instrumentation.StatementStats),
+        returned in both cases.
+    status : str, optional
+        Status of the command. Defaults to "Done".
+
+    Returns
+    -------
+    dict
+
+    """
+    logger.info("Phases:\n%s", pformat(phases))
+    if statements is not None:
+        logger.info("Statements:\n%s", pformat(statements))
+
+    if diff:
+        if statements is None:
+            return changes
+        return {"changes": changes, "statements": statements}
+    result = {"status": status, "phases": phases}
+    if statements is not None:
+        result["statements"] = statements
+    return result
+
+
+def write_metrics(
+        path: Optional[str], database: str, counts: Mapping[str, int],
+        phases: Dict[str, Any],
+        statements: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Write the metrics of a command (see pata.metrics), unless path is empty.
+
+    Parameters
+    ----------
+    path : str or None
+        Path to the (.prom) file.
+    database : str
+        Database name (label of all samples).
+    counts : dict
+        Amount of units by result.
+    phases : dict
+        Phases of the command (see pata.timing.PhaseTimer.summary).
+    statements : dict, optional
+        Statements executed (see pata.instrumentation.StatementStats).
+
+    """
+    if path:
+        write_samples(path, get_samples(
+            counts, phases, statements, labels={"database": database}))
+
+
+class UnitState(NamedTuple):
+    """ Latest known state of a unit while processing several dumps. """
+    unit_id: Optional[int]
+    fingerprint: Optional[str]
+    version_fingerprint: Optional[str]
+    days: Set[Optional[date]]
+    valid_from: Optional[date] = None
+
+
+def load_state(session: Session) -> Dict[Any, UnitState]:
+    """
+    Load the latest state of all units (one query per table).
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+
+    Returns
+    -------
+    dict
+
+    """
+    versions = {
+        unit_id: (fingerprint, valid_from)
+        for unit_id, fingerprint, valid_from in session.query(
+            UnitLatestVersions.unit_id, UnitVersions.fingerprint,
+            UnitVersions.valid_from)
+        .join(UnitVersions, UnitVersions.id == UnitLatestVersions.version_id)
+        }
+    days: Dict[int, Set[Optional[date]]] = defaultdict(set)
+    for unit_id, day in session.query(UnitChanges.unit_id, UnitChanges.day):
+        days[unit_id].add(day)
+    state = {}
+    for unit_id, name, fingerprint in session.query(
+            Units.id, Units.name, Units.fingerprint):
+        version_fingerprint, valid_from = versions.get(unit_id, (None, None))
+        state[name] = UnitState(
+            unit_id, fingerprint, version_fingerprint, days[unit_id],
+            valid_from)
+    return state
+
+
+def process_source(  # pylint: disable=too-many-locals
+        session: Session, path: str, state: Dict[Any, UnitState],
+        insert: bool = False, update: bool = False,
+        ) -> Dict[str, int]:
+    """
+    Apply a dump against the latest state of the units.
+
+    Only the differences (new units, units, versions and changes) are
+    written, in bulk, after the whole dump is compared. The state is
+    updated to the content of the dump.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    path : str
+        Path to the dump.
+    state : dict
+        Latest state by unit name (see load_state).
     insert : bool, optional
         Process inserts. Defaults to False.
     update : bool, optional
@@ -356,81 +1156,813 @@ def run(
     Example
     -------
     output:
-        {
-            "unit1":
-                {
-                    "update":
-                        {
-                            "column1": "change1",
-                            "column2": "change2",
-                            "2000-01-01": {"column3": "change3"},
-                            ...
-                        }
-                },
+        {"insert": 1, "update": 2, "nochange": 3}
+
+    """
+    # Without inserts/updates the state follows the dumps (diff only).
+    track_new = insert or not update
+    track_existing = update or not insert
+    result = {"insert": 0, "update": 0, "nochange": 0}
+    new_units: List[Union[Units, UnitValue]] = []
+    units: List[Dict[str, Any]] = []
+    versions: List[Dict[str, Any]] = []
+    changes: List[Dict[str, Any]] = []
+    day = get_source_date(path).date()
+    for _, unit_data in iter_version(path):
+        unit = load_to_values(unit_data)
+        current = state.get(unit.name)
+        unit = set_valid_from(unit, day, current)
+        version = unit.versions[0]
+        if current is None:
+            result["insert"] += 1
+            if insert:
+                new_units.append(unit)
+            if track_new:
+                state[unit.name] = UnitState(
+                    None, unit.fingerprint, version.fingerprint,
+                    {change.day for change in unit.changes},
+                    version.valid_from)
+            continue
+
+        new_changes = [
+            change for change in unit.changes
+            if change.day not in current.days]
+        new_unit = unit.fingerprint != current.fingerprint
+        new_version = version.fingerprint != current.version_fingerprint
+        if not (new_unit or new_version or new_changes):
+            result["nochange"] += 1
+            continue
+
+        result["update"] += 1
+        if update and current.unit_id is not None:
+            if new_unit:
+                units.append({
+                    **unit.get_values(), "fingerprint": unit.fingerprint,
+                    "_id": current.unit_id})
+            if new_version:
+                versions.append({
+                    **version.get_values(),
+                    "fingerprint": version.fingerprint,
+                    "valid_from": version.valid_from,
+                    "unit_id": current.unit_id})
+            changes.extend(
+                {**change.get_values(), "unit_id": current.unit_id}
+                for change in new_changes)
+        if track_existing:
+            current.days.update(change.day for change in new_changes)
+            state[unit.name] = current._replace(
+                fingerprint=unit.fingerprint,
+                version_fingerprint=version.fingerprint,
+                valid_from=(
+                    version.valid_from if new_version
+                    else current.valid_from))
+
+    for name, unit_id in bulk_insert_units(session, new_units).items():
+        state[name] = state[name]._replace(unit_id=unit_id)
+    write_deltas(session, units, versions, changes)
+
+    return result
+
+
+def set_valid_from(
+        unit: UnitValue, day: date, current: Optional[UnitState],
+        ) -> UnitValue:
+    """
+    Set the validity of the version of a unit from a dump (see
+    get_valid_from and close_version).
+
+    Parameters
+    ----------
+    unit : pata.models.values.UnitValue
+        Unit from the dump.
+    day : date
+        Date of the dump, for versions without (new) changes.
+    current : UnitState or None
+        Latest state of the unit (None for new units).
+
+    Returns
+    -------
+    pata.models.values.UnitValue
+
+    """
+    version = unit.versions[0]
+    if current is None:
+        valid_from = version.valid_from or day
+    else:
+        valid_from = get_valid_from(unit.changes, current.days, day)
+        if current.valid_from is not None:
+            valid_from = max(valid_from, current.valid_from)
+    return unit._replace(versions=(version._replace(valid_from=valid_from),))
+
+
+def write_deltas(
+        session: Session, units: List[Dict[str, Any]],
+        versions: List[Dict[str, Any]], changes: List[Dict[str, Any]],
+        ) -> None:
+    """
+    Write changes for existing units in bulk (one executemany per table).
+
+    The latest versions of the units with new versions are valid until the
+    new ones are.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    units : list(dict)
+        New values for units (with their id as "_id").
+    versions : list(dict)
+        New versions (with their valid_from).
+    changes : list(dict)
+        New changes.
+
+    """
+    tables = Units.metadata.tables
+    if units:
+        table = tables["units"]
+        session.execute(
+            table.update().where(table.c.id == bindparam("_id")), units)
+    if versions:
+        table = tables["unit_versions"]
+        session.execute(
+            table.update().where(and_(
+                table.c.unit_id == bindparam("_unit_id"),
+                table.c.valid_to.is_(None))).values(
+                    valid_to=bindparam("_valid_to")),
+            [{"_unit_id": version["unit_id"],
+              "_valid_to": version["valid_from"]} for version in versions])
+        session.execute(table.insert(), versions)
+        table = tables["unit_latest_version"]
+        unit_ids = [version["unit_id"] for version in versions]
+        latest = get_latest_versions(session, unit_ids)
+        for chunk in iter_batches(unit_ids, PREFETCH_CHUNK_SIZE):
+            session.execute(table.delete().where(table.c.unit_id.in_(chunk)))
+        session.execute(table.insert(), latest)
+    if changes:
+        session.execute(tables["unit_changes"].insert(), changes)
+
+
+class Migrator():
+    """
+    Insert/Update units into a database.
+
+    Owns the engine (and its connection pool) and the session factory for
+    one of the databases in pata.config.DATABASES, so many runs in the same
+    process reuse connections, mappers and column caches instead of setting
+    them up every time.
+
+    The generation is increased by every commit of its sessions, so
+    readers (see pata.repository.UnitRepository) know when cached data is
+    outdated.
+
+    Parameters
+    ----------
+    database : str, optional
+        Name of the database configuration. Defaults to "sqlite".
+
+    """
+
+    def __init__(self, database: str = "sqlite") -> None:
+        setup_logging()
+        self.database = database
+        config = DATABASES.get(database) or {}
+        self.url = get_database_url(config)
+        options: Dict[str, Any] = {}
+        if (config.get("engine") == "sqlite"
+                and config.get("database", "") not in ("", ":memory:")):
+            # pysqlite doesn't pool connections to files by default.
+            options = {
+                "poolclass": QueuePool,
+                "connect_args": {"check_same_thread": False},
+                }
+        self.engine = create_engine(self.url, **options)
+        set_pragmas(self.engine, config.get("pragmas"))
+        self.session_class = sessionmaker(bind=self.engine)
+        self.statements: Optional[StatementStats] = None
+        self.generation = 0
+        event.listen(self.session_class, "after_commit", self.bump_generation)
+        warm_up()
+
+    def close(self) -> None:
+        """ Close all connections of the pool. """
+        self.engine.dispose()
+
+    def bump_generation(  # pylint: disable=unused-argument
+            self, session: Optional[Session] = None) -> None:
+        """ Mark data read before now as outdated (after_commit). """
+        self.generation += 1
+
+    def instrument(self) -> StatementStats:
+        """
+        Record the statements executed by the engine from now on
+        (see pata.instrumentation.StatementStats).
+
+        Statements are recorded per run (see run and run_sources).
+
+        Returns
+        -------
+        pata.instrumentation.StatementStats
+
+        """
+        if self.statements is None:
+            self.statements = StatementStats(
+                SLOW_STATEMENT_MS, REPEATED_STATEMENT_LIMIT)
+            self.statements.attach(self.engine)
+        return self.statements
+
+    def run_iter(  # pylint: disable=too-many-arguments
+            self,
+            data: Union[
+                Mapping[str, Any], Iterable[Tuple[str, Dict[str, Any]]]],
+            insert: bool = False, update: bool = False,
+            manifest: Optional[Manifest] = None,
+            batch_size: Optional[int] = None,
+            checkpoint: Optional[Checkpoint] = None,
+            timer: Optional[PhaseTimer] = None,
+            session: Optional[Session] = None,
+            ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Insert/Update information in data into the database, yielding the
+        result of every unit as soon as it's processed (see iter_units).
+
+        Without a session, the run owns its session: changes are committed
+        (and the session cleared) every batch_size units, or once all units
+        are processed, so a failure only rolls back the current batch.
+        Committed batches are recorded in the checkpoint (if given), which
+        is cleared once all units are processed (a diff without insert or
+        update leaves it untouched). Stopping the iteration
+        early discards the changes of the current batch.
+
+        With a session, the caller controls the transaction: changes are
+        only flushed (per batch), never committed nor rolled back, and the
+        manifest and checkpoint aren't advanced.
+
+        When a manifest is provided, units that didn't change since the last
+        successful run are skipped (not yielded).
+
+        Database and source (see iter_version) errors are raised once the
+        own session is rolled back.
+
+        Parameters
+        ----------
+        data : dict or iterable(tuple(str, dict))
+            Information to insert/update, either a dict by unit name or
+            (unit name, unit data) pairs (see iter_version).
+        insert : bool, optional
+            Process inserts. Defaults to False.
+        update : bool, optional
+            Process updates. Defaults to False.
+        manifest : pata.manifest.Manifest, optional
+            Digests from previous runs, accepted after a run with inserts and
+            updates succeeds.
+        batch_size : int, optional
+            Units per transaction. Defaults to None (single transaction).
+        checkpoint : pata.checkpoint.Checkpoint, optional
+            Progress through the source units, advanced per batch.
+        timer : pata.timing.PhaseTimer, optional
+            Times the phases of the run (see iter_units), including
+            the flush and commit of changes.
+        session : sqlalchemy.orm.session.Session, optional
+            Session of the caller (committed by the caller).
+
+        Returns
+        -------
+        generator(tuple(str, dict))
+            (unit name, result) pairs.
+
+        Example
+        -------
+        output:
+            ("unit1", {"insert": {}})
+            ("unit2", {"update": {"column1": "change1", ...}})
             ...
-        }
 
+        """
+        if timer is None:
+            timer = PhaseTimer()
+        if self.statements is not None:
+            self.statements.reset()
+        items = data.items() if isinstance(data, Mapping) else data
+        if session is not None:
+            yield from process_batches(
+                session, items, insert, update, batch_size, timer, manifest,
+                commit=False)
+            return
+
+        session = self.session_class()
+        logger.info("Session: Opened")
+        try:
+            yield from process_batches(
+                session, items, insert, update, batch_size, timer, manifest,
+                checkpoint)
+        except SQLAlchemyError:
+            session.rollback()
+            if manifest is not None:
+                manifest.rollback()
+            raise
+        except SourceError:
+            session.rollback()
+            # The source wasn't read to the end, its digest isn't saved.
+            if manifest is not None:
+                manifest.rollback()
+            logger.error("Source error. Rolled back.")
+            raise
+        finally:
+            logger.info("Session: Closed")
+            session.close()
+
+    def run(  # pylint: disable=too-many-arguments
+            self,
+            data: Union[
+                Mapping[str, Any], Iterable[Tuple[str, Dict[str, Any]]]],
+            insert: bool = False, update: bool = False,
+            manifest: Optional[Manifest] = None,
+            batch_size: Optional[int] = None,
+            checkpoint: Optional[Checkpoint] = None,
+            timer: Optional[PhaseTimer] = None,
+            report: Optional[DiffReport] = None,
+            ) -> Dict[str, Any]:
+        """
+        Insert/Update information in data into the database (see run_iter).
+
+        Returns the summary of changes, unless a report is given: the
+        changes of every unit are then written to the report as soon as
+        it's processed (nothing is accumulated).
+
+        Database errors are logged (the current batch is rolled back) and
+        the changes up to the error are returned. Source errors are raised
+        (see run_iter).
+
+        Parameters
+        ----------
+        data : dict or iterable(tuple(str, dict))
+            Information to insert/update, either a dict by unit name or
+            (unit name, unit data) pairs (see iter_version).
+        insert : bool, optional
+            Process inserts. Defaults to False.
+        update : bool, optional
+            Process updates. Defaults to False.
+        manifest : pata.manifest.Manifest, optional
+            Digests from previous runs, accepted after a run with inserts and
+            updates succeeds.
+        batch_size : int, optional
+            Units per transaction. Defaults to None (single transaction).
+        checkpoint : pata.checkpoint.Checkpoint, optional
+            Progress through the source units, advanced per batch.
+        timer : pata.timing.PhaseTimer, optional
+            Times the phases of the run (see iter_units), including
+            the flush and commit of changes.
+        report : pata.report.DiffReport, optional
+            Report to stream the changes of every unit to.
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        output:
+            {
+                "unit1":
+                    {
+                        "update":
+                            {
+                                "column1": "change1",
+                                "column2": "change2",
+                                "2000-01-01": {"column3": "change3"},
+                                ...
+                            }
+                    },
+                ...
+            }
+
+        """
+        diff_result: Dict[str, Any] = {}
+        try:
+            for unit_name, result in self.run_iter(
+                    data, insert=insert, update=update, manifest=manifest,
+                    batch_size=batch_size, checkpoint=checkpoint,
+                    timer=timer):
+                if report is None:
+                    diff_result[unit_name] = result
+                else:
+                    report.add_unit(unit_name, result)
+        except SQLAlchemyError as exc:
+            logger.error("DB error. Rolled back.\n%s", exc)
+        if report is None:
+            logger.info("Diff/Changes:\n%s", pformat(diff_result))
+        return diff_result
+
+    def run_command(  # pylint: disable=too-many-arguments,too-many-locals
+            self, path: str,
+            diff: bool = False, insert: bool = False, update: bool = False,
+            force: bool = False, batch_size: Optional[int] = None,
+            resume: bool = False, sql_stats: bool = False,
+            metrics_path: Optional[str] = None, output: Optional[str] = None,
+            ) -> Dict[str, Any]:
+        """
+        Execute command.
+
+        Unless forced, the manifest (see pata.config.MANIFEST_PATH) is used
+        to skip the whole file, or the units, that didn't change since the
+        last successful run with inserts and updates.
+
+        When inserting/updating in batches, progress is recorded in the
+        checkpoint (see pata.config.CHECKPOINT_PATH) and a failed run can be
+        resumed after the last committed batch.
+
+        When path is a directory or a glob, its dumps are processed in
+        chronological order (see run_sources), without manifest, batches or
+        checkpoints, and the diff is summarized per dump.
+
+        A source that doesn't exist or can't be read to the end fails the
+        command: the open transaction is rolled back (batches already
+        committed are kept) and the status is "Failed", with or without
+        diff.
+
+        Wall time, CPU time and items processed by every phase (digest,
+        parse, load, prefetch, diff, flush and commit, see
+        pata.timing.PhaseTimer) are logged, and returned in the summary
+        when the diff isn't requested.
+
+        With sql_stats, the statements executed (see instrument) are
+        summarized too, in both the summary and the diff.
+
+        With a metrics path, the counts of units, phases, statements, rows
+        written and peak memory are written there for Prometheus (see
+        pata.metrics), also when the file is unchanged.
+
+        With an output, the changes of every unit are streamed there as
+        JSON Lines (see pata.report.DiffReport) instead of being kept in
+        memory, and only the counts of units are returned (with or without
+        diff).
+
+        Parameters
+        ----------
+        path : str
+            Path to file (or directory/glob of dumps) to load data from.
+        diff : bool, optional
+            Show diff result. Defaults to False.
+        insert : bool, optional
+            Process inserts. Defaults to False.
+        update : bool, optional
+            Process updates. Defaults to False.
+        force : bool, optional
+            Ignore the manifest. Defaults to False.
+        batch_size : int, optional
+            Units per transaction. Defaults to None (single transaction).
+        resume : bool, optional
+            Skip units committed by a previous (failed) run of the same
+            file. Defaults to False.
+        sql_stats : bool, optional
+            Summarize the statements executed. Defaults to False.
+        metrics_path : str, optional
+            Write metrics of the command to this (.prom) file.
+        output : str, optional
+            Stream the changes to this file ("-" for the standard output).
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        output (without diff):
+            {
+                "status": "Done",
+                "phases": {
+                    "parse": {"wall": 0.25, "cpu": 0.24, "count": 1000},
+                    ...
+                    "total": {"wall": 1.5, "cpu": 1.2, "count": 0},
+                },
+                "statements": {"statements": 12, "per_unit": 0.01, ...},
+            }
+
+        output (with diff and sql_stats):
+            {
+                "changes": {"unit1": {"insert": {}}, ...},
+                "statements": {"statements": 12, "per_unit": 0.01, ...},
+            }
+
+        output (with output):
+            {
+                "status": "Done",
+                "phases": {...},
+                "units": {"insert": 1, "update": 2, "nochange": 3},
+                "output": "changes.jsonl",
+            }
+
+        """
+        timer = PhaseTimer()
+        failed = False
+        if sql_stats or metrics_path:
+            self.instrument()
+        with open_report(output) as report:
+            if os.path.isdir(path) or any(char in path for char in "*?["):
+                try:
+                    changes = self.run_sources(
+                        find_sources(path), insert=insert, update=update,
+                        timer=timer, report=report)
+                except SourceError:
+                    changes, failed = {}, True
+                counts = {
+                    result: sum(
+                        item.get(result, 0) for item in changes.values())
+                    for result in RESULTS
+                    }
+            else:
+                manifest = None
+                with timer.phase("digest", 1):
+                    file_digest = get_file_digest(path)
+                if not force:
+                    manifest = Manifest.load(MANIFEST_PATH, self.url)
+                    if file_digest and file_digest == manifest.file_digest:
+                        logger.info(
+                            "Units unchanged since last run: %s", path)
+                        write_metrics(
+                            metrics_path, self.database, {}, timer.summary())
+                        return {} if diff else {"status": "Unchanged"}
+
+                logger.info("Loading units from: %s", path)
+                items: Iterable[Tuple[str, Dict[str, Any]]] = timer.iterate(
+                    "parse", iter_version(path))
+                checkpoint = None
+                if resume:
+                    checkpoint = Checkpoint.load(
+                        CHECKPOINT_PATH, self.url, file_digest)
+                    items = checkpoint.skip(items)
+                elif batch_size and (insert or update):
+                    checkpoint = Checkpoint(
+                        CHECKPOINT_PATH, self.url, file_digest)
+                try:
+                    changes = self.run(
+                        items, insert=insert, update=update,
+                        manifest=manifest, batch_size=batch_size,
+                        checkpoint=checkpoint, timer=timer, report=report)
+                except SourceError:
+                    changes, failed = {}, True
+
+                if (manifest is not None and insert and update
+                        and not manifest.pending and not manifest.failed):
+                    manifest.file_digest = file_digest
+                    manifest.save()
+                counts = (
+                    count_results(changes) if report is None
+                    else dict(report.counts))
+
+        phases = timer.summary()
+        statements = (
+            None if self.statements is None
+            else self.statements.summary(sum(counts.values())))
+        if failed:
+            return summarize({}, False, phases, statements, "Failed")
+        write_metrics(metrics_path, self.database, counts, phases, statements)
+        if report is None:
+            return summarize(changes, diff, phases, statements)
+        # The changes are in the output, only the counts are summarized.
+        result = summarize({}, False, phases, statements)
+        result.update(units=counts, output=output)
+        return result
+
+    def run_sources(
+            self, paths: Iterable[str],
+            insert: bool = False, update: bool = False,
+            timer: Optional[PhaseTimer] = None,
+            report: Optional[DiffReport] = None,
+            ) -> Dict[str, Any]:
+        """
+        Insert/Update units from several dumps, in the given order.
+
+        The latest state of the units is loaded once and kept in memory,
+        so each dump is compared against the previous one and only the
+        differences are written (in bulk, committed per dump).
+
+        A dump that can't be read to the end is rolled back (previous dumps
+        stay committed) and its SourceError is raised.
+
+        Parameters
+        ----------
+        paths : iterable(str)
+            Paths to the dumps (see find_sources).
+        insert : bool, optional
+            Process inserts. Defaults to False.
+        update : bool, optional
+            Process updates. Defaults to False.
+        timer : pata.timing.PhaseTimer, optional
+            Times loading the state, processing every dump and commits.
+        report : pata.report.DiffReport, optional
+            Report to write the counts of every dump to.
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        output:
+            {
+                "units-2020-01-01.json": {
+                    "insert": 1, "update": 2, "nochange": 3},
+                ...
+            }
+
+        """
+        if timer is None:
+            timer = PhaseTimer()
+        if self.statements is not None:
+            self.statements.reset()
+        session = self.session_class()
+        logger.info("Session: Opened")
+        result = {}
+        try:
+            with timer.phase("state"):
+                state = load_state(session)
+            timer.add("state", 0, 0, len(state))
+            for path in paths:
+                logger.info("Loading units from: %s", path)
+                with timer.phase("process", 1):
+                    result[path] = process_source(
+                        session, path, state, insert, update)
+                logger.info("Diff/Changes: %s %s", path, result[path])
+                if report is not None:
+                    report.add_source(path, result[path])
+                if insert or update:
+                    with timer.phase("commit", 1):
+                        session.commit()
+                    logger.info("Session: Committed")
+        except SQLAlchemyError as exc:
+            session.rollback()
+            logger.error("DB error. Rolling back.\n%s", exc)
+        except SourceError:
+            session.rollback()
+            logger.error("Source error. Rolled back.")
+            raise
+        finally:
+            logger.info("Session: Closed")
+            session.close()
+
+        return result
+
+
+def warm_up() -> None:
     """
-    engine = create_engine(get_database_url(DATABASES.get("sqlite") or {}))
-    session_class = sessionmaker(bind=engine)
-    session = session_class()
-    logger.info("Session: Opened")
-    try:
-        diff_result = {}
-        for unit_name, unit_data in data.items():
-            unit = load_to_models(unit_data)
-            diff_result[unit_name] = process_transaction(
-                session, unit, insert, update)
-
-        diff_changes = (any(filter(
-            lambda item: "insert" in item or "update" in item,  # type: ignore
-            diff_result.values())))
-        logger.info("Diff/Changes:\n%s", pformat(diff_result))
-        if (update or insert) and diff_changes:
-            session.commit()
-            logger.info("Session: Committed")
-    except SQLAlchemyError as exc:
-        session.rollback()
-        logger.error("DB error. Rolling back.\n%s", exc)
-    finally:
-        logger.info("Session: Closed")
-        session.close()
+    Prepare mappers and column caches of all units models.
+
+    Done once, before the first unit is processed (see Migrator).
+
+    """
+    configure_mappers()
+    for model in (Units, UnitVersions, UnitChanges, UnitLatestVersions):
+        get_values_getter(model().get_columns())
+    for value_class in (UnitValue, UnitVersionValue, UnitChangeValue):
+        get_class_columns(value_class)
+
+
+def get_migrator(database: str = "sqlite") -> Migrator:
+    """
+    Get the migrator for a database, created once per process
+    (see MIGRATORS).
+
+    Parameters
+    ----------
+    database : str, optional
+        Name of the database configuration. Defaults to "sqlite".
+
+    Returns
+    -------
+    Migrator
+
+    """
+    migrator = MIGRATORS.get(database)
+    if migrator is None:
+        migrator = MIGRATORS[database] = Migrator(database)
+    return migrator
+
+
+def run(
+        data: Union[
+            Mapping[str, Any], Iterable[Tuple[str, Dict[str, Any]]]],
+        insert: bool = False, update: bool = False,
+        manifest: Optional[Manifest] = None,
+        batch_size: Optional[int] = None,
+        ) -> Dict[str, Any]:
+    """
+    Insert/Update information in data into the default database.
+
+    See Migrator.run.
+
+    Parameters
+    ----------
+    data : dict or iterable(tuple(str, dict))
+        Information to insert/update.
+    insert : bool, optional
+        Process inserts. Defaults to False.
+    update : bool, optional
+        Process updates. Defaults to False.
+    manifest : pata.manifest.Manifest, optional
+        Digests from previous runs.
+    batch_size : int, optional
+        Units per transaction. Defaults to None (single transaction).
+
+    Returns
+    -------
+    dict
+
+    """
+    return get_migrator().run(
+        data, insert=insert, update=update, manifest=manifest,
+        batch_size=batch_size)
+
+
+def run_iter(
+        data: Union[
+            Mapping[str, Any], Iterable[Tuple[str, Dict[str, Any]]]],
+        insert: bool = False, update: bool = False,
+        batch_size: Optional[int] = None,
+        session: Optional[Session] = None,
+        ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Insert/Update information in data into the default database, yielding
+    the result of every unit.
+
+    See Migrator.run_iter.
+
+    Parameters
+    ----------
+    data : dict or iterable(tuple(str, dict))
+        Information to insert/update.
+    insert : bool, optional
+        Process inserts. Defaults to False.
+    update : bool, optional
+        Process updates. Defaults to False.
+    batch_size : int, optional
+        Units per transaction. Defaults to None (single transaction).
+    session : sqlalchemy.orm.session.Session, optional
+        Session of the caller (committed by the caller).
 
-    return diff_result
+    Returns
+    -------
+    generator(tuple(str, dict))
 
+    Example
+    -------
+    input:
+        for unit_name, result in run_iter(iter_version(path), True, True):
+            if "update" in result:
+                notify(unit_name, result["update"])
 
-def run_command(
+    """
+    return get_migrator().run_iter(
+        data, insert=insert, update=update, batch_size=batch_size,
+        session=session)
+
+
+def run_command(  # pylint: disable=too-many-arguments
         path: str,
-        diff: bool = False, insert: bool = False, update: bool = False
+        diff: bool = False, insert: bool = False, update: bool = False,
+        force: bool = False, batch_size: Optional[int] = None,
+        resume: bool = False, sql_stats: bool = False,
+        metrics_path: Optional[str] = None, output: Optional[str] = None,
         ) -> Dict[str, Any]:
     """
-    Execute command.
+    Execute command against the default database.
+
+    See Migrator.run_command.
 
     Parameters
     ----------
     path : str
-        Path to file to load data from.
+        Path to file (or directory/glob of dumps) to load data from.
     diff : bool, optional
         Show diff result. Defaults to False.
     insert : bool, optional
         Process inserts. Defaults to False.
     update : bool, optional
         Process updates. Defaults to False.
+    force : bool, optional
+        Ignore the manifest. Defaults to False.
+    batch_size : int, optional
+        Units per transaction. Defaults to None (single transaction).
+    resume : bool, optional
+        Skip units committed by a previous (failed) run. Defaults to False.
+    sql_stats : bool, optional
+        Summarize the statements executed. Defaults to False.
+    metrics_path : str, optional
+        Write metrics of the command to this (.prom) file.
+    output : str, optional
+        Stream the changes to this file ("-" for the standard output).
 
     Returns
     -------
     dict
 
     """
-    logger.info("Loading units from: %s", path)
-    changes = run(load_version(path), insert=insert, update=update)
-    return changes if diff else {"status": "Done"}
+    return get_migrator().run_command(
+        path, diff=diff, insert=insert, update=update, force=force,
+        batch_size=batch_size, resume=resume, sql_stats=sql_stats,
+        metrics_path=metrics_path, output=output)
 
 
-# Executed when ran from the command line.
+# Executed when ran from the command line (same as pata-migrate-units).
 if __name__ == "__main__":
-    PARSER = create_parser(sys.argv[1:])
-    root_logger.info(
-        pformat(
-            run_command(
-                PARSER.source, PARSER.diff, PARSER.insert, PARSER.update)))
+    runpy.run_module("pata.cli", run_name="__main__", alter_sys=True)
@@ -3,6 +3,7 @@ import unittest
 
 from pata.models.units import (
     UnitChanges,
+    UnitLatestVersions,
     UnitVersions,
     Units,
     )
@@ -24,6 +25,7 @@ class UnitsCleanTests(unittest.TestCase):
             "wiki_path",
             "image_url",
             "panel_url",
+            "fingerprint",
             ]
 
         # When
@@ -83,6 +85,9 @@ class UnitVersionsCleanTests(unittest.TestCase):
             "exhaust_ability",
             "position",
             "abilities",
+            "fingerprint",
+            "valid_from",
+            "valid_to",
             ]
 
         # When
@@ -152,3 +157,42 @@ class UnitChangesCleanTests(unittest.TestCase):
 
         # Then
         self.assertEqual(str(obj), expected_result)
+
+
+class UnitLatestVersionsCleanTests(unittest.TestCase):
+    """ Tests sucess cases for pata.models.UnitLatestVersions model. """
+
+    def test_fields(self):
+        """ Tests database fields. """
+        # Given
+        expected_result = [
+            "created_by",
+            "created_at",
+            "modified_by",
+            "modified_at",
+            "unit_id",
+            "version_id",
+            ]
+
+        # When
+        obj = UnitLatestVersions()
+        columns = [
+            column.name
+            for column in obj.metadata.tables["unit_latest_version"].columns
+            ]
+
+        # Then
+        self.assertEqual(columns, expected_result)
+
+    def test_repr(self):
+        """ Tests string representation. """
+        # Given
+        unit_id = 99
+        version_id = 88
+        expected_result = f"Latest version for {unit_id}: {version_id}"
+
+        # When
+        obj = UnitLatestVersions(unit_id=unit_id, version_id=version_id)
+
+        # Then
+        self.assertEqual(str(obj), expected_result)
@@ -7,7 +7,72 @@ from mock import (
     patch,
     )
 
-from pata.models.utils import CommonMixin
+from pata.models.utils import (
+    COLUMNS_CACHE,
+    CommonMixin,
+    get_fingerprint,
+    get_values_getter,
+    )
+
+
+class ValuesGetterCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.models.utils.get_values_getter """
+
+    def test_getter(self):
+        """ Test values are always returned as a tuple. """
+        # Given
+        obj = MagicMock(field1=1, field2="two")
+        data = {
+            "none": ((), ()),
+            "one": (("field1",), (1,)),
+            "many": (("field2", "field1"), ("two", 1)),
+            }
+
+        # When/Then
+        for name, (columns, expected_result) in data.items():
+            with self.subTest(name):
+                result = get_values_getter(columns)(obj)
+                self.assertEqual(result, expected_result)
+
+    def test_cached(self):
+        """ Test the same getter is returned for the same columns. """
+        # When
+        result1 = get_values_getter(("field1", "field2"))
+        result2 = get_values_getter(("field1", "field2"))
+
+        # Then
+        self.assertIs(result1, result2)
+
+
+class FingerprintCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.models.utils.get_fingerprint """
+
+    def test_stable(self):
+        """ Test same values generate the same hash, regardless of order. """
+        # Given
+        values1 = {"field1": 1, "field2": "value", "field3": None}
+        values2 = {"field3": None, "field2": "value", "field1": 1}
+
+        # When
+        result1 = get_fingerprint(values1)
+        result2 = get_fingerprint(values2)
+
+        # Then
+        self.assertEqual(result1, result2)
+        self.assertEqual(len(result1), 64)
+
+    def test_different(self):
+        """ Test different values generate different hashes. """
+        # Given
+        values1 = {"field1": 1, "field2": True}
+        values2 = {"field1": 1, "field2": False}
+
+        # When
+        result1 = get_fingerprint(values1)
+        result2 = get_fingerprint(values2)
+
+        # Then
+        self.assertNotEqual(result1, result2)
 
 
 class CommonMixinCleanTests(unittest.TestCase):
@@ -51,6 +116,28 @@ class CommonMixinCleanTests(unittest.TestCase):
         # Then
         self.assertEqual(list(result), list(expected_result))
 
+    def test_columns_cached(self):
+        """ Test columns are only calculated once per model. """
+        # Given
+        column = Mock()
+        column.configure_mock(name="field1")
+        mixin_obj = CommonMixin()
+        mixin_obj.__tablename__ = "cachedname"
+        mixin_obj.metadata = MagicMock(
+            tables={mixin_obj.__tablename__: MagicMock(columns=[column])})
+        expected_result = ("field1",)
+        self.addCleanup(
+            COLUMNS_CACHE.pop, (CommonMixin, "cachedname", ()), None)
+
+        # When
+        result1 = mixin_obj.get_columns()
+        mixin_obj.metadata = MagicMock(tables={})
+        result2 = mixin_obj.get_columns()
+
+        # Then
+        self.assertEqual(result1, expected_result)
+        self.assertIs(result2, result1)
+
     @patch("pata.models.utils.CommonMixin.get_columns")
     def test_diff_same(self, columns_mock):
         """ Test no difference with another object. """
@@ -93,6 +180,41 @@ class CommonMixinCleanTests(unittest.TestCase):
         # Then
         self.assertEqual(result, expected_result)
 
+    @patch("pata.models.utils.CommonMixin.get_columns")
+    def test_get_values(self, columns_mock):
+        """ Test values are only returned for the model columns. """
+        # Given
+        mixin_obj = CommonMixin()
+        mixin_obj.field1 = "value1"
+        mixin_obj.field2 = 2
+        mixin_obj.invalid_field = "invalid"
+        expected_result = {"field1": "value1", "field2": 2}
+
+        columns_mock.return_value = ("field1", "field2")
+
+        # When
+        result = mixin_obj.get_values()
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+    @patch("pata.models.utils.CommonMixin.get_columns")
+    def test_get_fingerprint(self, columns_mock):
+        """ Test fingerprint only uses the model columns. """
+        # Given
+        mixin_obj = CommonMixin()
+        mixin_obj.valid_field = "valid"
+        mixin_obj.invalid_field = "invalid"
+        expected_result = get_fingerprint({"valid_field": "valid"})
+
+        columns_mock.return_value = ("valid_field",)
+
+        # When
+        result = mixin_obj.get_fingerprint()
+
+        # Then
+        self.assertEqual(result, expected_result)
+
     @patch("pata.models.utils.CommonMixin.get_columns")
     def test_copy(self, columns_mock):
         """ Test generating a copy of a model. """
@@ -0,0 +1,159 @@
+""" Test for pata.models.values module. """
+import unittest
+
+from datetime import date
+
+from pata.models.units import (
+    UnitChanges,
+    Units,
+    UnitVersions,
+    )
+from pata.models.values import (
+    get_class_columns,
+    UnitChangeValue,
+    UnitValue,
+    UnitVersionValue,
+    )
+
+
+def create_version_value(**values):
+    """ Create a UnitVersionValue with all fields set. """
+    data = dict.fromkeys(get_class_columns(UnitVersionValue), 0)
+    data.update(
+        unit_spell="Unit", frontline=False, fragile=True, blocker=False,
+        prompt=True, position="Top", abilities="ability X")
+    data.update(values)
+    return UnitVersionValue(**data)
+
+
+class UnitChangeValueCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.models.values.UnitChangeValue. """
+
+    def test_columns(self):
+        """ Test columns are the same as the model ones. """
+        # Given
+        value = UnitChangeValue(date(2000, 1, 1), "change1")
+
+        # When
+        result = value.get_columns()
+
+        # Then
+        self.assertEqual(result, UnitChanges().get_columns())
+
+    def test_copy(self):
+        """ Test model object is created with the same values. """
+        # Given
+        value = UnitChangeValue(date(2000, 1, 1), "change1")
+
+        # When
+        result = value.copy()
+
+        # Then
+        self.assertIsInstance(result, UnitChanges)
+        self.assertEqual(result.get_values(), value.get_values())
+
+
+class UnitVersionValueCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.models.values.UnitVersionValue. """
+
+    def test_columns(self):
+        """ Test columns are the same as the model ones. """
+        # Given
+        value = create_version_value()
+
+        # When
+        result = value.get_columns()
+
+        # Then
+        self.assertEqual(result, UnitVersions().get_columns())
+
+    def test_fingerprint(self):
+        """ Test fingerprint is the same as the model one. """
+        # Given
+        value = create_version_value()
+
+        # When
+        result = value.get_fingerprint()
+
+        # Then
+        self.assertEqual(result, value.copy().get_fingerprint())
+
+    def test_equality(self):
+        """ Test values are compared (and hashed) by content. """
+        # Given
+        value1 = create_version_value()
+        value2 = create_version_value()
+        value3 = create_version_value(attack=2)
+
+        # When
+        result = {value1, value2, value3}
+
+        # Then
+        self.assertEqual(value1, value2)
+        self.assertNotEqual(value1, value3)
+        self.assertEqual(len(result), 2)
+
+    def test_copy(self):
+        """ Test model object is created with the same values. """
+        # Given
+        value = create_version_value(
+            fingerprint="hash", valid_from=date(2000, 1, 1),
+            valid_to=date(2000, 2, 1))
+
+        # When
+        result = value.copy()
+
+        # Then
+        self.assertIsInstance(result, UnitVersions)
+        self.assertEqual(result.get_values(), value.get_values())
+        self.assertEqual(result.fingerprint, "hash")
+        self.assertEqual(result.valid_from, date(2000, 1, 1))
+        self.assertEqual(result.valid_to, date(2000, 2, 1))
+
+
+class UnitValueCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.models.values.UnitValue. """
+
+    def test_columns(self):
+        """ Test columns are the same as the model ones. """
+        # Given
+        value = UnitValue("unit1", "path", "image", "panel")
+
+        # When
+        result = value.get_columns()
+
+        # Then
+        self.assertEqual(result, Units().get_columns())
+
+    def test_fingerprint(self):
+        """ Test fingerprint is the same as the model one. """
+        # Given
+        value = UnitValue("unit1", "path", "image", "panel")
+
+        # When
+        result = value.get_fingerprint()
+
+        # Then
+        self.assertEqual(result, value.to_model().get_fingerprint())
+
+    def test_to_model(self):
+        """ Test model objects are created with versions and changes. """
+        # Given
+        version = create_version_value()
+        change = UnitChangeValue(date(2000, 1, 1), "change1")
+        value = UnitValue(
+            "unit1", "path", "image", "panel", fingerprint="hash",
+            versions=(version,), changes=(change,))
+
+        # When
+        result = value.to_model()
+
+        # Then
+        self.assertIsInstance(result, Units)
+        self.assertEqual(result.get_values(), value.get_values())
+        self.assertEqual(result.fingerprint, "hash")
+        self.assertEqual(len(result.versions), 1)
+        self.assertEqual(result.versions[0].get_values(), version.get_values())
+        self.assertIs(result.latest.version, result.versions[0])
+        self.assertEqual(len(result.changes), 1)
+        self.assertEqual(result.changes[0].get_values(), change.get_values())
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Date,
     Integer,
     ForeignKey,
+    Index,
     String,
     )
 from sqlalchemy.orm import relationship
@@ -22,6 +23,7 @@ class Units(BASE, CommonMixin):  # type: ignore
     wiki_path = Column(String(64))
     image_url = Column(String(128))
     panel_url = Column(String(128))
+    fingerprint = Column(String(64))
 
     versions = relationship(
         "UnitVersions",
@@ -29,9 +31,12 @@ class Units(BASE, CommonMixin):  # type: ignore
     changes = relationship(
         "UnitChanges",
         order_by="desc(UnitChanges.day)", back_populates="unit")
+    latest = relationship(
+        "UnitLatestVersions", uselist=False, back_populates="unit")
 
     reserved_fields = (
         "id",
+        "fingerprint",
         "created_by",
         "created_at",
         "modified_by",
@@ -69,12 +74,27 @@ class UnitVersions(BASE, CommonMixin):  # type: ignore
     exhaust_ability = Column(Integer, nullable=False)
     position = Column(String(32))
     abilities = Column(String(256))
+    fingerprint = Column(String(64))
+    # Days the version was valid, from valid_from (included) to valid_to
+    # (excluded, None while it's the latest version).
+    valid_from = Column(Date)
+    valid_to = Column(Date)
 
     unit = relationship("Units", back_populates="versions")
 
+    __table_args__ = (
+        # Units.versions (and latest version lookups)
+        Index("ix_unit_versions_unit_id_id", "unit_id", "id"),
+        # Versions valid on a day (see pata.repository)
+        Index("ix_unit_versions_unit_id_valid_from", "unit_id", "valid_from"),
+        )
+
     reserved_fields = (
         "id",
         "unit_id",
+        "fingerprint",
+        "valid_from",
+        "valid_to",
         "created_by",
         "created_at",
         "modified_by",
@@ -100,6 +120,11 @@ class UnitChanges(BASE, CommonMixin):  # type: ignore
 
     unit = relationship("Units", back_populates="changes")
 
+    __table_args__ = (
+        # Units.changes (change history)
+        Index("ix_unit_changes_unit_id_day", "unit_id", "day"),
+        )
+
     reserved_fields = (
         "id",
         "unit_id",
@@ -112,3 +137,28 @@ class UnitChanges(BASE, CommonMixin):  # type: ignore
     def __repr__(self) -> str:
         """ String representation of model. """
         return f"Change to {self.unit.id} - {self.unit.name} for {self.day}"
+
+
+class UnitLatestVersions(BASE, CommonMixin):  # type: ignore
+    """ UnitLatestVersions model (latest UnitVersions for each Units). """
+    __tablename__ = "unit_latest_version"
+
+    unit_id = Column(Integer, ForeignKey("units.id"), primary_key=True)
+    version_id = Column(
+        Integer, ForeignKey("unit_versions.id"), nullable=False)
+
+    unit = relationship("Units", back_populates="latest")
+    version = relationship("UnitVersions")
+
+    reserved_fields = (
+        "unit_id",
+        "version_id",
+        "created_by",
+        "created_at",
+        "modified_by",
+        "modified_at",
+        )
+
+    def __repr__(self) -> str:
+        """ String representation of model. """
+        return f"Latest version for {self.unit_id}: {self.version_id}"
@@ -1,8 +1,15 @@
 """ Utility models """
+import json
+
 from datetime import datetime
+from functools import lru_cache
+from hashlib import sha256
+from operator import attrgetter
 from typing import (
     Any,
+    Callable,
     Dict,
+    Mapping,
     Tuple,
     Union,
     )
@@ -14,6 +21,53 @@ from sqlalchemy import (
     )
 
 
+# Columns by (model, table name, reserved fields), see CommonMixin.get_columns
+COLUMNS_CACHE: Dict[Tuple[Any, str, Tuple[str, ...]], Tuple[str, ...]] = {}
+
+
+@lru_cache(maxsize=None)
+def get_values_getter(
+        columns: Tuple[str, ...]) -> Callable[[Any], Tuple[Any, ...]]:
+    """
+    Create a function that returns the values of columns as a tuple.
+
+    Parameters
+    ----------
+    columns : tuple(str)
+        Names of the attributes to get.
+
+    Returns
+    -------
+    callable
+
+    """
+    if len(columns) == 1:
+        getter = attrgetter(columns[0])
+        return lambda obj: (getter(obj),)
+    if not columns:
+        return lambda obj: ()
+    return attrgetter(*columns)
+
+
+def get_fingerprint(values: Mapping[str, Any]) -> str:
+    """
+    Generate a stable hash for values (independent of their order).
+
+    Parameters
+    ----------
+    values : dict
+        Values by column name.
+
+    Returns
+    -------
+    str
+
+    """
+    return sha256(
+        json.dumps(values, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+
 class CommonMixin():  # pylint: disable=too-few-public-methods
     """ Mixin for common fields/attributes/methods for all models. """
     created_by = Column(String(64), nullable=False, default="python")
@@ -30,17 +84,54 @@ class CommonMixin():  # pylint: disable=too-few-public-methods
         """
         Get all columns for model (self).
 
+        Calculated once per model (see COLUMNS_CACHE).
+
         Returns
         -------
         tuple(str)
 
         """
-        return (  # type: ignore
-            column.name
-            for column in self.metadata.tables[  # type: ignore
-                self.__tablename__].columns
-            if column.name not in self.reserved_fields
-            )
+        key = (type(self), self.__tablename__, self.reserved_fields)
+        columns = COLUMNS_CACHE.get(key)
+        if columns is None:
+            columns = COLUMNS_CACHE[key] = tuple(
+                column.name
+                for column in self.metadata.tables[  # type: ignore
+                    self.__tablename__].columns
+                if column.name not in self.reserved_fields
+                )
+        return columns
+
+    def get_values(self) -> Dict[str, Any]:
+        """
+        Get values for all columns of model (self).
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        output:
+            {
+                "field_name": 1,
+                ...
+            }
+
+        """
+        columns = self.get_columns()
+        return dict(zip(columns, get_values_getter(columns)(self)))
+
+    def get_fingerprint(self) -> str:
+        """
+        Generate a stable hash for all columns of model (self).
+
+        Returns
+        -------
+        str
+
+        """
+        return get_fingerprint(self.get_values())
 
     def diff(self, target: Any) -> Dict[str, Dict[str, Union[str, int]]]:
         """
@@ -66,15 +157,19 @@ class CommonMixin():  # pylint: disable=too-few-public-methods
             }
 
         """
-        result = {}
-
-        for column in self.get_columns():
-            old_value = getattr(self, column)
-            new_value = getattr(target, column)
-            if old_value != new_value:
-                result[column] = {"old": old_value, "new": new_value}
-
-        return result
+        columns = self.get_columns()
+        getter = get_values_getter(columns)
+        old_values = getter(self)
+        new_values = getter(target)
+        if old_values == new_values:
+            return {}
+
+        return {
+            column: {"old": old_value, "new": new_value}
+            for column, old_value, new_value in zip(
+                columns, old_values, new_values)
+            if old_value != new_value
+            }
 
     def copy(self) -> Any:
         """
@@ -87,6 +182,7 @@ class CommonMixin():  # pylint: disable=too-few-public-methods
 
         """
         obj = type(self)()
-        for column in self.get_columns():
-            setattr(obj, column, getattr(self, column))
+        columns = self.get_columns()
+        for column, value in zip(columns, get_values_getter(columns)(self)):
+            setattr(obj, column, value)
         return obj
@@ -0,0 +1,184 @@
+""" Lightweight (non ORM) representation of units models """
+from datetime import date
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+    )
+
+from pata.models.units import (
+    UnitChanges,
+    UnitLatestVersions,
+    Units,
+    UnitVersions,
+    )
+from pata.models.utils import get_fingerprint
+
+
+# Fields of values that aren't compared columns of the model (reserved
+# fields, see CommonMixin.reserved_fields, and relationships).
+NON_COLUMN_FIELDS = (
+    "fingerprint", "valid_from", "valid_to", "versions", "changes")
+
+
+@lru_cache(maxsize=None)
+def get_class_columns(value_class: Any) -> Tuple[str, ...]:
+    """
+    Get all column fields for a value class.
+
+    Parameters
+    ----------
+    value_class : type
+        Class of value objects.
+
+    Returns
+    -------
+    tuple(str)
+
+    """
+    return tuple(
+        field for field in value_class._fields
+        if field not in NON_COLUMN_FIELDS)
+
+
+def get_columns(value: Tuple[Any, ...]) -> Tuple[str, ...]:
+    """
+    Get all column fields for a value (same as CommonMixin.get_columns).
+
+    Parameters
+    ----------
+    value : pata.models.values.*
+        Value object.
+
+    Returns
+    -------
+    tuple(str)
+
+    """
+    return get_class_columns(type(value))
+
+
+def get_values(value: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Get values for all column fields (same as CommonMixin.get_values).
+
+    Parameters
+    ----------
+    value : pata.models.values.*
+        Value object.
+
+    Returns
+    -------
+    dict
+
+    """
+    return {field: getattr(value, field) for field in get_columns(value)}
+
+
+class UnitChangeValue(NamedTuple):
+    """ Value for pata.models.units.UnitChanges. """
+    day: Optional[date]
+    description: Optional[str]
+
+    def get_columns(self) -> Tuple[str, ...]:
+        """ Get all column fields. """
+        return get_columns(self)
+
+    def get_values(self) -> Dict[str, Any]:
+        """ Get values for all column fields. """
+        return get_values(self)
+
+    def copy(self) -> UnitChanges:
+        """ Create model object with the same values. """
+        return UnitChanges(**self.get_values())
+
+
+class UnitVersionValue(NamedTuple):
+    """ Value for pata.models.units.UnitVersions. """
+    gold: Optional[int]
+    green: Optional[int]
+    blue: Optional[int]
+    red: Optional[int]
+    energy: Optional[int]
+    attack: Optional[int]
+    health: Optional[int]
+    supply: Optional[int]
+    unit_spell: Optional[str]
+    frontline: Optional[bool]
+    fragile: Optional[bool]
+    blocker: Optional[bool]
+    prompt: Optional[bool]
+    stamina: Optional[int]
+    lifespan: Optional[int]
+    build_time: Optional[int]
+    exhaust_turn: Optional[int]
+    exhaust_ability: Optional[int]
+    position: Optional[str]
+    abilities: Optional[str]
+    fingerprint: Optional[str] = None
+    valid_from: Optional[date] = None
+    valid_to: Optional[date] = None
+
+    def get_columns(self) -> Tuple[str, ...]:
+        """ Get all column fields. """
+        return get_columns(self)
+
+    def get_values(self) -> Dict[str, Any]:
+        """ Get values for all column fields. """
+        return get_values(self)
+
+    def get_fingerprint(self) -> str:
+        """ Generate a stable hash (same as the model's). """
+        return get_fingerprint(self.get_values())
+
+    def copy(self) -> UnitVersions:
+        """ Create model object with the same values. """
+        return UnitVersions(
+            **self.get_values(), fingerprint=self.fingerprint,
+            valid_from=self.valid_from, valid_to=self.valid_to)
+
+
+class UnitValue(NamedTuple):
+    """ Value for pata.models.units.Units (with versions and changes). """
+    name: Optional[str]
+    wiki_path: Optional[str]
+    image_url: Optional[str]
+    panel_url: Optional[str]
+    fingerprint: Optional[str] = None
+    versions: Tuple[UnitVersionValue, ...] = ()
+    changes: Tuple[UnitChangeValue, ...] = ()
+
+    def get_columns(self) -> Tuple[str, ...]:
+        """ Get all column fields. """
+        return get_columns(self)
+
+    def get_values(self) -> Dict[str, Any]:
+        """ Get values for all column fields. """
+        return get_values(self)
+
+    def get_fingerprint(self) -> str:
+        """ Generate a stable hash (same as the model's). """
+        return get_fingerprint(self.get_values())
+
+    def to_model(self) -> Units:
+        """
+        Create model object with the same values, versions and changes.
+
+        The first version is the latest one (see UnitLatestVersions).
+
+        Returns
+        -------
+        pata.models.units.Units
+
+        """
+        unit = Units(**self.get_values(), fingerprint=self.fingerprint)
+        for version in self.versions:
+            version.copy().unit = unit
+        if unit.versions:
+            unit.latest = UnitLatestVersions(version=unit.versions[0])
+        for change in self.changes:
+            change.copy().unit = unit
+        return unit
@@ -0,0 +1,114 @@
+""" Diff report of a migration, streamed as JSON Lines. """
+import json
+import sys
+
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    TextIO,
+    )
+
+from pata.metrics import RESULTS
+
+
+# Values the JSON encoder doesn't know (e.g. dates) are written as strings.
+ENCODER = json.JSONEncoder(default=str, ensure_ascii=False)
+
+
+class DiffReport():
+    """
+    Write the result of every unit as soon as it's processed (one JSON
+    object per line), keeping only the counts by result.
+
+    Parameters
+    ----------
+    output : file
+        Text file to write to.
+
+    """
+
+    def __init__(self, output: TextIO) -> None:
+        self.output = output
+        self.counts = dict.fromkeys(RESULTS, 0)
+
+    def add_unit(self, name: str, result: Mapping[str, Any]) -> None:
+        """
+        Write the result of a unit.
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+        result : dict
+            Result of the unit (see pata.migrate_units.process_transaction).
+
+        Example
+        -------
+        input:
+            "unit1", {"update": {"units": {"cost": {"old": 1, "new": 2}}}}
+
+        output (line):
+            {"unit": "unit1", "result": "update", "changes": {"units": ...}}
+
+        """
+        for key, changes in result.items():
+            if key in self.counts:
+                self.counts[key] += 1
+            self.write({"unit": name, "result": key, "changes": changes})
+
+    def add_source(self, path: str, counts: Mapping[str, int]) -> None:
+        """
+        Write the counts of a dump (see pata.migrate_units.process_source).
+
+        Parameters
+        ----------
+        path : str
+            Path to the dump.
+        counts : dict
+            Units by result.
+
+        """
+        for key in RESULTS:
+            self.counts[key] += counts.get(key, 0)
+        self.write({"source": path, **counts})
+
+    def changed(self) -> int:
+        """ Units inserted or updated so far. """
+        return self.counts["insert"] + self.counts["update"]
+
+    def write(self, item: Dict[str, Any]) -> None:
+        """ Write an object as a line. """
+        self.output.write(ENCODER.encode(item))
+        self.output.write("\n")
+
+
+@contextmanager
+def open_report(path: Optional[str]) -> Iterator[Optional[DiffReport]]:
+    """
+    Report written to a file, or to the standard output for "-".
+
+    Parameters
+    ----------
+    path : str or None
+        Path to the file (replaced), or "-". No report (None) without it.
+
+    Returns
+    -------
+    contextmanager(DiffReport or None)
+
+    """
+    if path is None:
+        yield None
+        return
+    if path == "-":
+        try:
+            yield DiffReport(sys.stdout)
+        finally:
+            sys.stdout.flush()
+        return
+    with open(path, "w", encoding="utf-8") as output:
+        yield DiffReport(output)
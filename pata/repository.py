@@ -0,0 +1,500 @@
+"""
+Read access to the units migrated by pata.
+
+Reads are cached in memory (LRU with TTL). The cache is cleared as soon as
+the migrator of the database commits (see
+pata.migrate_units.Migrator.generation), so hot reads are served from memory
+and stay correct after migrations in the same process.
+
+Versions are valid from their valid_from (included) to their valid_to
+(excluded), so the state of units on a day is read with an indexed lookup
+(see valid_on).
+
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    )
+
+from sqlalchemy import (
+    and_,
+    or_,
+    )
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.session import Session
+
+from pata.config import (
+    REPOSITORY_CACHE_SIZE,
+    REPOSITORY_CACHE_TTL,
+    )
+from pata.migrate_units import (
+    get_migrator,
+    Migrator,
+    )
+from pata.models.units import (
+    UnitChanges,
+    UnitLatestVersions,
+    Units,
+    UnitVersions,
+    )
+from pata.models.values import (
+    get_class_columns,
+    UnitChangeValue,
+    UnitValue,
+    UnitVersionValue,
+    )
+
+
+# Cached value of missing units (None is a valid cached value).
+MISSING = object()
+
+
+class LRUCache():
+    """
+    Least recently used cache, whose entries also expire after ttl seconds.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum amount of entries.
+    ttl : float
+        Seconds an entry is kept.
+
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = (
+            OrderedDict())
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Get the value of a key.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the entry.
+
+        Returns
+        -------
+        object
+            MISSING when there's no entry, or it expired.
+
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= monotonic():
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Set the value of a key (the least recently used entry is removed
+        when full).
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the entry.
+        value : object
+            Value to cache.
+
+        """
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """ Remove all entries. """
+        with self.lock:
+            self.entries.clear()
+
+
+class UnitRepository():
+    """
+    Cached reads of units, their latest version and change history, as
+    value objects (see pata.models.values), which are immutable and can be
+    shared by all readers.
+
+    Parameters
+    ----------
+    migrator : pata.migrate_units.Migrator, optional
+        Migrator of the database. Defaults to the one of the default
+        database (see pata.migrate_units.get_migrator).
+    maxsize : int, optional
+        Maximum amount of cached reads. Defaults to REPOSITORY_CACHE_SIZE.
+    ttl : float, optional
+        Seconds a read is cached. Defaults to REPOSITORY_CACHE_TTL.
+
+    """
+
+    def __init__(
+            self, migrator: Optional[Migrator] = None,
+            maxsize: int = REPOSITORY_CACHE_SIZE,
+            ttl: float = REPOSITORY_CACHE_TTL) -> None:
+        self.migrator = migrator or get_migrator()
+        self.cache = LRUCache(maxsize, ttl)
+        self.generation = self.migrator.generation
+
+    def cached(self, key: Hashable, read: Callable[[Session], Any]) -> Any:
+        """
+        Get a read from the cache, or read it from the database.
+
+        The cache is cleared first if the migrator committed since the
+        last read.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the read.
+        read : callable
+            Called with a session when the read isn't cached.
+
+        Returns
+        -------
+        object
+
+        """
+        generation = self.migrator.generation
+        if generation != self.generation:
+            self.cache.clear()
+            self.generation = generation
+        value = self.cache.get(key)
+        if value is MISSING:
+            session = self.migrator.session_class()
+            try:
+                value = read(session)
+            finally:
+                session.close()
+            # Not cached when a commit happened meanwhile (maybe outdated).
+            if self.migrator.generation == generation:
+                self.cache.set(key, value)
+        return value
+
+    def get_unit(self, name: str) -> Optional[UnitValue]:
+        """
+        Get a unit (without versions nor changes).
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+
+        Returns
+        -------
+        pata.models.values.UnitValue or None
+
+        """
+        def read(session: Session) -> Optional[UnitValue]:
+            row = query_units(session).filter(Units.name == name).first()
+            return None if row is None else UnitValue(*row)
+
+        result: Optional[UnitValue] = self.cached(("unit", name), read)
+        return result
+
+    def get_latest_version(self, name: str) -> Optional[UnitVersionValue]:
+        """
+        Get the latest version of a unit.
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+
+        Returns
+        -------
+        pata.models.values.UnitVersionValue or None
+
+        """
+        def read(session: Session) -> Optional[UnitVersionValue]:
+            row = (
+                query_versions(session)
+                .join(
+                    UnitLatestVersions,
+                    UnitLatestVersions.version_id == UnitVersions.id)
+                .join(Units, Units.id == UnitLatestVersions.unit_id)
+                .filter(Units.name == name)
+                .first())
+            return None if row is None else UnitVersionValue(*row)
+
+        result: Optional[UnitVersionValue] = self.cached(
+            ("latest", name), read)
+        return result
+
+    def get_changes(self, name: str) -> Tuple[UnitChangeValue, ...]:
+        """
+        Get the change history of a unit (latest first).
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+
+        Returns
+        -------
+        tuple(pata.models.values.UnitChangeValue)
+            Empty for missing units.
+
+        """
+        def read(session: Session) -> Tuple[UnitChangeValue, ...]:
+            columns = get_class_columns(UnitChangeValue)
+            query = (
+                session.query(
+                    *[getattr(UnitChanges, column) for column in columns])
+                .join(Units, Units.id == UnitChanges.unit_id)
+                .filter(Units.name == name)
+                .order_by(UnitChanges.day.desc(), UnitChanges.id.desc()))
+            return tuple(UnitChangeValue(*row) for row in query)
+
+        result: Tuple[UnitChangeValue, ...] = self.cached(
+            ("changes", name), read)
+        return result
+
+    def get_versions(self, name: str) -> Tuple[UnitVersionValue, ...]:
+        """
+        Get the versions of a unit with a known validity (oldest first).
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+
+        Returns
+        -------
+        tuple(pata.models.values.UnitVersionValue)
+            Empty for missing units.
+
+        """
+        return self.get_timeline(name)[1]
+
+    def get_timeline(self, name: str) -> Tuple[
+            Tuple[date, ...], Tuple[UnitVersionValue, ...]]:
+        """
+        Get the versions of a unit (see get_versions), with the days they
+        are valid from (sorted, for bisect).
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+
+        Returns
+        -------
+        tuple(tuple(date), tuple(pata.models.values.UnitVersionValue))
+
+        """
+        def read(session: Session) -> Tuple[
+                Tuple[date, ...], Tuple[UnitVersionValue, ...]]:
+            versions = tuple(
+                UnitVersionValue(*row) for row in query_versions(session)
+                .join(Units, Units.id == UnitVersions.unit_id)
+                .filter(
+                    Units.name == name, UnitVersions.valid_from.isnot(None))
+                .order_by(UnitVersions.valid_from, UnitVersions.id))
+            # valid_from is never None (filtered), date.min is only for mypy.
+            return (
+                tuple(version.valid_from or date.min for version in versions),
+                versions)
+
+        result: Tuple[Tuple[date, ...], Tuple[UnitVersionValue, ...]] = (
+            self.cached(("timeline", name), read))
+        return result
+
+    def get_unit_as_of(self, name: str, day: date) -> Optional[UnitValue]:
+        """
+        Get a unit with the version it had on a day.
+
+        The version is found by bisecting the cached versions of the unit,
+        so reads of many days cost a single query.
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+        day : date
+            Day of the version.
+
+        Returns
+        -------
+        pata.models.values.UnitValue or None
+            Unit with the version as only version. None for missing units,
+            or units without a version valid on the day.
+
+        """
+        unit = self.get_unit(name)
+        if unit is None:
+            return None
+        days, versions = self.get_timeline(name)
+        # Latest version valid from the day or before (the last one of
+        # versions replaced the same day).
+        index = bisect_right(days, day) - 1
+        if index < 0:
+            return None
+        version = versions[index]
+        if version.valid_to is not None and version.valid_to <= day:
+            return None
+        return unit._replace(versions=(version,))
+
+    def list_units_as_of(self, day: date) -> Tuple[UnitValue, ...]:
+        """
+        List all units (by name) with the version they had on a day.
+
+        Parameters
+        ----------
+        day : date
+            Day of the versions.
+
+        Returns
+        -------
+        tuple(pata.models.values.UnitValue)
+            Units with the version as only version (units without a version
+            valid on the day are left out).
+
+        """
+        def read(session: Session) -> Tuple[UnitValue, ...]:
+            entities = get_version_entities()
+            query = (
+                query_units(session, *entities)
+                .join(UnitVersions, UnitVersions.unit_id == Units.id)
+                .filter(valid_on(day))
+                .order_by(Units.name))
+            size = len(entities)
+            return tuple(
+                UnitValue(*row[size:])._replace(
+                    versions=(UnitVersionValue(*row[:size]),))
+                for row in query)
+
+        result: Tuple[UnitValue, ...] = self.cached(("units", day), read)
+        return result
+
+    def list_units(self) -> Tuple[UnitValue, ...]:
+        """
+        List all units (by name) with their latest version.
+
+        Returns
+        -------
+        tuple(pata.models.values.UnitValue)
+            Units with their latest version as only version (none if they
+            don't have any).
+
+        """
+        def read(session: Session) -> Tuple[UnitValue, ...]:
+            versions = {
+                unit_id: UnitVersionValue(*values)
+                for unit_id, *values in query_versions(
+                    session, UnitLatestVersions.unit_id)
+                .join(
+                    UnitLatestVersions,
+                    UnitLatestVersions.version_id == UnitVersions.id)
+                }
+            result = []
+            for unit_id, *values in query_units(session, Units.id).order_by(
+                    Units.name):
+                unit = UnitValue(*values)
+                version = versions.get(unit_id)
+                result.append(
+                    unit if version is None
+                    else unit._replace(versions=(version,)))
+            return tuple(result)
+
+        result: Tuple[UnitValue, ...] = self.cached(("units",), read)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """ Hits, misses and size of the cache. """
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "size": len(self.cache.entries),
+            }
+
+
+def query_units(session: Session, *entities: Any) -> Query:
+    """
+    Query the columns of units (see UnitValue), after entities.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    *entities : sqlalchemy.Column
+        Columns queried before the ones of units.
+
+    Returns
+    -------
+    sqlalchemy.orm.Query
+
+    """
+    columns = get_class_columns(UnitValue)
+    return session.query(
+        *entities, *[getattr(Units, column) for column in columns],
+        Units.fingerprint)
+
+
+def query_versions(session: Session, *entities: Any) -> Query:
+    """
+    Query the columns of versions (see UnitVersionValue), after entities.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    *entities : sqlalchemy.Column
+        Columns queried before the ones of versions.
+
+    Returns
+    -------
+    sqlalchemy.orm.Query
+
+    """
+    return session.query(*entities, *get_version_entities())
+
+
+def get_version_entities() -> List[Any]:
+    """ Columns of versions, in the order of UnitVersionValue. """
+    columns = get_class_columns(UnitVersionValue)
+    return [
+        *[getattr(UnitVersions, column) for column in columns],
+        UnitVersions.fingerprint,
+        UnitVersions.valid_from,
+        UnitVersions.valid_to,
+        ]
+
+
+def valid_on(day: date) -> Any:
+    """
+    Condition of the versions valid on a day.
+
+    Parameters
+    ----------
+    day : date
+        Day of the versions.
+
+    Returns
+    -------
+    sqlalchemy.sql.elements.BooleanClauseList
+
+    """
+    return and_(
+        UnitVersions.valid_from <= day,
+        or_(UnitVersions.valid_to.is_(None), UnitVersions.valid_to > day))
@@ -0,0 +1,355 @@
+"""
+Columnar snapshot of the stats of all units, for analyses of the whole
+roster.
+
+Every column is stored contiguously: integer stats and costs in arrays,
+the boolean attributes packed as a bitmask per unit and unit_spell/position
+as codes into interned categories. Snapshots are built from a single Core
+SELECT (no ORM objects) and can be converted to NumPy arrays (see
+UnitSnapshot.to_numpy, numpy is optional).
+
+"""
+import sys
+
+from array import array
+from datetime import date
+from itertools import compress
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    )
+
+from sqlalchemy import select
+from sqlalchemy.orm.session import Session
+
+from pata.models.units import (
+    UnitLatestVersions,
+    Units,
+    UnitVersions,
+    )
+from pata.repository import valid_on
+
+
+# Integer columns of versions (array.array typecode "l").
+INT_COLUMNS = (
+    "attack", "health",
+    "gold", "green", "blue", "red", "energy",
+    "supply", "stamina", "lifespan", "build_time", "exhaust_turn",
+    "exhaust_ability",
+    )
+
+# Boolean columns of versions, by bit of the flags of a unit.
+FLAGS = {
+    "frontline": 1,
+    "fragile": 2,
+    "blocker": 4,
+    "prompt": 8,
+    }
+
+# Columns of versions with few distinct values (stored as codes).
+CATEGORY_COLUMNS = ("unit_spell", "position")
+
+
+# Columns of rows for UnitSnapshot.from_rows.
+SNAPSHOT_COLUMNS = (
+    Units.name,
+    *[getattr(UnitVersions, name) for name in INT_COLUMNS],
+    *[getattr(UnitVersions, name) for name in FLAGS],
+    *[getattr(UnitVersions, name) for name in CATEGORY_COLUMNS],
+    )
+
+
+class UnitSnapshot():
+    """
+    Stats of units in columns (one item per unit, in the order of names).
+
+    Parameters
+    ----------
+    names : tuple(str)
+        Unit names.
+    columns : dict
+        array.array of every INT_COLUMNS by name.
+    flags : array.array
+        Bitmask of FLAGS of every unit (typecode "B").
+    codes : dict
+        array.array of every CATEGORY_COLUMNS by name (typecode "I"),
+        indexes of categories.
+    categories : dict
+        Distinct values of every CATEGORY_COLUMNS by name.
+
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, names: Tuple[str, ...], columns: Dict[str, "array[int]"],
+            flags: "array[int]", codes: Dict[str, "array[int]"],
+            categories: Dict[str, Tuple[Optional[str], ...]]) -> None:
+        self.names = names
+        self.columns = columns
+        self.flags = flags
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "UnitSnapshot":
+        """
+        Build a snapshot from rows (see SNAPSHOT_COLUMNS).
+
+        Rows are transposed once, so every column is built in a single
+        pass over its values.
+
+        Parameters
+        ----------
+        rows : iterable(sequence)
+            Name, INT_COLUMNS, FLAGS and CATEGORY_COLUMNS of every unit.
+
+        Returns
+        -------
+        pata.snapshot.UnitSnapshot
+
+        """
+        values = list(zip(*rows)) or [()] * len(SNAPSHOT_COLUMNS)
+        names = values[0]
+        ints = values[1:len(INT_COLUMNS) + 1]
+        bools = values[len(INT_COLUMNS) + 1:-len(CATEGORY_COLUMNS)]
+        strings = values[-len(CATEGORY_COLUMNS):]
+
+        flags = array("B", [0]) * len(names)
+        for bit, column in zip(FLAGS.values(), bools):
+            for index in compress(range(len(names)), column):
+                flags[index] |= bit
+
+        codes = {}
+        categories = {}
+        for name, column in zip(CATEGORY_COLUMNS, strings):
+            indexes: Dict[Optional[str], int] = {}
+            codes[name] = array("I", [
+                indexes.setdefault(value, len(indexes)) for value in column])
+            categories[name] = tuple(
+                value if value is None else sys.intern(value)
+                for value in indexes)
+
+        return cls(
+            tuple(names),
+            {
+                name: array("l", column)
+                for name, column in zip(INT_COLUMNS, ints)
+                },
+            flags, codes, categories)
+
+    def __len__(self) -> int:
+        """ Amount of units. """
+        return len(self.names)
+
+    def column(self, name: str) -> Sequence[Any]:
+        """
+        Get the values of a column.
+
+        Parameters
+        ----------
+        name : str
+            Column name (INT_COLUMNS, FLAGS or CATEGORY_COLUMNS).
+
+        Returns
+        -------
+        sequence
+            array.array for INT_COLUMNS (not a copy), list for the others.
+
+        """
+        if name in FLAGS:
+            bit = FLAGS[name]
+            return [bool(flags & bit) for flags in self.flags]
+        if name in self.codes:
+            categories = self.categories[name]
+            return [categories[code] for code in self.codes[name]]
+        return self.columns[name]
+
+    def where(self, **values: Any) -> List[bool]:
+        """
+        Get which units have all the values.
+
+        Flags are checked at once against the bitmask, and categories by
+        their code (no string comparisons).
+
+        Parameters
+        ----------
+        **values
+            Value by column name.
+
+        Returns
+        -------
+        list(bool)
+            Mask of units (see select).
+
+        Example
+        -------
+        input:
+            where(unit_spell="Unit", fragile=True, attack=1)
+
+        output:
+            [True, False, ...]
+
+        """
+        mask = [True] * len(self)
+        bits = expected = 0
+        for name, value in values.items():
+            if name in FLAGS:
+                bits |= FLAGS[name]
+                expected |= FLAGS[name] if value else 0
+            elif name in self.codes:
+                categories = self.categories[name]
+                if value not in categories:
+                    return [False] * len(self)
+                code = categories.index(value)
+                mask = [
+                    item and other == code
+                    for item, other in zip(mask, self.codes[name])]
+            else:
+                mask = [
+                    item and other == value
+                    for item, other in zip(mask, self.columns[name])]
+        if bits:
+            mask = [
+                item and flags & bits == expected
+                for item, flags in zip(mask, self.flags)]
+        return mask
+
+    def select(self, mask: Iterable[Any]) -> "UnitSnapshot":
+        """
+        Get a snapshot of some units (categories are shared).
+
+        Parameters
+        ----------
+        mask : iterable(bool)
+            Whether every unit is selected (see where).
+
+        Returns
+        -------
+        pata.snapshot.UnitSnapshot
+
+        """
+        mask = list(mask)
+        return UnitSnapshot(
+            tuple(compress(self.names, mask)),
+            {
+                name: array(column.typecode, compress(column, mask))
+                for name, column in self.columns.items()
+                },
+            array(self.flags.typecode, compress(self.flags, mask)),
+            {
+                name: array(codes.typecode, compress(codes, mask))
+                for name, codes in self.codes.items()
+                },
+            self.categories)
+
+    def total(self, name: str) -> int:
+        """ Sum of an integer column. """
+        return sum(self.columns[name])
+
+    def mean(self, name: str) -> Optional[float]:
+        """ Mean of an integer column (None without units). """
+        if not self.names:
+            return None
+        return self.total(name) / len(self.names)
+
+    def totals_by(
+            self, category: str, name: str) -> Dict[Optional[str], int]:
+        """
+        Sum of an integer column by category.
+
+        Parameters
+        ----------
+        category : str
+            Column to group by (CATEGORY_COLUMNS).
+        name : str
+            Column to sum (INT_COLUMNS).
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        input:
+            totals_by("unit_spell", "gold")
+
+        output:
+            {"Unit": 300, "Spell": 50}
+
+        """
+        categories = self.categories[category]
+        totals = [0] * len(categories)
+        for code, value in zip(self.codes[category], self.columns[name]):
+            totals[code] += value
+        return dict(zip(categories, totals))
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Get the columns as NumPy arrays.
+
+        Integer columns and codes share their memory with the snapshot,
+        flags are unpacked to boolean arrays and names are object arrays.
+
+        Returns
+        -------
+        dict
+            numpy.ndarray by column name. Categories are left in
+            categories, indexed by the codes.
+
+        Raises
+        ------
+        ImportError
+            When numpy isn't installed (it isn't a requirement of pata).
+
+        """
+        # pylint: disable=import-error,import-outside-toplevel
+        import numpy
+
+        result: Dict[str, Any] = {"name": numpy.array(self.names, object)}
+        for name, column in self.columns.items():
+            result[name] = numpy.frombuffer(column, f"i{column.itemsize}")
+        flags = numpy.frombuffer(self.flags, numpy.uint8)
+        for name, bit in FLAGS.items():
+            result[name] = (flags & bit) != 0
+        for name, codes in self.codes.items():
+            result[name] = numpy.frombuffer(codes, f"u{codes.itemsize}")
+        return result
+
+
+def load_snapshot(
+        session: Session, day: Optional[date] = None) -> UnitSnapshot:
+    """
+    Load the latest version of all units (by name) in a snapshot.
+
+    Parameters
+    ----------
+    session : sqlalchemy.orm.session.Session
+        SQLAlchemy session object.
+    day : date, optional
+        Load the versions valid on day instead (see pata.repository).
+
+    Returns
+    -------
+    pata.snapshot.UnitSnapshot
+
+    """
+    tables = Units.metadata.tables
+    query = select(SNAPSHOT_COLUMNS)
+    if day is None:
+        query = query.select_from(
+            tables["unit_latest_version"]
+            .join(Units, Units.id == UnitLatestVersions.unit_id)
+            .join(
+                UnitVersions,
+                UnitVersions.id == UnitLatestVersions.version_id))
+    else:
+        query = query.select_from(
+            tables["units"].join(
+                UnitVersions, UnitVersions.unit_id == Units.id)
+            ).where(valid_on(day))
+    return UnitSnapshot.from_rows(
+        session.execute(query.order_by(Units.name)))
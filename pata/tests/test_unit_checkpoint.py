@@ -0,0 +1,129 @@
+""" Unit tests for pata.checkpoint """
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from pata.checkpoint import Checkpoint
+
+
+logging.disable()
+
+
+class CheckpointDirtyTests(unittest.TestCase):
+    """ Tests fail cases for pata.checkpoint.Checkpoint """
+
+    def setUp(self):
+        """ Global variables """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.json")
+
+    def tearDown(self):
+        """ Clean up files """
+        self.directory.cleanup()
+
+    def test_load(self):
+        """ Test empty checkpoint when file can't be used. """
+        # Given
+        valid = {
+            "database": "db", "file_digest": "digest",
+            "last_unit": "unit1", "count": 10,
+            }
+        data = {
+            "missing": (None, "digest"),
+            "invalid": ("{", "digest"),
+            "not_dict": ("[]", "digest"),
+            "other_database": (
+                json.dumps(dict(valid, database="other")), "digest"),
+            "other_file": (json.dumps(valid), "other"),
+            "no_file_digest": (json.dumps(valid), ""),
+            }
+
+        # When/Then
+        for name, (content, file_digest) in data.items():
+            with self.subTest(name):
+                if content is not None:
+                    with open(self.path, "w") as checkpoint_file:
+                        checkpoint_file.write(content)
+
+                result = Checkpoint.load(self.path, "db", file_digest)
+
+                self.assertEqual(result.database, "db")
+                self.assertEqual(result.file_digest, file_digest)
+                self.assertEqual(result.last_unit, "")
+                self.assertEqual(result.count, 0)
+
+    def test_clear_missing(self):
+        """ Test clearing a checkpoint that was never saved. """
+        # Given
+        checkpoint = Checkpoint(self.path, "db", "digest")
+
+        # When
+        checkpoint.clear()
+
+        # Then
+        self.assertFalse(os.path.exists(self.path))
+
+
+class CheckpointCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.checkpoint.Checkpoint """
+
+    def setUp(self):
+        """ Global variables """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.json")
+
+    def tearDown(self):
+        """ Clean up files """
+        self.directory.cleanup()
+
+    def test_advance_load(self):
+        """ Test committed batches are saved and loaded. """
+        # Given
+        checkpoint = Checkpoint(self.path, "db", "digest")
+
+        # When
+        checkpoint.advance([("unit1", {}), ("unit2", {})])
+        checkpoint.advance([])
+        checkpoint.advance([("unit3", {})])
+        result = Checkpoint.load(self.path, "db", "digest")
+
+        # Then
+        self.assertEqual(result.last_unit, "unit3")
+        self.assertEqual(result.count, 3)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_skip(self):
+        """ Test units already committed are skipped. """
+        # Given
+        items = [("unit1", {}), ("unit2", {}), ("unit3", {})]
+        data = {
+            "empty": (0, items),
+            "some": (2, items[2:]),
+            "all": (3, []),
+            }
+
+        # When/Then
+        for name, (count, expected_result) in data.items():
+            with self.subTest(name):
+                checkpoint = Checkpoint(
+                    self.path, "db", "digest", "unit", count)
+
+                result = list(checkpoint.skip(iter(items)))
+
+                self.assertEqual(result, expected_result)
+
+    def test_clear(self):
+        """ Test checkpoint is removed. """
+        # Given
+        checkpoint = Checkpoint(self.path, "db", "digest")
+        checkpoint.advance([("unit1", {})])
+
+        # When
+        checkpoint.clear()
+
+        # Then
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(checkpoint.count, 0)
+        self.assertEqual(checkpoint.last_unit, "")
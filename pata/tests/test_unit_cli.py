@@ -0,0 +1,318 @@
+""" Tests for pata.cli """
+# pylint: disable=protected-access
+import os
+import subprocess
+import sys
+import unittest
+
+from mock import (
+    call,
+    MagicMock,
+    patch,
+    )
+
+from pata.cli import (
+    create_export_parser,
+    create_parser,
+    export_main,
+    main,
+    )
+
+
+# Root of the repository (to import pata in new interpreters).
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+class ParserCleanTests(unittest.TestCase):
+    """ Tests success case for pata.cli.create_parser """
+
+    def test_defaults(self):
+        """ Test state when no optional flags are sent. """
+        # Given
+        args = ["path/to/file"]
+
+        # When
+        result = create_parser(args)
+
+        # Then
+        self.assertEqual(len(result._get_kwargs()), 11)
+        self.assertEqual(result.source, args[0])
+        self.assertFalse(result.diff)
+        self.assertFalse(result.insert)
+        self.assertFalse(result.update)
+        self.assertFalse(result.force)
+        self.assertIsNone(result.batch_size)
+        self.assertFalse(result.resume)
+        self.assertFalse(result.profile)
+        self.assertFalse(result.sql_stats)
+        self.assertIsNone(result.metrics)
+        self.assertIsNone(result.output)
+
+    def test_optional(self):
+        """ Test state when all optional flags are sent. """
+        # Given
+        args = [
+            "path/to/file", "-d", "-i", "-u", "-f", "-b", "100", "-r", "-p",
+            "-s", "-m", "pata.prom", "-o", "changes.jsonl"]
+
+        # When
+        result = create_parser(args)
+
+        # Then
+        self.assertEqual(len(result._get_kwargs()), 11)
+        self.assertEqual(result.source, args[0])
+        self.assertTrue(result.diff)
+        self.assertTrue(result.insert)
+        self.assertTrue(result.update)
+        self.assertTrue(result.force)
+        self.assertEqual(result.batch_size, 100)
+        self.assertTrue(result.resume)
+        self.assertTrue(result.profile)
+        self.assertTrue(result.sql_stats)
+        self.assertEqual(result.metrics, "pata.prom")
+        self.assertEqual(result.output, "changes.jsonl")
+
+
+class ParserDirtyTests(unittest.TestCase):
+    """ Tests failure case for pata.cli.create_parser """
+
+    def test_batch_size(self):
+        """ Test batch sizes that aren't positive integers are rejected. """
+        for value in ("0", "-1", "x", "1.5"):
+            with self.subTest(value=value):
+                # Given
+                stderr = MagicMock()
+
+                # When
+                with patch("sys.stderr", stderr), \
+                        self.assertRaises(SystemExit) as context:
+                    create_parser(["path/to/file", "-b", value])
+
+                # Then
+                self.assertEqual(context.exception.code, 2)
+                message = "".join(
+                    args[0] for args, _ in stderr.write.call_args_list)
+                self.assertIn(
+                    f"invalid positive int value: '{value}'", message)
+
+
+class MainTests(unittest.TestCase):
+    """ Tests for pata.cli.main """
+
+    @patch("pata.config.ROOT_LOGGER")
+    @patch("pata.config.setup_logging")
+    @patch("pata.migrate_units.run_command")
+    def test_main(self, run_mock, logging_mock, logger_mock):
+        """ Test command is executed with the options. """
+        # Given
+        args = ["path/to/file", "-d", "-i", "-b", "10"]
+
+        run_mock.return_value = {"status": "Done"}
+
+        # When
+        result = main(args)
+
+        # Then
+        self.assertEqual(result, 0)
+        logging_mock.assert_called_once_with()
+        run_mock.assert_called_once_with(
+            "path/to/file", True, True, False, False, 10, False, False,
+            None, None)
+        logger_mock.info.assert_called_once_with("{'status': 'Done'}")
+
+    @patch("pata.config.ROOT_LOGGER")
+    @patch("pata.config.setup_logging")
+    @patch("pata.migrate_units.run_command")
+    def test_failed(self, run_mock, *_):
+        """ Test exit status when the source couldn't be read. """
+        # Given
+        run_mock.return_value = {"status": "Failed"}
+
+        # When
+        result = main(["path/to/file", "-i", "-u"])
+
+        # Then
+        self.assertEqual(result, 1)
+
+    @patch("pata.config.LOGGER")
+    @patch("pata.config.ROOT_LOGGER")
+    @patch("pata.config.setup_logging")
+    @patch("pata.migrate_units.run_command")
+    def test_output_stdout(self, run_mock, _, root_mock, logger_mock):
+        """ Test summary isn't printed when changes are streamed to stdout. """
+        # Given
+        args = ["path/to/file", "-d", "-o", "-"]
+
+        run_mock.return_value = {"status": "Done"}
+
+        # When
+        result = main(args)
+
+        # Then
+        self.assertEqual(result, 0)
+        run_mock.assert_called_once_with(
+            "path/to/file", True, False, False, False, None, False, False,
+            None, "-")
+        root_mock.info.assert_not_called()
+        logger_mock.info.assert_called_once_with("{'status': 'Done'}")
+
+    @patch("cProfile.Profile")
+    @patch("pata.config.get_profile_path")
+    @patch("pata.config.ROOT_LOGGER")
+    @patch("pata.config.setup_logging")
+    @patch("pata.migrate_units.run_command")
+    def test_profile(
+            self, run_mock, _, logger_mock, path_mock, profile_mock):
+        """ Test command is profiled and stats are written. """
+        # Given
+        args = ["path/to/file", "-i", "-u", "-p"]
+        profile = profile_mock.return_value
+
+        path_mock.return_value = "log-20000101-120000.pstats"
+        profile.runcall.return_value = {"status": "Done"}
+
+        # When
+        result = main(args)
+
+        # Then
+        self.assertEqual(result, 0)
+        profile.runcall.assert_called_once_with(
+            run_mock, "path/to/file", False, True, True, False, None, False,
+            False, None, None)
+        run_mock.assert_not_called()
+        profile.dump_stats.assert_called_once_with(
+            "log-20000101-120000.pstats")
+        logger_mock.info.assert_has_calls([
+            call("Profile written to: %s", "log-20000101-120000.pstats"),
+            call("{'status': 'Done'}"),
+            ])
+
+    @patch("cProfile.Profile")
+    @patch("pata.config.get_profile_path")
+    @patch("pata.config.LOGGER")
+    @patch("pata.config.ROOT_LOGGER")
+    @patch("pata.config.setup_logging")
+    @patch("pata.migrate_units.run_command")
+    def test_profile_output_stdout(
+            self, _, __, root_mock, logger_mock, path_mock, profile_mock):
+        """ Test profile path isn't printed when changes go to stdout. """
+        # Given
+        args = ["path/to/file", "-d", "-p", "-o", "-"]
+
+        path_mock.return_value = "log-20000101-120000.pstats"
+        profile_mock.return_value.runcall.return_value = {"status": "Done"}
+
+        # When
+        result = main(args)
+
+        # Then
+        self.assertEqual(result, 0)
+        root_mock.info.assert_not_called()
+        logger_mock.info.assert_has_calls([
+            call("Profile written to: %s", "log-20000101-120000.pstats"),
+            call("{'status': 'Done'}"),
+            ])
+
+    @patch("pata.migrate_units.run_command")
+    def test_usage_error(self, run_mock):
+        """ Test nothing is executed with invalid options. """
+        # Given
+        args = ["-b", "x"]
+
+        # When/Then
+        with patch("sys.stderr", MagicMock()), \
+                self.assertRaises(SystemExit):
+            main(args)
+        run_mock.assert_not_called()
+
+
+class ExportParserCleanTests(unittest.TestCase):
+    """ Tests success case for pata.cli.create_export_parser """
+
+    def test_defaults(self):
+        """ Test state when no optional flags are sent. """
+        # When
+        result = create_export_parser(["units.bin"])
+
+        # Then
+        self.assertEqual(len(result._get_kwargs()), 2)
+        self.assertEqual(result.path, "units.bin")
+        self.assertEqual(result.database, "sqlite")
+
+    def test_optional(self):
+        """ Test state when all optional flags are sent. """
+        # When
+        result = create_export_parser(["units.bin", "-D", "other"])
+
+        # Then
+        self.assertEqual(result.database, "other")
+
+
+class ExportMainTests(unittest.TestCase):
+    """ Tests for pata.cli.export_main """
+
+    @patch("pata.config.ROOT_LOGGER")
+    @patch("pata.config.setup_logging")
+    @patch("pata.migrate_units.get_migrator")
+    @patch("pata.export.export_units")
+    def test_main(self, export_mock, migrator_mock, logging_mock, logger_mock):
+        """ Test units are exported from the database. """
+        # Given
+        session = migrator_mock.return_value.session_class.return_value
+
+        export_mock.return_value = {"units": 1}
+
+        # When
+        result = export_main(["units.bin", "-D", "other"])
+
+        # Then
+        self.assertEqual(result, 0)
+        logging_mock.assert_called_once_with()
+        migrator_mock.assert_called_once_with("other")
+        export_mock.assert_called_once_with(session, "units.bin")
+        session.close.assert_called_once_with()
+        logger_mock.info.assert_called_once_with("{'units': 1}")
+
+
+class StartupTests(unittest.TestCase):
+    """ Tests modules loaded on demand are not imported on startup. """
+
+    def get_modules(self, code):
+        """ Modules imported by code in a new interpreter. """
+        process = subprocess.run(
+            [sys.executable, "-c", f"{code}\nimport sys\n"
+             "print(' '.join(sys.modules))"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=False)
+        return process.stdout.split()
+
+    def test_lazy(self):
+        """ Test SQLAlchemy, the models and logging are not loaded. """
+        # Given
+        data = {
+            "import": "import pata.cli",
+            "parse": "import pata.cli\npata.cli.create_parser(['x'])",
+            "help": (
+                "import pata.cli\n"
+                "try:\n"
+                "    pata.cli.main(['--help'])\n"
+                "except SystemExit:\n"
+                "    pass"),
+            "export_help": (
+                "import pata.cli\n"
+                "try:\n"
+                "    pata.cli.export_main(['--help'])\n"
+                "except SystemExit:\n"
+                "    pass"),
+            }
+
+        # When/Then
+        for name, code in data.items():
+            with self.subTest(name):
+                result = self.get_modules(code)
+
+                self.assertIn("pata.cli", result)
+                self.assertFalse([
+                    module for module in result
+                    if module.startswith(("sqlalchemy", "pata.models"))
+                    or module in ("pata.config", "pata.migrate_units")])
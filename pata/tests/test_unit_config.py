@@ -1,7 +1,25 @@
 """ Unit tests for pata.config """
+import os
+import tempfile
 import unittest
 
-from pata.config import get_database_url
+from datetime import datetime
+
+from mock import (
+    ANY,
+    MagicMock,
+    patch,
+    )
+from sqlalchemy import create_engine
+
+from pata.config import (
+    DATABASES,
+    get_database_url,
+    get_profile_path,
+    LOG_PATH,
+    set_pragmas,
+    setup_logging,
+    )
 
 
 class DatabaseUrlTests(unittest.TestCase):
@@ -41,3 +59,89 @@ class DatabaseUrlTests(unittest.TestCase):
             with self.subTest(name):
                 result = get_database_url(params["config"])
                 self.assertEqual(result, params["expected_url"])
+
+
+class SetPragmasTests(unittest.TestCase):
+    """ Tests for pata.config.set_pragmas """
+
+    def test_sqlite(self):
+        """ Test pragmas are applied on new connections. """
+        # Given
+        pragmas = DATABASES["sqlite"]["pragmas"]
+        expected_result = ("wal", 1, -64000, 268435456, 2, 5000)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(tmp_dir, 'db.sqlite')}")
+
+            # When
+            set_pragmas(engine, pragmas)
+
+            # Then
+            with engine.connect() as connection:
+                result = tuple(
+                    connection.execute(f"PRAGMA {name}").scalar()
+                    for name in pragmas)
+            engine.dispose()
+
+        self.assertEqual(result, expected_result)
+
+    @patch("pata.config.event")
+    def test_ignored(self, event_mock):
+        """ Test engines left untouched. """
+        # Given
+        sqlite_engine = MagicMock()
+        sqlite_engine.dialect.name = "sqlite"
+        other_engine = MagicMock()
+        other_engine.dialect.name = "postgresql"
+        data = {
+            "no_pragmas": (sqlite_engine, None),
+            "empty_pragmas": (sqlite_engine, {}),
+            "other_database": (other_engine, {"journal_mode": "wal"}),
+            }
+
+        # When/Then
+        for name, (engine, pragmas) in data.items():
+            with self.subTest(name):
+                set_pragmas(engine, pragmas)
+                event_mock.listen.assert_not_called()
+
+
+class ProfilePathTests(unittest.TestCase):
+    """ Tests for pata.config.get_profile_path """
+
+    @patch("pata.config.datetime")
+    def test_path(self, datetime_mock):
+        """ Test profile is next to the log, named by date. """
+        # Given
+        datetime_mock.now.return_value = datetime(2000, 1, 2, 3, 4, 5)
+
+        # When
+        result = get_profile_path()
+
+        # Then
+        self.assertEqual(result, f"{LOG_PATH}-20000102-030405.pstats")
+
+
+class SetupLoggingTests(unittest.TestCase):
+    """ Tests for pata.config.setup_logging """
+
+    def setUp(self):
+        """ Logging not configured yet. """
+        setup_logging.cache_clear()
+
+    def tearDown(self):
+        """ Don't leak configuration to other tests. """
+        setup_logging.cache_clear()
+
+    @patch("pata.config.loggingConfig")
+    def test_once(self, config_mock):
+        """ Test logging is configured only once. """
+        # When
+        setup_logging()
+        setup_logging()
+
+        # Then
+        config_mock.fileConfig.assert_called_once_with(
+            ANY, defaults={"logfilename": LOG_PATH},
+            disable_existing_loggers=False)
@@ -0,0 +1,64 @@
+""" Unit tests for pata.export """
+import logging
+import os
+import tempfile
+import unittest
+
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from pata.export import export_units
+from pata.models.units import BASE
+from pata.tests.test_unit_snapshot import create_units
+from pata.units_file import UnitsFile
+
+
+logging.disable()
+
+
+class ExportUnitsTests(unittest.TestCase):
+    """ Tests for pata.export.export_units """
+
+    def setUp(self):
+        """ Database with some units and directory for the file. """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "units.bin")
+        self.engine = create_engine("sqlite://")
+        BASE.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        create_units(self.session)
+
+    def tearDown(self):
+        """ Clean up files and connections. """
+        self.session.close()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_export(self):
+        """ Test units, latest versions and change history are written. """
+        # When
+        result = export_units(self.session, self.path)
+
+        # Then
+        self.assertEqual(
+            result,
+            {
+                "path": self.path,
+                "units": 2,
+                "changes": 3,
+                "bytes": os.path.getsize(self.path),
+                })
+        with UnitsFile(self.path) as units_file:
+            unit = units_file.get("unit1")
+            self.assertEqual([item.name for item in units_file], [
+                "unit1", "unit2"])
+            self.assertEqual(units_file.column("attack"), [5, 1])
+        self.assertEqual(unit.wiki_path, "/unit1")
+        self.assertEqual(unit.position, "Top")
+        self.assertTrue(unit.fragile)
+        self.assertEqual(unit.valid_from, date(2000, 2, 1))
+        self.assertEqual(
+            unit.changes,
+            ((date(2000, 2, 1), "Change 2"), (date(2000, 1, 1), "Change 1")))
@@ -0,0 +1,229 @@
+""" Unit tests for pata.instrumentation """
+import logging
+import unittest
+
+from mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from pata.instrumentation import (
+    normalize_statement,
+    shorten,
+    StatementStats,
+    STATEMENT_WIDTH,
+    )
+from pata.migrate_units import (
+    bulk_insert_units,
+    load_to_values,
+    prefetch_units,
+    )
+from pata.models.units import (
+    BASE,
+    Units,
+    )
+from pata.tests.test_unit_query_plans import create_unit_data
+
+
+logging.disable()
+
+
+class NormalizeStatementTests(unittest.TestCase):
+    """ Tests for pata.instrumentation.normalize_statement """
+
+    def test_normalize(self):
+        """ Test executions of the same query get the same statement. """
+        # Given
+        data = {
+            "whitespace": (
+                "SELECT units.id\n  FROM units\tWHERE units.id = ?",
+                "SELECT units.id FROM units WHERE units.id = ?"),
+            "literals": (
+                "SELECT * FROM units WHERE name = 'it''s' LIMIT 10 OFFSET 2",
+                "SELECT * FROM units WHERE name = ? LIMIT ? OFFSET ?"),
+            "identifiers": (
+                "SELECT anon_1.id FROM units AS anon_1",
+                "SELECT anon_1.id FROM units AS anon_1"),
+            "in_list": (
+                "SELECT * FROM units WHERE units.name IN (?, ?, ?)",
+                "SELECT * FROM units WHERE units.name IN (?...)"),
+            "values": (
+                "INSERT INTO units (name, wiki_path) VALUES (?, ?)",
+                "INSERT INTO units (name, wiki_path) VALUES (?, ?)"),
+            }
+
+        # When/Then
+        for name, (statement, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    normalize_statement(statement), expected_result)
+
+
+class ShortenTests(unittest.TestCase):
+    """ Tests for pata.instrumentation.shorten """
+
+    def test_shorten(self):
+        """ Test columns of long SELECT statements are left out first. """
+        # Given
+        columns = ", ".join(f"units.column{index}" for index in range(20))
+        data = {
+            "short": (
+                "SELECT units.id FROM units", "SELECT units.id FROM units"),
+            "columns": (
+                f"SELECT {columns} FROM units WHERE units.id = ?",
+                "SELECT ... FROM units WHERE units.id = ?"),
+            "cut": (
+                "UPDATE units SET " + "x" * STATEMENT_WIDTH,
+                ("UPDATE units SET " + "x" * STATEMENT_WIDTH)[
+                    :STATEMENT_WIDTH - 3] + "..."),
+            }
+
+        # When/Then
+        for name, (statement, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(shorten(statement), expected_result)
+
+
+class StatementStatsTests(unittest.TestCase):
+    """ Tests for pata.instrumentation.StatementStats """
+
+    def setUp(self):
+        """ Global variables """
+        self.stats = StatementStats(slow_ms=100, repeat_limit=2)
+
+    @patch("pata.instrumentation.logger")
+    def test_slow(self, logger_mock):
+        """ Test statements slower than the threshold are logged. """
+        # When
+        self.stats.record("SELECT 1", 0.05)
+        self.stats.record("SELECT 2", 0.2)
+
+        # Then
+        self.assertEqual(self.stats.slow, 1)
+        logger_mock.warning.assert_called_once_with(
+            "Slow statement (%.1fms): %s", 200.0, "SELECT ?")
+
+    @patch("pata.instrumentation.logger")
+    def test_repeated(self, logger_mock):
+        """ Test statements over the limit are logged once (not batches). """
+        # Given
+        statement = "SELECT * FROM unit_versions WHERE ? = unit_id"
+        batch = "SELECT * FROM units WHERE name IN (?, ?)"
+
+        # When
+        for _ in range(5):
+            self.stats.record(statement, 0)
+            self.stats.record(batch, 0)
+
+        # Then
+        logger_mock.warning.assert_called_once_with(
+            "Statement executed more than %d times (N+1?): %s", 2,
+            statement)
+        self.assertEqual(
+            self.stats.summary()["repeated"], {statement: 5})
+
+    def test_summary(self):
+        """ Test totals, slowest statements first, and reset. """
+        # Given
+        long_statement = "UPDATE " + "x" * STATEMENT_WIDTH
+        self.stats.record("SELECT 1", 0.01)
+        self.stats.record("SELECT 2", 0.02)
+        self.stats.record(long_statement, 0.04, 3)
+        expected_result = {
+            "statements": 3,
+            "per_unit": 1.5,
+            "seconds": 0.07,
+            "slow": 0,
+            "rows": 3,
+            "top": [
+                {
+                    "statement": long_statement[:STATEMENT_WIDTH - 3] + "...",
+                    "count": 1,
+                    "seconds": 0.04,
+                    },
+                {"statement": "SELECT ?", "count": 2, "seconds": 0.03},
+                ],
+            "repeated": {},
+            }
+
+        # When
+        result = self.stats.summary(units=2)
+        self.stats.reset()
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(self.stats.summary()["statements"], 0)
+        self.assertEqual(self.stats.summary()["per_unit"], 0)
+        self.assertEqual(self.stats.summary()["rows"], 0)
+
+
+class EngineTests(unittest.TestCase):
+    """ Tests statements executed by an engine are recorded. """
+
+    def setUp(self):
+        """ Database with some units. """
+        self.engine = create_engine("sqlite://")
+        BASE.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all(
+            load_to_values(create_unit_data(f"unit{index}")).to_model()
+            for index in range(5))
+        self.session.commit()
+        self.session.expunge_all()
+        self.stats = StatementStats(slow_ms=1000, repeat_limit=3)
+
+    def tearDown(self):
+        """ Clean up connections """
+        self.session.close()
+        self.engine.dispose()
+
+    def test_lazy_load(self):
+        """ Test lazy loading the versions of every unit is an N+1. """
+        # Given
+        self.stats.attach(self.engine)
+
+        # When
+        for unit in self.session.query(Units).all():
+            _ = unit.versions
+
+        # Then
+        result = self.stats.summary(units=5)
+        self.assertEqual(result["statements"], 6)
+        self.assertEqual(list(result["repeated"].values()), [5])
+        self.assertEqual(
+            list(result["repeated"]),
+            ["SELECT ... FROM unit_versions"
+             " WHERE ? = unit_versions.unit_id"
+             " ORDER BY unit_versions.id DESC"])
+
+    def test_rows(self):
+        """ Test rows written are counted (also for executemany). """
+        # Given
+        self.stats.attach(self.engine)
+
+        # When
+        bulk_insert_units(self.session, [
+            load_to_values(create_unit_data(f"new{index}"))
+            for index in range(3)])
+        self.session.query(Units).filter(Units.name.like("new%")).update(
+            {"wiki_path": "path"}, synchronize_session=False)
+
+        # Then
+        result = self.stats.summary()
+        # units, versions, changes and latest versions, then the update.
+        self.assertEqual(result["rows"], 3 * 4 + 3)
+
+    def test_prefetch(self):
+        """ Test prefetching units isn't an N+1 (and detach). """
+        # Given
+        self.stats.attach(self.engine)
+
+        # When
+        for _ in range(5):
+            prefetch_units(self.session, ["unit1", "unit2"])
+        self.stats.detach(self.engine)
+        self.session.query(Units).all()
+
+        # Then
+        result = self.stats.summary(units=10)
+        self.assertEqual(result["statements"], 5 * 4)
+        self.assertEqual(result["repeated"], {})
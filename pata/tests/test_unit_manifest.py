@@ -0,0 +1,164 @@
+""" Unit tests for pata.manifest """
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from pata.manifest import (
+    get_file_digest,
+    Manifest,
+    )
+
+
+logging.disable()
+
+
+class FileDigestCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.manifest.get_file_digest """
+
+    def setUp(self):
+        """ Global variables """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "units.json")
+
+    def tearDown(self):
+        """ Clean up files """
+        self.directory.cleanup()
+
+    def test_not_exist(self):
+        """ Test empty digest when file doesn't exist. """
+        # When
+        result = get_file_digest(self.path)
+
+        # Then
+        self.assertEqual(result, "")
+
+    def test_content(self):
+        """ Test digest changes with the content of the file. """
+        # Given
+        with open(self.path, "w") as data_file:
+            data_file.write("{}")
+        first = get_file_digest(self.path)
+
+        # When
+        with open(self.path, "w") as data_file:
+            data_file.write("{ }")
+        result = get_file_digest(self.path)
+
+        # Then
+        self.assertEqual(len(first), 64)
+        self.assertNotEqual(result, first)
+
+
+class ManifestDirtyTests(unittest.TestCase):
+    """ Tests fail cases for pata.manifest.Manifest """
+
+    def setUp(self):
+        """ Global variables """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "manifest.json")
+
+    def tearDown(self):
+        """ Clean up files """
+        self.directory.cleanup()
+
+    def test_load(self):
+        """ Test empty manifest when file can't be used. """
+        # Given
+        data = {
+            "missing": None,
+            "invalid": "not json",
+            "not_object": "[]",
+            "other_database": json.dumps({
+                "database": "other", "file_digest": "digest",
+                "units": {"unit1": "digest1"}}),
+            }
+
+        # When/Then
+        for name, content in data.items():
+            with self.subTest(name):
+                if content is not None:
+                    with open(self.path, "w") as manifest_file:
+                        manifest_file.write(content)
+                result = Manifest.load(self.path, "database")
+                self.assertEqual(result.path, self.path)
+                self.assertEqual(result.database, "database")
+                self.assertEqual(result.file_digest, "")
+                self.assertEqual(result.units, {})
+
+
+class ManifestCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.manifest.Manifest """
+
+    def setUp(self):
+        """ Global variables """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "manifest.json")
+
+    def tearDown(self):
+        """ Clean up files """
+        self.directory.cleanup()
+
+    def test_save_load(self):
+        """ Test manifest is the same after saving and loading it. """
+        # Given
+        manifest = Manifest(
+            self.path, "database", "digest", {"unit1": "digest1"})
+
+        # When
+        manifest.save()
+        result = Manifest.load(self.path, "database")
+
+        # Then
+        self.assertEqual(result.file_digest, "digest")
+        self.assertEqual(result.units, {"unit1": "digest1"})
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_changed(self):
+        """ Test only changed units are kept as pending. """
+        # Given
+        manifest = Manifest(self.path)
+        manifest.changed("unit1", {"name": "unit1"})
+        manifest.commit()
+
+        # When
+        result = list(manifest.changed_items([
+            ("unit1", {"name": "unit1"}),
+            ("unit2", {"name": "unit2"}),
+            ]))
+
+        # Then
+        self.assertEqual(result, [("unit2", {"name": "unit2"})])
+        self.assertEqual(list(manifest.pending), ["unit2"])
+        self.assertEqual(list(manifest.units), ["unit1"])
+
+    def test_commit(self):
+        """ Test pending digests are accepted. """
+        # Given
+        manifest = Manifest(self.path)
+        manifest.changed("unit1", {"name": "unit1"})
+        digest = manifest.pending["unit1"]
+
+        # When
+        manifest.commit()
+
+        # Then
+        self.assertEqual(manifest.pending, {})
+        self.assertEqual(manifest.units, {"unit1": digest})
+        self.assertFalse(manifest.changed("unit1", {"name": "unit1"}))
+        self.assertTrue(manifest.changed("unit1", {"name": "other"}))
+
+    def test_rollback(self):
+        """ Test pending digests are discarded. """
+        # Given
+        manifest = Manifest(self.path)
+        manifest.changed("unit1", {"name": "unit1"})
+
+        # When
+        manifest.rollback()
+
+        # Then
+        self.assertEqual(manifest.pending, {})
+        self.assertEqual(manifest.units, {})
+        self.assertTrue(manifest.failed)
@@ -0,0 +1,167 @@
+""" Unit tests for pata.metrics """
+import os
+import tempfile
+import unittest
+
+from mock import (
+    MagicMock,
+    patch,
+    )
+
+from pata.metrics import (
+    format_samples,
+    get_peak_rss,
+    get_samples,
+    Sample,
+    write_samples,
+    )
+
+
+class GetSamplesTests(unittest.TestCase):
+    """ Tests for pata.metrics.get_samples """
+
+    @patch("pata.metrics.get_peak_rss")
+    @patch("pata.metrics.time")
+    def test_samples(self, time_mock, rss_mock):
+        """ Test samples of units, phases, commits, statements and memory. """
+        # Given
+        counts = {"insert": 2, "nochange": 1}
+        phases = {
+            "parse": {"wall": 0.5, "cpu": 0.4, "count": 3},
+            "commit": {"wall": 0.2, "cpu": 0.1, "count": 2},
+            "total": {"wall": 1.0, "cpu": 0.8, "count": 0},
+            }
+        statements = {"statements": 7, "seconds": 0.3, "rows": 12}
+        labels = {"database": "sqlite"}
+        expected_result = [
+            Sample(
+                "pata_migration_last_run_timestamp_seconds", labels, 100),
+            Sample("pata_migration_units_processed", labels, 3),
+            Sample(
+                "pata_migration_units", dict(labels, result="insert"), 2),
+            Sample(
+                "pata_migration_units", dict(labels, result="update"), 0),
+            Sample(
+                "pata_migration_units", dict(labels, result="nochange"), 1),
+            Sample("pata_migration_duration_seconds", labels, 1.0),
+            Sample(
+                "pata_migration_phase_seconds",
+                dict(labels, phase="parse"), 0.5),
+            Sample(
+                "pata_migration_phase_seconds",
+                dict(labels, phase="commit"), 0.2),
+            Sample(
+                "pata_migration_phase_cpu_seconds",
+                dict(labels, phase="parse"), 0.4),
+            Sample(
+                "pata_migration_phase_cpu_seconds",
+                dict(labels, phase="commit"), 0.1),
+            Sample("pata_migration_commits", labels, 2),
+            Sample("pata_migration_commit_latency_seconds", labels, 0.1),
+            Sample("pata_migration_statements", labels, 7),
+            Sample("pata_migration_statements_seconds", labels, 0.3),
+            Sample("pata_migration_rows_written", labels, 12),
+            Sample("pata_migration_peak_rss_bytes", labels, 1024),
+            ]
+
+        time_mock.return_value = 100
+        rss_mock.return_value = 1024
+
+        # When
+        result = get_samples(counts, phases, statements, labels)
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+    @patch("pata.metrics.get_peak_rss")
+    def test_optional(self, rss_mock):
+        """ Test statements and memory are left out when not available. """
+        # Given
+        rss_mock.return_value = None
+
+        # When
+        result = get_samples({}, {})
+
+        # Then
+        self.assertEqual(
+            [sample.name for sample in result if sample.labels == {}],
+            [
+                "pata_migration_last_run_timestamp_seconds",
+                "pata_migration_units_processed",
+                "pata_migration_duration_seconds",
+                "pata_migration_commits",
+                "pata_migration_commit_latency_seconds",
+                ])
+
+
+class GetPeakRssTests(unittest.TestCase):
+    """ Tests for pata.metrics.get_peak_rss """
+
+    def test_platforms(self):
+        """ Test kilobytes (Linux) and bytes (macOS) are converted. """
+        # Given
+        resource = MagicMock()
+        resource.getrusage.return_value.ru_maxrss = 2048
+        data = {
+            "linux": (resource, 2048 * 1024),
+            "darwin": (resource, 2048),
+            "win32": (None, None),
+            }
+
+        # When/Then
+        for platform, (module, expected_result) in data.items():
+            with self.subTest(platform), \
+                    patch("pata.metrics.resource", module), \
+                    patch("pata.metrics.sys.platform", platform):
+                self.assertEqual(get_peak_rss(), expected_result)
+
+
+class FormatSamplesTests(unittest.TestCase):
+    """ Tests for pata.metrics.format_samples """
+
+    def test_format(self):
+        """ Test samples are grouped by metric (with escaped labels). """
+        # Given
+        samples = [
+            Sample("pata_migration_units", {"result": "insert"}, 2),
+            Sample("pata_migration_commits", {}, 1),
+            Sample("pata_migration_units", {"result": 'a"b\\c\nd'}, 0.5),
+            ]
+        expected_result = (
+            "# HELP pata_migration_units Units processed by the last"
+            " migration, by result.\n"
+            "# TYPE pata_migration_units gauge\n"
+            'pata_migration_units{result="insert"} 2\n'
+            'pata_migration_units{result="a\\"b\\\\c\\nd"} 0.5\n'
+            "# HELP pata_migration_commits Commits of the last migration.\n"
+            "# TYPE pata_migration_commits gauge\n"
+            "pata_migration_commits 1\n"
+            )
+
+        # When
+        result = format_samples(samples)
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+
+class WriteSamplesTests(unittest.TestCase):
+    """ Tests for pata.metrics.write_samples """
+
+    def test_replace(self):
+        """ Test previous file is replaced (no temporary file left). """
+        # Given
+        samples = [Sample("pata_migration_commits", {}, 1)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pata.prom")
+            with open(path, "w") as metrics_file:
+                metrics_file.write("old")
+
+            # When
+            write_samples(path, samples)
+
+            # Then
+            with open(path) as metrics_file:
+                self.assertEqual(metrics_file.read(), format_samples(samples))
+            self.assertEqual(os.listdir(directory), ["pata.prom"])
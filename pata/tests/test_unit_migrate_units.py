@@ -1,68 +1,83 @@
 """ Tests for pata.migrate_units """
-# pylint: disable=protected-access
+# pylint: disable=protected-access,too-many-lines
+import io
+import json
 import logging
+import os
+import tempfile
 import unittest
 
-from datetime import date
+from datetime import (
+    date,
+    datetime,
+    )
+from functools import partial
 from json.decoder import JSONDecodeError
 
 from mock import (
+    ANY,
     call,
     MagicMock,
     Mock,
     patch,
     )
+from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
-
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from pata.config import (
+    CHECKPOINT_PATH,
+    MANIFEST_PATH,
+    REPEATED_STATEMENT_LIMIT,
+    SLOW_STATEMENT_MS,
+    )
 from pata.migrate_units import (
-    create_parser,
+    bulk_insert_units,
+    close_version,
+    count_results,
+    find_sources,
+    get_source_date,
+    iter_batches,
+    iter_units,
+    iter_version,
     load_to_models,
+    load_state,
+    load_to_values,
     load_version,
     models_diff,
+    prefetch_units,
+    get_migrator,
+    Migrator,
+    process_source,
     process_transaction,
     run,
     run_command,
+    run_iter,
+    set_latest_version,
+    SourceError,
+    summarize,
+    warm_up,
     )
 from pata.models.units import (
-    UnitChanges, Units, UnitVersions,
+    BASE, UnitChanges, UnitLatestVersions, Units, UnitVersions,
     )
+from pata.models.utils import COLUMNS_CACHE
+from pata.models.values import UnitValue
+from pata.tests.test_unit_query_plans import create_unit_data
+from pata.timing import PhaseTimer
 
 
 logging.disable()
 
-
-class ParserCleanTests(unittest.TestCase):
-    """ Tests success case for pata.migrate_units.create_parser """
-
-    def test_defaults(self):
-        """ Test state when no optional flags are sent. """
-        # Given
-        args = ["path/to/file"]
-
-        # When
-        result = create_parser(args)
-
-        # Then
-        self.assertEqual(len(result._get_kwargs()), 4)
-        self.assertEqual(result.source, args[0])
-        self.assertFalse(result.diff)
-        self.assertFalse(result.insert)
-        self.assertFalse(result.update)
-
-    def test_optional(self):
-        """ Test state when all optional flags are sent. """
-        # Given
-        args = ["path/to/file", "-d", "-i", "-u"]
-
-        # When
-        result = create_parser(args)
-
-        # Then
-        self.assertEqual(len(result._get_kwargs()), 4)
-        self.assertEqual(result.source, args[0])
-        self.assertTrue(result.diff)
-        self.assertTrue(result.insert)
-        self.assertTrue(result.update)
+# See alembic/versions/7e2f5b0c9d31_add_unit_latest_version_table.py
+LATEST_UNIT_VERSION_VIEW = """
+    CREATE VIEW latest_unit_version AS
+    SELECT u.*, uv.*
+    FROM unit_latest_version ulv
+    JOIN units u ON u.id = ulv.unit_id
+    JOIN unit_versions uv ON uv.id = ulv.version_id
+    """
 
 
 class LoadVersionDirtyTests(unittest.TestCase):
@@ -152,6 +167,124 @@ class LoadVersionCleanTests(unittest.TestCase):
         json_mock.assert_called_once_with(file_content)
 
 
+class IterVersionDirtyTests(unittest.TestCase):
+    """ Tests fail cases for pata.migrate_units.iter_version """
+
+    @patch("pata.migrate_units.logger")
+    @patch("pata.migrate_units.os.path.isfile")
+    def test_not_exist(self, isfile_mock, logger_mock):
+        """ Test error is raised when file doesn't exist. """
+        # Given
+        file_path = "/path/to/file"
+
+        isfile_mock.return_value = False
+
+        # When
+        with self.assertRaises(SourceError):
+            next(iter_version(file_path))
+
+        # Then
+        isfile_mock.assert_called_once_with(file_path)
+        logger_mock.error.assert_called_once_with("File doesn't exist")
+
+    @patch("pata.migrate_units.logger")
+    @patch("builtins.open")
+    @patch("pata.migrate_units.os.path.isfile")
+    def test_invalid_format(self, isfile_mock, open_mock, logger_mock):
+        """ Test error is raised after the pairs before the invalid part. """
+        # Given
+        data = {
+            "not_object": ("[1, 2]", []),
+            "truncated": ('{"unit1": {"a": 1}, "unit2": {', [
+                ("unit1", {"a": 1})]),
+            "trailing_comma": ('{"unit1": 1,}', [("unit1", 1)]),
+            "extra_data": ('{"unit1": 1} {}', [("unit1", 1)]),
+            }
+
+        isfile_mock.return_value = True
+
+        # When/Then
+        for name, (content, expected_result) in data.items():
+            with self.subTest(name):
+                open_mock.return_value = io.StringIO(content)
+                logger_mock.reset_mock()
+                result = []
+                with self.assertRaises(SourceError):
+                    for item in iter_version("/path/to/file"):
+                        result.append(item)
+                self.assertEqual(result, expected_result)
+                logger_mock.error.assert_called_once_with("Invalid format")
+
+
+class IterVersionCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.iter_version """
+
+    @patch("builtins.open")
+    @patch("pata.migrate_units.os.path.isfile")
+    def test_success(self, isfile_mock, open_mock):
+        """ Test pairs are yielded in order, split at every chunk size. """
+        # Given
+        file_path = "/path/to/file"
+        content = (
+            '{\n "unit1": {"name": "unit1", "stats": {"attack": 123}},'
+            '\n "unit2": {"name": "unit \\"2\\""}, "unit3": {},'
+            '\n "unit4": {"ratio": 760.9477375418205, "small": -1.5e-3,'
+            ' "big": 2E+10, "zero": 0}, "unit5": 7.25 \n}\n')
+        expected_result = [
+            ("unit1", {"name": "unit1", "stats": {"attack": 123}}),
+            ("unit2", {"name": 'unit "2"'}),
+            ("unit3", {}),
+            ("unit4", {
+                "ratio": 760.9477375418205, "small": -1.5e-3, "big": 2E+10,
+                "zero": 0}),
+            ("unit5", 7.25),
+            ]
+
+        isfile_mock.return_value = True
+
+        # When/Then
+        for chunk_size in range(1, len(content) + 2):
+            with self.subTest(chunk_size=chunk_size), patch(
+                    "pata.migrate_units.READ_CHUNK_SIZE", chunk_size):
+                open_mock.return_value = io.StringIO(content)
+                result = list(iter_version(file_path))
+                self.assertEqual(result, expected_result)
+        open_mock.assert_called_with(file_path, "r", encoding="utf-8")
+
+    @patch("builtins.open")
+    @patch("pata.migrate_units.os.path.isfile")
+    def test_empty(self, isfile_mock, open_mock):
+        """ Test nothing is yielded for an empty object. """
+        # Given
+        isfile_mock.return_value = True
+        open_mock.return_value = io.StringIO(" {} ")
+
+        # When
+        result = list(iter_version("/path/to/file"))
+
+        # Then
+        self.assertEqual(result, [])
+
+
+class IterBatchesCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.iter_batches """
+
+    def test_batches(self):
+        """ Test items are split in batches of the given size. """
+        # Given
+        data = {
+            "empty": ([], []),
+            "exact": ([1, 2, 3, 4], [[1, 2], [3, 4]]),
+            "remainder": ([1, 2, 3], [[1, 2], [3]]),
+            }
+
+        # When/Then
+        for name, (items, expected_result) in data.items():
+            with self.subTest(name):
+                result = list(iter_batches(iter(items), 2))
+                self.assertEqual(result, expected_result)
+
+
 class LoadToModelsCleanTests(unittest.TestCase):
     """  Tests success cases for pata.migrate_units.load_to_models """
 
@@ -259,6 +392,63 @@ class LoadToModelsCleanTests(unittest.TestCase):
             result.changes[0].diff(expected_result.changes[0]), {})
         self.assertEqual(
             result.changes[1].diff(expected_result.changes[1]), {})
+        self.assertEqual(
+            result.fingerprint, expected_result.get_fingerprint())
+        self.assertEqual(
+            result.versions[0].fingerprint,
+            expected_result.versions[0].get_fingerprint())
+
+
+class LoadToValuesCleanTests(unittest.TestCase):
+    """  Tests success cases for pata.migrate_units.load_to_values """
+
+    def test_empty(self):
+        """ Test result when no data is available. """
+        # Given
+        data = {}
+
+        # When
+        result = load_to_values(data)
+
+        # Then
+        self.assertIsInstance(result, UnitValue)
+        self.assertEqual(result.name, None)
+        self.assertEqual(len(result.versions), 1)
+        self.assertIsNone(result.versions[0].valid_from)
+        self.assertEqual(result.changes, ())
+
+    def test_data(self):
+        """ Test values are the same as the ones loaded into models. """
+        # Given
+        data = {
+            "name": "unit1",
+            "unit_spell": "Unit",
+            "attributes": {"supply": 1, "fragile": True},
+            "change_history": {
+                "2000-01-01": ["Change 1", "Change 2"],
+                "2000-02-01": ["Change 3"],
+                },
+            "costs": {"gold": 13},
+            "links": {"path": "path X"},
+            "stats": {"attack": 1, "health": 1},
+            }
+        expected_result = load_to_models(data)
+
+        # When
+        result = load_to_values(data)
+
+        # Then
+        self.assertEqual(expected_result.diff(result), {})
+        self.assertEqual(result.fingerprint, expected_result.fingerprint)
+        self.assertEqual(
+            expected_result.versions[0].diff(result.versions[0]), {})
+        self.assertEqual(
+            result.versions[0].fingerprint,
+            expected_result.versions[0].fingerprint)
+        self.assertEqual(result.versions[0].valid_from, date(2000, 2, 1))
+        self.assertEqual(
+            [change.get_values() for change in result.changes],
+            [change.get_values() for change in expected_result.changes])
 
 
 class ModelsDiffCleanTests(unittest.TestCase):
@@ -326,6 +516,52 @@ class ModelsDiffCleanTests(unittest.TestCase):
         base_unit.diff.assert_called_once_with(unit)
         base_version.diff.assert_called_once_with(unit.versions[0])
 
+    def test_same_fingerprint(self):
+        """ Test columns are not compared when fingerprints match. """
+        # Given
+        base_version = MagicMock(fingerprint="hash2")
+        base_unit = MagicMock(fingerprint="hash1", versions=[base_version])
+        unit = MagicMock(
+            fingerprint="hash1",
+            versions=[MagicMock(fingerprint="hash2")],
+            changes=[],
+            )
+        expected_result = {"units": {}}
+
+        # When
+        result = models_diff(base_unit, unit)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        base_unit.diff.assert_not_called()
+        base_version.diff.assert_not_called()
+
+    def test_missing_fingerprint(self):
+        """ Test columns are compared when fingerprint is not known. """
+        # Given
+        base_version = MagicMock(fingerprint=None)
+        base_unit = MagicMock(fingerprint=None, versions=[base_version])
+        unit = MagicMock(
+            fingerprint=None,
+            versions=[MagicMock(fingerprint=None)],
+            changes=[],
+            )
+        expected_result = {
+            "units": {"column1": "change1"},
+            "unit_versions": {"column2": "change2"},
+            }
+
+        base_unit.diff.return_value = {"column1": "change1"}
+        base_version.diff.return_value = {"column2": "change2"}
+
+        # When
+        result = models_diff(base_unit, unit)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        base_unit.diff.assert_called_once_with(unit)
+        base_version.diff.assert_called_once_with(unit.versions[0])
+
     @patch("pata.migrate_units.UnitChanges")
     def test_all(self, change_mock):
         """
@@ -366,6 +602,178 @@ class ModelsDiffCleanTests(unittest.TestCase):
         change_mock.assert_called_once_with()
 
 
+class PrefetchUnitsCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.prefetch_units """
+
+    def test_empty(self):
+        """ Test result when no names are requested. """
+        # Given
+        session = MagicMock()
+        expected_result = {}
+
+        # When
+        result = prefetch_units(session, [])
+
+        # Then
+        self.assertEqual(result, expected_result)
+        session.query.assert_not_called()
+
+    @patch("pata.migrate_units.PREFETCH_CHUNK_SIZE", 2)
+    def test_chunks(self):
+        """ Test a query is sent per chunk of names. """
+        # Given
+        session = MagicMock()
+        query = MagicMock()
+        unit1 = Mock()
+        unit1.configure_mock(name="name1")
+        unit3 = Mock()
+        unit3.configure_mock(name="name3")
+        expected_result = {"name1": unit1, "name3": unit3}
+
+        session.query.return_value = query
+        query.options.return_value = query
+        query.filter.return_value = query
+        query.__iter__.side_effect = [iter([unit1]), iter([unit3])]
+
+        # When
+        result = prefetch_units(session, ["name1", "name2", "name3"])
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(session.query.call_count, 2)
+        self.assertEqual(query.filter.call_count, 2)
+
+
+class BulkInsertUnitsCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.bulk_insert_units """
+
+    def test_empty(self):
+        """ Test nothing is executed when there are no units. """
+        # Given
+        session = MagicMock()
+
+        # When
+        bulk_insert_units(session, [])
+
+        # Then
+        session.assert_not_called()
+        session.execute.assert_not_called()
+
+    def test_insert(self):
+        """ Test a single insert per table, with resolved unit ids. """
+        # Given
+        session = MagicMock()
+        version = MagicMock(fingerprint="hash2")
+        change = MagicMock()
+        unit = Mock(fingerprint="hash1", versions=[version], changes=[change])
+        unit.configure_mock(name="unit1")
+        unit.get_values.return_value = {"name": "unit1"}
+        version.get_values.return_value = {"attack": 1}
+        change.get_values.return_value = {"description": "change1"}
+        version.valid_from = date(2000, 1, 1)
+        version.valid_to = None
+        versions = {
+            "attack": 1, "fingerprint": "hash2",
+            "valid_from": date(2000, 1, 1), "valid_to": None, "unit_id": 99}
+
+        ids_query = MagicMock()
+        latest_query = MagicMock()
+        session.query.side_effect = [ids_query, latest_query]
+        ids_query.filter.return_value = [("unit1", 99)]
+        latest_query.filter.return_value = latest_query
+        latest_query.group_by.return_value = [(99, 88)]
+
+        # When
+        bulk_insert_units(session, [unit])
+
+        # Then
+        session.execute.assert_has_calls([
+            call(ANY, [{"name": "unit1", "fingerprint": "hash1"}]),
+            call(ANY, [versions]),
+            call(ANY, [{"unit_id": 99, "version_id": 88}]),
+            call(ANY, [{"description": "change1", "unit_id": 99}]),
+            ])
+        self.assertEqual(
+            [args[0].table.name for args, _ in session.execute.call_args_list],
+            ["units", "unit_versions", "unit_latest_version", "unit_changes"])
+        session.query.assert_has_calls([
+            call(Units.name, Units.id),
+            call(UnitVersions.unit_id, ANY),
+            ])
+
+
+class CloseVersionCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.close_version """
+
+    def test_close(self):
+        """ Test previous version is valid until the new one is. """
+        # Given
+        cases = [
+            (date(2000, 1, 1), date(2000, 2, 1), date(2000, 2, 1)),
+            (date(2000, 2, 1), date(2000, 1, 1), date(2000, 2, 1)),
+            (date(2000, 2, 1), date(2000, 2, 1), date(2000, 2, 1)),
+            (None, date(2000, 1, 1), date(2000, 1, 1)),
+            ]
+
+        for previous_from, valid_from, expected_result in cases:
+            with self.subTest(previous=previous_from, version=valid_from):
+                previous = UnitVersions(valid_from=previous_from)
+                version = UnitVersions(valid_from=valid_from)
+
+                # When
+                close_version(previous, version)
+
+                # Then
+                self.assertEqual(version.valid_from, expected_result)
+                self.assertEqual(previous.valid_to, expected_result)
+
+    @patch("pata.migrate_units.date")
+    def test_unknown(self, date_mock):
+        """ Test version without validity is valid since today. """
+        # Given
+        date_mock.today.return_value = date(2000, 3, 1)
+        previous = UnitVersions(valid_from=date(2000, 1, 1))
+        version = UnitVersions()
+
+        # When
+        close_version(previous, version)
+
+        # Then
+        self.assertEqual(version.valid_from, date(2000, 3, 1))
+        self.assertEqual(previous.valid_to, date(2000, 3, 1))
+
+
+class SetLatestVersionCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.set_latest_version """
+
+    def test_new(self):
+        """ Test latest version is created when missing. """
+        # Given
+        unit = Units(name="unit1")
+        version = UnitVersions()
+
+        # When
+        set_latest_version(unit, version)
+
+        # Then
+        self.assertIs(unit.latest.version, version)
+
+    def test_existing(self):
+        """ Test latest version is replaced when it exists. """
+        # Given
+        unit = Units(name="unit1")
+        set_latest_version(unit, UnitVersions())
+        latest = unit.latest
+        version = UnitVersions()
+
+        # When
+        set_latest_version(unit, version)
+
+        # Then
+        self.assertIs(unit.latest, latest)
+        self.assertIs(unit.latest.version, version)
+
+
 class ProcessTransactionCleanTests(unittest.TestCase):
     """ Tests success cases for pata.migrate_units.process_transaction """
 
@@ -482,74 +890,208 @@ class ProcessTransactionCleanTests(unittest.TestCase):
             call.add(unit),
             ])
 
-    @patch("pata.migrate_units.models_diff")
-    def test_update_unit_only(self, diff_mock):
-        """ Test update unit but not version or changes. """
+    def test_insert_existing_units(self):
+        """ Test no query is made when existing units are provided. """
         # Given
         session = MagicMock()
         unit = Mock(
-            versions=[],
-            changes=[],
+            versions=[MagicMock()],
+            changes=[]
             )
         unit.configure_mock(name="unit name")
-        existing = MagicMock()
-        expected_result = {
-            "update": {"units": {"key": {"new": "val"}}}}
+        expected_result = {"insert": {}}
 
-        session.query.return_value = session
-        session.filter_by.return_value = session
-        session.first.return_value = existing
-        diff_mock.return_value = expected_result.get("update")
+        # When
+        result = process_transaction(
+            session, unit, insert=True, existing_units={})
+
+        # Then
+        self.assertEqual(result, expected_result)
+        session.query.assert_not_called()
+        session.add.assert_called_once_with(unit)
+
+    def test_insert_value(self):
+        """ Test model is created when inserting a value. """
+        # Given
+        session = MagicMock()
+        unit = load_to_values({"name": "unit name"})
+        expected_result = {"insert": {}}
 
         # When
-        result = process_transaction(session, unit, update=True)
+        result = process_transaction(
+            session, unit, insert=True, existing_units={})
 
         # Then
         self.assertEqual(result, expected_result)
-        self.assertEqual(existing.key, "val")
-        session.assert_has_calls([
-            call.query(Units),
-            call.filter_by(name=unit.name),
-            call.first(),
-            call.first().__bool__(),
-            ])
-        diff_mock.assert_called_once_with(existing, unit)
+        inserted = session.add.call_args[0][0]
+        self.assertIsInstance(inserted, Units)
+        self.assertEqual(inserted.name, "unit name")
+        self.assertEqual(len(inserted.versions), 1)
 
-    @patch("pata.migrate_units.models_diff")
-    def test_update_version_only(self, diff_mock):
-        """ Test result when models exists but no changes exist. """
+    def test_insert_latest_view(self):
+        """ Test units inserted one by one are in latest_unit_version. """
+        # Given
+        engine = create_engine("sqlite://")
+        BASE.metadata.create_all(engine)
+        engine.execute(LATEST_UNIT_VERSION_VIEW)
+        session = sessionmaker(bind=engine)()
+
+        # When
+        for unit in (
+                load_to_values(create_unit_data("unit1")),
+                load_to_models(create_unit_data("unit2"))):
+            process_transaction(session, unit, insert=True)
+        session.commit()
+
+        # Then
+        self.assertEqual(
+            session.query(UnitLatestVersions.unit_id).count(), 2)
+        self.assertEqual(
+            engine.execute(
+                "SELECT name, attack FROM latest_unit_version ORDER BY name"
+                ).fetchall(),
+            [("unit1", 1), ("unit2", 1)])
+        session.close()
+        engine.dispose()
+
+    def test_insert_new_units(self):
+        """ Test unit is kept for bulk insert when new units are provided. """
         # Given
         session = MagicMock()
-        version = MagicMock()
-        version_copy = MagicMock()
         unit = Mock(
-            versions=[version],
+            versions=[MagicMock()],
             changes=[]
             )
         unit.configure_mock(name="unit name")
-        existing = MagicMock(versions=[])
-        expected_result = {
-            "update": {"unit_versions": {"key": {"new": "val"}}}}
-
-        session.query.return_value = session
-        session.filter_by.return_value = session
-        session.first.return_value = existing
-        diff_mock.return_value = expected_result.get("update")
-        version.copy.return_value = version_copy
+        new_units = []
+        expected_result = {"insert": {}}
 
         # When
-        result = process_transaction(session, unit, update=True)
+        result = process_transaction(
+            session, unit, insert=True, existing_units={},
+            new_units=new_units)
 
         # Then
         self.assertEqual(result, expected_result)
-        self.assertEqual(existing.versions, [version_copy])
-        session.assert_has_calls([
-            call.query(Units),
-            call.filter_by(name=unit.name),
-            call.first(),
-            call.first().__bool__(),
-            ])
-        diff_mock.assert_called_once_with(existing, unit)
+        self.assertEqual(new_units, [unit])
+        session.add.assert_not_called()
+
+    def test_diff_new_units(self):
+        """ Test unit is not kept for bulk insert when not inserting. """
+        # Given
+        session = MagicMock()
+        unit = Mock(
+            versions=[MagicMock()],
+            changes=[]
+            )
+        unit.configure_mock(name="unit name")
+        new_units = []
+        expected_result = {"insert": {}}
+
+        # When
+        result = process_transaction(
+            session, unit, existing_units={}, new_units=new_units)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(new_units, [])
+        session.add.assert_not_called()
+
+    @patch("pata.migrate_units.models_diff")
+    def test_update_existing_units(self, diff_mock):
+        """ Test existing unit is taken from the existing units provided. """
+        # Given
+        session = MagicMock()
+        unit = Mock(
+            versions=[],
+            changes=[],
+            )
+        unit.configure_mock(name="unit name")
+        existing = MagicMock()
+        expected_result = {
+            "update": {"units": {"key": {"new": "val"}}}}
+
+        diff_mock.return_value = expected_result.get("update")
+
+        # When
+        result = process_transaction(
+            session, unit, update=True,
+            existing_units={"unit name": existing})
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(existing.key, "val")
+        session.query.assert_not_called()
+        diff_mock.assert_called_once_with(existing, unit)
+
+    @patch("pata.migrate_units.models_diff")
+    def test_update_unit_only(self, diff_mock):
+        """ Test update unit but not version or changes. """
+        # Given
+        session = MagicMock()
+        unit = Mock(
+            versions=[],
+            changes=[],
+            )
+        unit.configure_mock(name="unit name")
+        existing = MagicMock()
+        expected_result = {
+            "update": {"units": {"key": {"new": "val"}}}}
+
+        session.query.return_value = session
+        session.filter_by.return_value = session
+        session.first.return_value = existing
+        diff_mock.return_value = expected_result.get("update")
+
+        # When
+        result = process_transaction(session, unit, update=True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(existing.key, "val")
+        session.assert_has_calls([
+            call.query(Units),
+            call.filter_by(name=unit.name),
+            call.first(),
+            call.first().__bool__(),
+            ])
+        diff_mock.assert_called_once_with(existing, unit)
+
+    @patch("pata.migrate_units.models_diff")
+    def test_update_version_only(self, diff_mock):
+        """ Test result when models exists but no changes exist. """
+        # Given
+        session = MagicMock()
+        version = MagicMock()
+        version_copy = MagicMock()
+        unit = Mock(
+            versions=[version],
+            changes=[]
+            )
+        unit.configure_mock(name="unit name")
+        existing = MagicMock(versions=[])
+        expected_result = {
+            "update": {"unit_versions": {"key": {"new": "val"}}}}
+
+        session.query.return_value = session
+        session.filter_by.return_value = session
+        session.first.return_value = existing
+        diff_mock.return_value = expected_result.get("update")
+        version.copy.return_value = version_copy
+
+        # When
+        result = process_transaction(session, unit, update=True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(existing.versions, [version_copy])
+        session.assert_has_calls([
+            call.query(Units),
+            call.filter_by(name=unit.name),
+            call.first(),
+            call.first().__bool__(),
+            ])
+        diff_mock.assert_called_once_with(existing, unit)
         version.copy.assert_called_once_with()
 
     @patch("pata.migrate_units.models_diff")
@@ -601,22 +1143,24 @@ class ProcessTransactionCleanTests(unittest.TestCase):
         session = MagicMock()
         version = MagicMock()
         version_copy = MagicMock()
-        change = MagicMock(day="valid")
+        previous = MagicMock(valid_from=date(2000, 1, 1))
+        change = MagicMock(day=date(2000, 1, 2))
         change_copy = MagicMock()
-        nochange = MagicMock(day="nochange")
+        nochange = MagicMock(day=date(2000, 1, 1))
+        stored = MagicMock(day=date(2000, 1, 1))
         unit = Mock(
             versions=[version],
             changes=[change, nochange]
             )
         unit.configure_mock(name="unit name")
-        existing = MagicMock(versions=[], changes=[])
+        existing = MagicMock(versions=[previous], changes=[stored])
         expected_result = {
             "update": {
                 "units": {"key": {"new": "val"}},
                 "unit_versions": {"key": {"new": "val"}},
                 "unit_changes": {
                     0: {"day": {"new": "invalid"}},
-                    1: {"day": {"new": "valid"}},
+                    1: {"day": {"new": date(2000, 1, 2)}},
                     }}}
 
         session.query.return_value = session
@@ -632,8 +1176,14 @@ class ProcessTransactionCleanTests(unittest.TestCase):
         # Then
         self.assertEqual(result, expected_result)
         self.assertEqual(existing.key, "val")
-        self.assertEqual(existing.versions, [version_copy])
-        self.assertEqual(existing.changes, [change_copy])
+        self.assertEqual(existing.fingerprint, existing.get_fingerprint())
+        self.assertEqual(existing.versions, [previous, version_copy])
+        self.assertEqual(
+            version_copy.fingerprint, version_copy.get_fingerprint())
+        self.assertEqual(version_copy.valid_from, date(2000, 1, 2))
+        self.assertEqual(previous.valid_to, date(2000, 1, 2))
+        self.assertEqual(existing.latest.version, version_copy)
+        self.assertEqual(existing.changes, [stored, change_copy])
         session.assert_has_calls([
             call.query(Units),
             call.filter_by(name=unit.name),
@@ -645,249 +1195,1688 @@ class ProcessTransactionCleanTests(unittest.TestCase):
         change.copy.assert_called_once_with()
 
 
-class RunDirtyTests(unittest.TestCase):
-    """ Tests fail cases for pata.migrate_units.run """
+class SourcesTests(unittest.TestCase):
+    """
+    Tests for pata.migrate_units.get_source_date and
+    pata.migrate_units.find_sources
+    """
 
-    @patch("pata.migrate_units.load_to_models")
-    @patch("pata.migrate_units.sessionmaker")
-    @patch("pata.migrate_units.create_engine")
-    @patch("pata.migrate_units.get_database_url")
-    def test_rollback(
-            self, db_mock, engine_mock, make_session_mock, model_mock):
-        """
-        Test result when when exception is raised.
+    def setUp(self):
+        """ Global variables """
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """ Clean up files """
+        self.directory.cleanup()
+
+    def create_file(self, name, timestamp=None):
+        """ Create an empty dump. """
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as data_file:
+            data_file.write("{}")
+        if timestamp is not None:
+            os.utime(path, (timestamp, timestamp))
+        return path
+
+    def test_date(self):
+        """ Test date from file name, or modification time. """
+        # Given
+        timestamp = datetime(2019, 5, 6, 7, 8).timestamp()
+        data = {
+            "dashes": ("units-2020-01-31.json", datetime(2020, 1, 31)),
+            "underscores": ("units_2020_01_31.json", datetime(2020, 1, 31)),
+            "compact": ("20200131.json", datetime(2020, 1, 31)),
+            "invalid": ("units-2020-13-31.json", datetime(2019, 5, 6, 7, 8)),
+            "missing": ("units.json", datetime(2019, 5, 6, 7, 8)),
+            }
 
-        The side effect class must be first one inside the try/except block.
+        # When/Then
+        for name, (file_name, expected_result) in data.items():
+            with self.subTest(name):
+                path = self.create_file(file_name, timestamp)
 
-        """
+                self.assertEqual(get_source_date(path), expected_result)
+
+    def test_find(self):
+        """ Test dumps are found in chronological order. """
         # Given
-        data = {"key1": "val1"}
-        database_url = "test db url"
-        engine = MagicMock()
-        session = MagicMock()
-        expected_result = {}
+        first = self.create_file("units-2020-01-01.json")
+        third = self.create_file("units-2020-03-01.json")
+        second = self.create_file(
+            "units.json", datetime(2020, 2, 1).timestamp())
+        self.create_file("notes.txt")
+        os.mkdir(os.path.join(self.directory.name, "other.json"))
+        data = {
+            "directory": (self.directory.name, [first, second, third]),
+            "glob": (
+                os.path.join(self.directory.name, "units-*.json"),
+                [first, third]),
+            "no_match": (os.path.join(self.directory.name, "x*.json"), []),
+            }
 
-        db_mock.return_value = database_url
-        engine_mock.return_value = engine
-        make_session_mock.return_value = session
-        model_mock.side_effect = SQLAlchemyError()
+        # When/Then
+        for name, (source, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(find_sources(source), expected_result)
+
+
+class ProcessSourceTests(unittest.TestCase):
+    """
+    Tests for pata.migrate_units.load_state and
+    pata.migrate_units.process_source
+    """
+
+    def setUp(self):
+        """ Empty database and directory for dumps. """
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine("sqlite://")
+        BASE.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        """ Clean up files and connections """
+        self.session.close()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def create_dump(self, name, units):
+        """ Create a dump with units (name: (attack, change days)). """
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as data_file:
+            json.dump(
+                {
+                    unit_name: {
+                        "name": unit_name,
+                        "position": "Top",
+                        "unit_spell": "Unit",
+                        "abilities": "",
+                        "attributes": dict.fromkeys((
+                            "blocker", "fragile", "frontline", "prompt",
+                            "build_time", "exhaust_ability", "exhaust_turn",
+                            "lifespan", "stamina", "supply"), 0),
+                        "change_history": {day: ["change"] for day in days},
+                        "costs": dict.fromkeys(
+                            ("blue", "energy", "gold", "green", "red"), 0),
+                        "links": {"path": f"/{unit_name}"},
+                        "stats": {"attack": attack, "health": 1},
+                        }
+                    for unit_name, (attack, days) in units.items()
+                    },
+                data_file)
+        return path
+
+    def get_rows(self):
+        """ Versions, latest version and changes by unit. """
+        return {
+            "versions": self.session.query(Units.name, UnitVersions.attack)
+            .join(UnitVersions).order_by(Units.name, UnitVersions.id).all(),
+            "latest": self.session.query(Units.name, UnitVersions.attack)
+            .join(UnitLatestVersions, UnitLatestVersions.unit_id == Units.id)
+            .join(
+                UnitVersions,
+                UnitVersions.id == UnitLatestVersions.version_id)
+            .order_by(Units.name).all(),
+            "changes": self.session.query(Units.name, UnitChanges.day)
+            .join(UnitChanges).order_by(Units.name, UnitChanges.day).all(),
+            }
+
+    def test_dumps(self):
+        """ Test only differences between dumps are written. """
+        # Given
+        paths = [
+            self.create_dump("1.json", {
+                "unit1": (1, ["2020-01-01"]), "unit2": (1, [])}),
+            self.create_dump("2.json", {
+                "unit1": (2, ["2020-01-01", "2020-02-01"]),
+                "unit2": (1, []),
+                "unit3": (1, [])}),
+            self.create_dump("3.json", {
+                "unit1": (2, ["2020-01-01", "2020-02-01"]),
+                "unit2": (3, []),
+                "unit3": (1, [])}),
+            ]
+        expected_result = [
+            {"insert": 2, "update": 0, "nochange": 0},
+            {"insert": 1, "update": 1, "nochange": 1},
+            {"insert": 0, "update": 1, "nochange": 2},
+            ]
+        expected_rows = {
+            "versions": [
+                ("unit1", 1), ("unit1", 2), ("unit2", 1), ("unit2", 3),
+                ("unit3", 1)],
+            "latest": [("unit1", 2), ("unit2", 3), ("unit3", 1)],
+            "changes": [
+                ("unit1", date(2020, 1, 1)), ("unit1", date(2020, 2, 1))],
+            }
 
         # When
-        result = run(data)
+        state = load_state(self.session)
+        result = [
+            process_source(self.session, path, state, True, True)
+            for path in paths]
 
         # Then
         self.assertEqual(result, expected_result)
-        db_mock.assert_called_once_with({
-            "engine": "sqlite", "driver": "", "username": "",
-            "password": "", "host": "", "port": "",
-            "database": "db.sqlite",
-            })
-        engine_mock.assert_called_once_with(database_url)
-        make_session_mock.assert_called_once_with(bind=engine)
-        session.assert_has_calls([
-            call(),
-            call().rollback(),
-            call().close(),
-            ])
+        self.assertEqual(self.get_rows(), expected_rows)
+        self.assertEqual(load_state(self.session), state)
 
+    def test_validity(self):
+        """ Test versions are valid from their latest change to the next. """
+        # Given
+        paths = [
+            self.create_dump("units-2020-01-15.json", {
+                "unit1": (1, ["2020-01-01"]), "unit2": (1, [])}),
+            self.create_dump("units-2020-03-01.json", {
+                "unit1": (2, ["2020-01-01", "2020-02-01"]),
+                "unit2": (2, [])}),
+            ]
+        expected_result = [
+            ("unit1", 1, date(2020, 1, 1), date(2020, 2, 1)),
+            ("unit1", 2, date(2020, 2, 1), None),
+            ("unit2", 1, date(2020, 1, 15), date(2020, 3, 1)),
+            ("unit2", 2, date(2020, 3, 1), None),
+            ]
 
-class RunCleanTests(unittest.TestCase):
-    """ Tests success cases for pata.migrate_units.run """
-
-    def setUp(self):
-        """ Global variables """
-        self.database_url = "test db url"
-        self.engine = MagicMock()
-        self.session = MagicMock()
-        self.db_config = {
-            "engine": "sqlite", "driver": "", "username": "", "password": "",
-            "host": "", "port": "", "database": "db.sqlite",
-            }
+        # When
+        state = load_state(self.session)
+        for path in paths:
+            process_source(self.session, path, state, True, True)
 
-    @patch("pata.migrate_units.sessionmaker")
-    @patch("pata.migrate_units.create_engine")
-    @patch("pata.migrate_units.get_database_url")
-    def test_empty(self, db_mock, engine_mock, make_session_mock):
-        """ Test result when data is empty. """
+        # Then
+        self.assertEqual(
+            self.session.query(
+                Units.name, UnitVersions.attack, UnitVersions.valid_from,
+                UnitVersions.valid_to)
+            .join(UnitVersions).order_by(Units.name, UnitVersions.id).all(),
+            expected_result)
+        self.assertEqual(state["unit1"].valid_from, date(2020, 2, 1))
+
+    def test_validity_without_changes(self):
+        """ Test versions without new changes are valid from the dump. """
         # Given
-        data = {}
-        expected_result = {}
+        paths = [
+            self.create_dump("units-2020-01-15.json", {
+                "unit1": (1, ["2020-01-01"])}),
+            self.create_dump("units-2020-03-01.json", {
+                "unit1": (2, ["2020-01-01"])}),
+            ]
+        expected_result = [
+            (1, date(2020, 1, 1), date(2020, 3, 1)),
+            (2, date(2020, 3, 1), None),
+            ]
+
+        # When
+        state = load_state(self.session)
+        for path in paths:
+            process_source(self.session, path, state, True, True)
 
-        db_mock.return_value = self.database_url
-        engine_mock.return_value = self.engine
-        make_session_mock.return_value = self.session
+        # Then
+        self.assertEqual(
+            self.session.query(
+                UnitVersions.attack, UnitVersions.valid_from,
+                UnitVersions.valid_to)
+            .order_by(UnitVersions.id).all(),
+            expected_result)
+
+    def test_diff(self):
+        """ Test state follows the dumps without writing (diff only). """
+        # Given
+        first = self.create_dump("1.json", {"unit1": (1, [])})
+        second = self.create_dump("2.json", {
+            "unit1": (2, []), "unit2": (1, [])})
+        process_source(self.session, first, load_state(self.session), True)
+        state = load_state(self.session)
+        expected_result = {"insert": 1, "update": 1, "nochange": 0}
 
         # When
-        result = run(data)
+        result = process_source(self.session, second, state)
 
         # Then
         self.assertEqual(result, expected_result)
-        db_mock.assert_called_once_with(self.db_config)
-        engine_mock.assert_called_once_with(self.database_url)
-        make_session_mock.assert_called_once_with(bind=self.engine)
-        self.session.assert_has_calls([
-            call(),
-            call().close(),
-            ])
+        self.assertEqual(
+            self.get_rows()["versions"], [("unit1", 1)])
+        self.assertEqual(set(state), {"unit1", "unit2"})
+        self.assertIsNone(state["unit2"].unit_id)
 
-    @patch("pata.migrate_units.process_transaction")
-    @patch("pata.migrate_units.load_to_models")
-    @patch("pata.migrate_units.sessionmaker")
-    @patch("pata.migrate_units.create_engine")
-    @patch("pata.migrate_units.get_database_url")
-    def test_diff(  # pylint: disable=too-many-arguments
-            self, db_mock, engine_mock,
-            make_session_mock, model_mock, process_mock):
-        """ Test result when no insert or update. """
+    def test_update_only(self):
+        """ Test new units are not inserted nor tracked. """
         # Given
-        data = {
-            "key1": "val1",
-            "key2": "val2",
-            }
-        unit1 = MagicMock()
-        unit2 = MagicMock()
-        expected_result = {
-            "key1": {"nochange": {}},
-            "key2": {"nochange": {}},
-            }
-
-        db_mock.return_value = self.database_url
-        engine_mock.return_value = self.engine
-        make_session_mock.return_value = self.session
-        model_mock.side_effect = [unit1, unit2]
-        process_mock.side_effect = [{"nochange": {}}, {"nochange": {}}]
+        path = self.create_dump("1.json", {"unit1": (1, [])})
+        state = load_state(self.session)
+        expected_result = {"insert": 1, "update": 0, "nochange": 0}
 
         # When
-        result = run(data)
+        result = process_source(self.session, path, state, update=True)
 
         # Then
         self.assertEqual(result, expected_result)
-        db_mock.assert_called_once_with(self.db_config)
-        engine_mock.assert_called_once_with(self.database_url)
-        make_session_mock.assert_called_once_with(bind=self.engine)
-        self.session.assert_has_calls([
-            call(),
-            call().close(),
-            ])
-        model_mock.assert_has_calls([
-            call("val1"),
-            call("val2"),
-            ])
-        process_mock.assert_has_calls([
-            call(self.session(), unit1, False, False),
-            call(self.session(), unit2, False, False),
-            ])
+        self.assertEqual(state, {})
+        self.assertEqual(self.session.query(Units).count(), 0)
+
 
+class IterUnitsTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.iter_units """
+
+    @patch("pata.migrate_units.PREFETCH_CHUNK_SIZE", 1)
+    @patch("pata.migrate_units.bulk_insert_units")
+    @patch("pata.migrate_units.prefetch_units")
     @patch("pata.migrate_units.process_transaction")
-    @patch("pata.migrate_units.load_to_models")
-    @patch("pata.migrate_units.sessionmaker")
-    @patch("pata.migrate_units.create_engine")
-    @patch("pata.migrate_units.get_database_url")
-    def test_changes(  # pylint: disable=too-many-arguments
-            self, db_mock, engine_mock,
-            make_session_mock, model_mock, process_mock):
-        """ Test result when insert or update are required. """
+    @patch("pata.migrate_units.load_to_values")
+    def test_chunks(self, model_mock, process_mock, prefetch_mock, bulk_mock):
+        """ Test units are prefetched and inserted per chunk. """
         # Given
-        data = {
-            "key1": "val1",
-            "key2": "val2",
-            }
+        session = MagicMock()
+        items = [("key1", "val1"), ("key2", "val2")]
+        expected_result = {"key1": {"insert": {}}, "key2": {"nochange": {}}}
+
         unit1 = MagicMock()
+        unit1.name = "name1"
         unit2 = MagicMock()
-        expected_result = {
-            "key1": {"insert": {}},
-            "key2": {"update": {}},
-            }
+        unit2.name = "name2"
 
-        db_mock.return_value = self.database_url
-        engine_mock.return_value = self.engine
-        make_session_mock.return_value = self.session
         model_mock.side_effect = [unit1, unit2]
-        process_mock.side_effect = [{"insert": {}}, {"update": {}}]
+        process_mock.side_effect = [{"insert": {}}, {"nochange": {}}]
 
         # When
-        result = run(data, True, True)
+        result = dict(iter_units(session, items, True, False))
 
         # Then
         self.assertEqual(result, expected_result)
-        db_mock.assert_called_once_with(self.db_config)
-        engine_mock.assert_called_once_with(self.database_url)
-        make_session_mock.assert_called_once_with(bind=self.engine)
-        self.session.assert_has_calls([
-            call(),
-            call().commit(),
-            call().close(),
+        prefetch_mock.assert_has_calls([
+            call(session, ["name1"]),
+            call(session, ["name2"]),
             ])
-        model_mock.assert_has_calls([
-            call("val1"),
-            call("val2"),
-            ])
-        process_mock.assert_has_calls([
-            call(self.session(), unit1, True, True),
-            call(self.session(), unit2, True, True),
-            ])
-
-
-class RunCommandDirtyTests(unittest.TestCase):
-    """ Tests fail cases for pata.migrate_units.run_command """
+        model_mock.assert_has_calls([call("val1"), call("val2")])
+        self.assertEqual(bulk_mock.call_count, 2)
 
-    @patch("pata.migrate_units.load_version")
-    def test_invalid(self, version_mock):
-        """ Test error when loading version. """
+    @patch("pata.migrate_units.bulk_insert_units")
+    @patch("pata.migrate_units.prefetch_units")
+    @patch("pata.migrate_units.process_transaction")
+    @patch("pata.migrate_units.load_to_values")
+    def test_timer(self, _, process_mock, prefetch_mock, bulk_mock):
+        """ Test units processed are counted by phase. """
         # Given
-        path = "/path/to/file"
-        expected_result = {"status": "Done"}
+        items = [("key1", "val1"), ("key2", "val2")]
+        timer = PhaseTimer()
+
+        def process(*args):
+            """ Insert first unit. """
+            if not args[-1]:
+                args[-1].append(args[1])
+            return {"insert": {}}
 
-        version_mock.return_value = {}
+        process_mock.side_effect = process
 
         # When
-        result = run_command(path)
+        list(iter_units(MagicMock(), items, True, False, timer))
 
         # Then
-        self.assertEqual(result, expected_result)
-        version_mock.assert_called_once_with(path)
-
-
-class RunCommandCleanTests(unittest.TestCase):
-    """ Tests success cases for pata.migrate_units.run_command """
+        self.assertEqual(
+            {name: totals[2] for name, totals in timer.phases.items()},
+            {"prefetch": 2, "load": 2, "diff": 2, "flush": 1})
+        prefetch_mock.assert_called_once()
+        bulk_mock.assert_called_once()
 
-    @patch("pata.migrate_units.run")
-    @patch("pata.migrate_units.load_version")
-    def test_no_diff(self, version_mock, run_mock):
-        """ Test when diff param is not passed. """
+    @patch("pata.migrate_units.bulk_insert_units")
+    @patch("pata.migrate_units.prefetch_units")
+    @patch("pata.migrate_units.process_transaction")
+    @patch("pata.migrate_units.load_to_values")
+    def test_iter_units(self, _, process_mock, prefetch_mock, bulk_mock):
+        """ Test results are yielded once their chunk is inserted. """
         # Given
-        path = "/path/to/file"
-        data = MagicMock()
-        expected_result = {"status": "Done"}
+        items = [("key1", "val1"), ("key2", "val2")]
 
-        version_mock.return_value = data
-        run_mock.return_value = MagicMock()
+        process_mock.side_effect = [{"insert": {}}, {"nochange": {}}]
 
         # When
-        result = run_command(path)
+        result = iter_units(MagicMock(), items, True, False)
 
         # Then
-        self.assertEqual(result, expected_result)
-        version_mock.assert_called_once_with(path)
-        run_mock.assert_called_once_with(data, insert=False, update=False)
-
-    @patch("pata.migrate_units.run")
-    @patch("pata.migrate_units.load_version")
-    def test_diff(self, version_mock, run_mock):
-        """ Test when diff param is passed. """
+        prefetch_mock.assert_not_called()
+        self.assertEqual(next(result), ("key1", {"insert": {}}))
+        bulk_mock.assert_called_once()
+        self.assertEqual(list(result), [("key2", {"nochange": {}})])
+        prefetch_mock.assert_called_once()
+
+    def test_key_not_name(self):
+        """ Test existing units are found by name, not by their key. """
         # Given
-        path = "/path/to/file"
-        data = MagicMock()
-        diff = MagicMock()
-        expected_result = diff
+        engine = create_engine("sqlite://")
+        BASE.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        data = create_unit_data("unit1")
+        list(iter_units(session, [("key1", data)], True, True))
+        data = create_unit_data("unit1")
+        data["stats"]["attack"] = 5
 
-        version_mock.return_value = data
-        run_mock.return_value = diff
+        # When
+        result = dict(iter_units(session, [("key2", data)], True, True))
+
+        # Then
+        self.assertEqual(list(result["key2"]), ["update"])
+        self.assertEqual(
+            session.query(Units.name, UnitVersions.attack).join(
+                UnitVersions).order_by(UnitVersions.id).all(),
+            [("unit1", 1), ("unit1", 5)])
+        session.close()
+        engine.dispose()
+
+    def test_validity_without_changes(self):
+        """ Test versions without new changes are valid from today. """
+        # Given
+        engine = create_engine("sqlite://")
+        BASE.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        data = create_unit_data("unit1")
+        list(iter_units(session, [("unit1", data)], True, True))
+        data = create_unit_data("unit1")
+        data["stats"]["attack"] = 5
+        expected_result = [
+            (1, date(2000, 1, 1), date.today()),
+            (5, date.today(), None),
+            ]
 
         # When
-        result = run_command(path, True, True, True)
+        list(iter_units(session, [("unit1", data)], True, True))
 
         # Then
-        self.assertEqual(result, expected_result)
-        version_mock.assert_called_once_with(path)
-        run_mock.assert_called_once_with(data, insert=True, update=True)
+        self.assertEqual(
+            session.query(
+                UnitVersions.attack, UnitVersions.valid_from,
+                UnitVersions.valid_to)
+            .order_by(UnitVersions.id).all(),
+            expected_result)
+        session.close()
+        engine.dispose()
+
+
+class CountResultsTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.count_results """
+
+    def test_count(self):
+        """ Test units are counted by result. """
+        # Given
+        result = {
+            "key1": {"insert": {}},
+            "key2": {"update": {"units": {}}},
+            "key3": {"nochange": {}},
+            "key4": {"nochange": {}},
+            }
+
+        # When/Then
+        self.assertEqual(
+            count_results(result), {"insert": 1, "update": 1, "nochange": 2})
+
+
+class SummarizeTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.summarize """
+
+    def test_summarize(self):
+        """ Test phases are returned unless the diff is requested. """
+        # Given
+        changes = {"key1": {"insert": {}}}
+        statements = {"statements": 1}
+        phases = {"total": {"wall": 1, "cpu": 1, "count": 0}}
+        data = {
+            "status": (False, None, {"status": "Done", "phases": phases}),
+            "diff": (True, None, changes),
+            "status_statements": (
+                False, statements,
+                {"status": "Done", "phases": phases,
+                 "statements": statements}),
+            "diff_statements": (
+                True, statements,
+                {"changes": changes, "statements": statements}),
+            }
+
+        # When/Then
+        for name, (diff, sql, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    summarize(changes, diff, phases, sql), expected_result)
+
+
+class MigratorTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.Migrator """
+
+    @patch("pata.migrate_units.event")
+    @patch("pata.migrate_units.setup_logging")
+    @patch("pata.migrate_units.warm_up")
+    @patch("pata.migrate_units.set_pragmas")
+    @patch("pata.migrate_units.sessionmaker")
+    @patch("pata.migrate_units.create_engine")
+    @patch("pata.migrate_units.get_database_url")
+    def test_init(  # pylint: disable=too-many-arguments
+            self, db_mock, engine_mock, make_session_mock, pragmas_mock,
+            warm_mock, logging_mock, event_mock):
+        """ Test engine, pool and session factory per database. """
+        # Given
+        databases = {
+            "file": {
+                "engine": "sqlite", "database": "db.sqlite",
+                "pragmas": {"journal_mode": "wal"},
+                },
+            "memory": {"engine": "sqlite"},
+            }
+        data = {
+            "file": (
+                {"journal_mode": "wal"},
+                call("test db url", poolclass=QueuePool,
+                     connect_args={"check_same_thread": False}),
+                ),
+            "memory": (None, call("test db url")),
+            "missing": (None, call("test db url")),
+            }
+        db_mock.return_value = "test db url"
+
+        # When/Then
+        for name, (pragmas, engine_call) in data.items():
+            with self.subTest(name), \
+                    patch.dict("pata.migrate_units.DATABASES", databases):
+                engine = engine_mock.return_value
+                migrator = Migrator(name)
+
+                self.assertEqual(migrator.database, name)
+                self.assertEqual(migrator.url, "test db url")
+                self.assertEqual(migrator.engine, engine)
+                self.assertEqual(
+                    migrator.session_class, make_session_mock.return_value)
+                db_mock.assert_called_with(databases.get(name, {}))
+                self.assertEqual(engine_mock.call_args, engine_call)
+                pragmas_mock.assert_called_with(engine, pragmas)
+                make_session_mock.assert_called_with(bind=engine)
+                self.assertEqual(migrator.generation, 0)
+                event_mock.listen.assert_called_with(
+                    migrator.session_class, "after_commit",
+                    migrator.bump_generation)
+                warm_mock.assert_called_with()
+                logging_mock.assert_called_with()
+
+    def test_close(self):
+        """ Test connections of the pool are closed. """
+        # Given
+        migrator = MagicMock()
+
+        # When
+        Migrator.close(migrator)
+
+        # Then
+        migrator.engine.dispose.assert_called_once_with()
+
+    @patch("pata.migrate_units.warm_up")
+    @patch("pata.migrate_units.setup_logging")
+    def test_generation(self, _, __):
+        """ Test every commit increases the generation. """
+        # Given
+        databases = {"memory": {"engine": "sqlite"}}
+
+        with patch.dict("pata.migrate_units.DATABASES", databases):
+            migrator = Migrator("memory")
+        session = migrator.session_class()
+
+        # When
+        session.commit()
+        session.commit()
+
+        # Then
+        self.assertEqual(migrator.generation, 2)
+        session.close()
+        migrator.close()
+
+    @patch("pata.migrate_units.StatementStats")
+    def test_instrument(self, stats_mock):
+        """ Test statements of the engine are recorded (once). """
+        # Given
+        migrator = MagicMock(statements=None)
+
+        # When
+        first = Migrator.instrument(migrator)
+        second = Migrator.instrument(migrator)
+
+        # Then
+        self.assertIs(first, stats_mock.return_value)
+        self.assertIs(second, first)
+        stats_mock.assert_called_once_with(
+            SLOW_STATEMENT_MS, REPEATED_STATEMENT_LIMIT)
+        first.attach.assert_called_once_with(migrator.engine)
+
+
+class WarmUpTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.warm_up """
+
+    def test_warm_up(self):
+        """ Test columns are cached for all models. """
+        # Given
+        COLUMNS_CACHE.clear()
+        expected_result = {
+            Units, UnitVersions, UnitChanges, UnitLatestVersions}
+
+        # When
+        warm_up()
+
+        # Then
+        self.assertEqual(
+            {model for model, _, _ in COLUMNS_CACHE}, expected_result)
+
+
+class GetMigratorTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.get_migrator """
+
+    def setUp(self):
+        """ Start without migrators. """
+        self.migrators = patch.dict("pata.migrate_units.MIGRATORS", clear=True)
+        self.migrators.start()
+
+    def tearDown(self):
+        """ Don't leak migrators to other tests. """
+        self.migrators.stop()
+
+    @patch("pata.migrate_units.Migrator")
+    def test_cached(self, migrator_mock):
+        """ Test a single migrator is created per database. """
+        # When
+        first = get_migrator()
+        second = get_migrator("sqlite")
+        other = get_migrator("other")
+
+        # Then
+        self.assertIs(first, second)
+        self.assertIs(first, migrator_mock.return_value)
+        self.assertIs(other, migrator_mock.return_value)
+        self.assertEqual(
+            migrator_mock.call_args_list, [call("sqlite"), call("other")])
+
+
+class RunTests(unittest.TestCase):
+    """ Tests for the functions using the default migrator. """
+
+    @patch("pata.migrate_units.get_migrator")
+    def test_run(self, migrator_mock):
+        """ Test run uses the default migrator. """
+        # Given
+        data = {"key1": "val1"}
+        manifest = MagicMock()
+
+        # When
+        result = run(data, True, False, manifest, 10)
+
+        # Then
+        self.assertEqual(result, migrator_mock().run())
+        migrator_mock().run.assert_any_call(
+            data, insert=True, update=False, manifest=manifest,
+            batch_size=10)
+
+    @patch("pata.migrate_units.get_migrator")
+    def test_run_iter(self, migrator_mock):
+        """ Test run_iter uses the default migrator. """
+        # Given
+        data = {"key1": "val1"}
+        session = MagicMock()
+
+        # When
+        result = run_iter(data, True, False, 10, session)
+
+        # Then
+        self.assertEqual(result, migrator_mock().run_iter())
+        migrator_mock().run_iter.assert_any_call(
+            data, insert=True, update=False, batch_size=10, session=session)
+
+    @patch("pata.migrate_units.get_migrator")
+    def test_run_command(self, migrator_mock):
+        """ Test run_command uses the default migrator. """
+        # Given
+        path = "/path/to/file"
+
+        # When
+        result = run_command(
+            path, True, False, True, True, 10, True, True, "pata.prom",
+            "changes.jsonl")
+
+        # Then
+        self.assertEqual(result, migrator_mock().run_command())
+        migrator_mock().run_command.assert_any_call(
+            path, diff=True, insert=False, update=True, force=True,
+            batch_size=10, resume=True, sql_stats=True,
+            metrics_path="pata.prom", output="changes.jsonl")
+
+
+class MigratorRunDirtyTests(unittest.TestCase):
+    """ Tests fail cases for pata.migrate_units.Migrator.run """
+
+    @patch("pata.migrate_units.prefetch_units")
+    @patch("pata.migrate_units.load_to_values")
+    def test_rollback(self, model_mock, prefetch_mock):
+        """
+        Test result when when exception is raised.
+
+        The side effect class must be first one inside the try/except block.
+
+        """
+        # Given
+        data = {"key1": "val1"}
+        session = MagicMock()
+        migrator = MagicMock(session_class=session)
+        migrator.run_iter.side_effect = partial(Migrator.run_iter, migrator)
+        expected_result = {}
+
+        model_mock.side_effect = SQLAlchemyError()
+
+        # When
+        result = Migrator.run(migrator, data)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        session.assert_has_calls([
+            call(),
+            call().rollback(),
+            call().close(),
+            ])
+        prefetch_mock.assert_not_called()
+
+
+class MigratorRunCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.Migrator.run """
+
+    def setUp(self):
+        """ Global variables """
+        self.session = MagicMock()
+        self.migrator = MagicMock(session_class=self.session)
+        self.migrator.run_iter.side_effect = partial(
+            Migrator.run_iter, self.migrator)
+
+    @patch("pata.migrate_units.prefetch_units")
+    def test_empty(self, prefetch_mock):
+        """ Test result when data is empty. """
+        # Given
+        data = {}
+        expected_result = {}
+
+        # When
+        result = Migrator.run(self.migrator, data)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.session.assert_has_calls([
+            call(),
+            call().close(),
+            ])
+        prefetch_mock.assert_not_called()
+
+    @patch("pata.migrate_units.prefetch_units")
+    @patch("pata.migrate_units.process_transaction")
+    @patch("pata.migrate_units.load_to_values")
+    def test_diff(self, model_mock, process_mock, prefetch_mock):
+        """ Test result when no insert or update. """
+        # Given
+        data = {
+            "key1": "val1",
+            "key2": "val2",
+            }
+        unit1 = MagicMock()
+        unit1.name = "name1"
+        unit2 = MagicMock()
+        unit2.name = "name2"
+        expected_result = {
+            "key1": {"nochange": {}},
+            "key2": {"nochange": {}},
+            }
+
+        model_mock.side_effect = [unit1, unit2]
+        process_mock.side_effect = [{"nochange": {}}, {"nochange": {}}]
+
+        # When
+        result = Migrator.run(self.migrator, data)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.session.assert_has_calls([
+            call(),
+            call().close(),
+            ])
+        model_mock.assert_has_calls([
+            call("val1"),
+            call("val2"),
+            ])
+        prefetch_mock.assert_called_once_with(
+            self.session(), ["name1", "name2"])
+        process_mock.assert_has_calls([
+            call(self.session(), unit1, False, False, prefetch_mock(), []),
+            call(self.session(), unit2, False, False, prefetch_mock(), []),
+            ])
+
+    @patch("pata.migrate_units.prefetch_units")
+    @patch("pata.migrate_units.process_transaction")
+    @patch("pata.migrate_units.load_to_values")
+    def test_changes(self, model_mock, process_mock, prefetch_mock):
+        """ Test result when insert or update are required. """
+        # Given
+        data = {
+            "key1": "val1",
+            "key2": "val2",
+            }
+        unit1 = MagicMock()
+        unit1.name = "name1"
+        unit2 = MagicMock()
+        unit2.name = "name2"
+        expected_result = {
+            "key1": {"insert": {}},
+            "key2": {"update": {}},
+            }
+
+        model_mock.side_effect = [unit1, unit2]
+        process_mock.side_effect = [{"insert": {}}, {"update": {}}]
+
+        # When
+        result = Migrator.run(self.migrator, data, True, True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.session.assert_has_calls([
+            call(),
+            call().flush(),
+            call().commit(),
+            call().close(),
+            ])
+        model_mock.assert_has_calls([
+            call("val1"),
+            call("val2"),
+            ])
+        prefetch_mock.assert_called_once_with(
+            self.session(), ["name1", "name2"])
+        process_mock.assert_has_calls([
+            call(self.session(), unit1, True, True, prefetch_mock(), []),
+            call(self.session(), unit2, True, True, prefetch_mock(), []),
+            ])
+
+    @patch("pata.migrate_units.prefetch_units")
+    @patch("pata.migrate_units.process_transaction")
+    @patch("pata.migrate_units.load_to_values")
+    def test_manifest(self, model_mock, process_mock, prefetch_mock):
+        """ Test only changed units are processed when using a manifest. """
+        # Given
+        data = {
+            "key1": "val1",
+            "key2": "val2",
+            }
+        manifest = MagicMock()
+        unit2 = MagicMock()
+        unit2.name = "name2"
+        expected_result = {
+            "key2": {"update": {}},
+            }
+
+        manifest.changed_items.return_value = iter([("key2", "val2")])
+        model_mock.return_value = unit2
+        process_mock.return_value = {"update": {}}
+
+        # When
+        result = Migrator.run(
+            self.migrator, data, True, True, manifest=manifest)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        manifest.changed_items.assert_called_once_with(data.items())
+        prefetch_mock.assert_called_once_with(self.session(), ["name2"])
+        model_mock.assert_called_once_with("val2")
+        self.session.assert_has_calls([
+            call(),
+            call().flush(),
+            call().commit(),
+            call().close(),
+            ])
+        manifest.commit.assert_called_once_with()
+
+    @patch("pata.migrate_units.iter_units")
+    def test_batches(self, process_mock):
+        """ Test changes are committed (and session cleared) per batch. """
+        # Given
+        data = {"key1": "val1", "key2": "val2", "key3": "val3"}
+        manifest = MagicMock()
+        expected_result = {
+            "key1": {"insert": {}},
+            "key2": {"nochange": {}},
+            "key3": {"update": {}},
+            }
+
+        manifest.changed_items.side_effect = list
+        process_mock.side_effect = [
+            [("key1", {"insert": {}}), ("key2", {"nochange": {}})],
+            [("key3", {"update": {}})],
+            ]
+
+        # When
+        result = Migrator.run(
+            self.migrator, data, True, True, manifest=manifest, batch_size=2)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        process_mock.assert_has_calls([
+            call(
+                self.session(), [("key1", "val1"), ("key2", "val2")],
+                True, True, ANY),
+            call(self.session(), [("key3", "val3")], True, True, ANY),
+            ])
+        manifest.changed_items.assert_has_calls([
+            call([("key1", "val1"), ("key2", "val2")]),
+            call([("key3", "val3")]),
+            ])
+        self.session.assert_has_calls([
+            call(),
+            call().flush(),
+            call().commit(),
+            call().expunge_all(),
+            call().flush(),
+            call().commit(),
+            call().expunge_all(),
+            call().close(),
+            ])
+        self.assertEqual(manifest.commit.call_count, 2)
+
+    @patch("pata.migrate_units.iter_units")
+    def test_report(self, process_mock):
+        """ Test results are written to the report instead of returned. """
+        # Given
+        data = {"key1": "val1", "key2": "val2", "key3": "val3"}
+        report = MagicMock()
+
+        process_mock.side_effect = [
+            [("key1", {"nochange": {}}), ("key2", {"nochange": {}})],
+            [("key3", {"update": {}})],
+            ]
+
+        # When
+        result = Migrator.run(
+            self.migrator, data, True, True, batch_size=2, report=report)
+
+        # Then
+        self.assertEqual(result, {})
+        report.add_unit.assert_has_calls([
+            call("key1", {"nochange": {}}),
+            call("key2", {"nochange": {}}),
+            call("key3", {"update": {}}),
+            ])
+        self.session.assert_has_calls([
+            call(),
+            call().expunge_all(),
+            call().flush(),
+            call().commit(),
+            call().expunge_all(),
+            call().close(),
+            ])
+
+    @patch("pata.migrate_units.iter_units")
+    def test_batches_rollback(self, process_mock):
+        """ Test only the failed batch is rolled back. """
+        # Given
+        data = {"key1": "val1", "key2": "val2"}
+        manifest = MagicMock()
+        expected_result = {"key1": {"insert": {}}}
+
+        process_mock.side_effect = [
+            [("key1", {"insert": {}})], SQLAlchemyError()]
+
+        # When
+        result = Migrator.run(
+            self.migrator, data, True, True, manifest=manifest, batch_size=1)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.session.assert_has_calls([
+            call(),
+            call().flush(),
+            call().commit(),
+            call().expunge_all(),
+            call().rollback(),
+            call().close(),
+            ])
+        manifest.assert_has_calls([
+            call.changed_items([("key1", "val1")]),
+            call.commit(),
+            call.changed_items([("key2", "val2")]),
+            call.rollback(),
+            ])
+
+    @patch("pata.migrate_units.iter_units")
+    def test_checkpoint(self, process_mock):
+        """ Test checkpoint advanced per batch and cleared at the end. """
+        # Given
+        data = [("key1", "val1"), ("key2", "val2"), ("key3", "val3")]
+        checkpoint = MagicMock()
+
+        process_mock.return_value = []
+
+        # When
+        Migrator.run(
+            self.migrator, data, True, batch_size=2, checkpoint=checkpoint)
+
+        # Then
+        checkpoint.assert_has_calls([
+            call.advance([("key1", "val1"), ("key2", "val2")]),
+            call.advance([("key3", "val3")]),
+            call.clear(),
+            ])
+
+    @patch("pata.migrate_units.iter_units")
+    def test_checkpoint_failed(self, process_mock):
+        """ Test checkpoint kept (after the last commit) on failure. """
+        # Given
+        data = [("key1", "val1"), ("key2", "val2")]
+        checkpoint = MagicMock()
+
+        process_mock.side_effect = [[], SQLAlchemyError()]
+
+        # When
+        Migrator.run(
+            self.migrator, data, True, batch_size=1, checkpoint=checkpoint)
+
+        # Then
+        checkpoint.advance.assert_called_once_with([("key1", "val1")])
+        checkpoint.clear.assert_not_called()
+
+    @patch("pata.migrate_units.iter_units")
+    def test_checkpoint_diff_only(self, process_mock):
+        """ Test checkpoint kept when no insert/update is done. """
+        # Given
+        data = [("key1", "val1"), ("key2", "val2")]
+        checkpoint = MagicMock()
+
+        process_mock.return_value = []
+
+        # When
+        Migrator.run(self.migrator, data, batch_size=1, checkpoint=checkpoint)
+
+        # Then
+        checkpoint.advance.assert_not_called()
+        checkpoint.clear.assert_not_called()
+
+    @patch("pata.migrate_units.prefetch_units")
+    def test_manifest_diff_only(self, prefetch_mock):
+        """ Test manifest is not accepted when no insert/update is done. """
+        # Given
+        manifest = MagicMock()
+        manifest.changed_items.return_value = iter([])
+
+        # When
+        Migrator.run(self.migrator, {}, manifest=manifest)
+
+        # Then
+        prefetch_mock.assert_not_called()
+        manifest.commit.assert_not_called()
+
+
+class MigratorRunIterTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.Migrator.run_iter """
+
+    def setUp(self):
+        """ Global variables """
+        self.session = MagicMock()
+        self.migrator = MagicMock(session_class=self.session, statements=None)
+
+    @patch("pata.migrate_units.iter_units")
+    def test_yield(self, process_mock):
+        """ Test results are yielded before the batch is committed. """
+        # Given
+        data = {"key1": "val1", "key2": "val2"}
+
+        process_mock.side_effect = [
+            [("key1", {"insert": {}})], [("key2", {"nochange": {}})]]
+
+        # When
+        result = Migrator.run_iter(self.migrator, data, True, True, None, 1)
+
+        # Then
+        self.assertEqual(next(result), ("key1", {"insert": {}}))
+        self.session().commit.assert_not_called()
+        self.assertEqual(list(result), [("key2", {"nochange": {}})])
+        self.session.assert_has_calls([
+            call(),
+            call().flush(),
+            call().commit(),
+            call().expunge_all(),
+            call().expunge_all(),
+            call().close(),
+            ])
+
+    @patch("pata.migrate_units.iter_units")
+    def test_session(self, process_mock):
+        """ Test the session of the caller is only flushed. """
+        # Given
+        session = MagicMock()
+        manifest = MagicMock()
+        checkpoint = MagicMock()
+
+        manifest.changed_items.side_effect = list
+        process_mock.return_value = [("key1", {"update": {}})]
+
+        # When
+        result = list(Migrator.run_iter(
+            self.migrator, {"key1": "val1"}, True, True, manifest, 1,
+            checkpoint, session=session))
+
+        # Then
+        self.assertEqual(result, [("key1", {"update": {}})])
+        self.session.assert_not_called()
+        self.assertEqual(session.mock_calls, [call.flush()])
+        manifest.commit.assert_not_called()
+        checkpoint.advance.assert_not_called()
+        checkpoint.clear.assert_not_called()
+
+    @patch("pata.migrate_units.iter_units")
+    def test_stop(self, process_mock):
+        """ Test the batch isn't committed when stopped early. """
+        # Given
+        process_mock.return_value = [
+            ("key1", {"insert": {}}), ("key2", {"insert": {}})]
+
+        # When
+        result = Migrator.run_iter(self.migrator, {}, True, True)
+        next(result)
+        result.close()
+
+        # Then
+        self.session.assert_has_calls([call(), call().close()])
+        self.session().commit.assert_not_called()
+
+    @patch("pata.migrate_units.iter_units")
+    def test_error(self, process_mock):
+        """ Test database errors are raised after rolling back. """
+        # Given
+        manifest = MagicMock()
+
+        process_mock.side_effect = SQLAlchemyError()
+
+        # When/Then
+        with self.assertRaises(SQLAlchemyError):
+            list(Migrator.run_iter(self.migrator, {}, True, True, manifest))
+        self.session.assert_has_calls([
+            call(),
+            call().rollback(),
+            call().close(),
+            ])
+        manifest.rollback.assert_called_once_with()
+
+    @patch("pata.migrate_units.iter_units")
+    def test_source_error(self, process_mock):
+        """ Test source errors are raised after rolling back. """
+        # Given
+        manifest = MagicMock()
+
+        process_mock.side_effect = SourceError("Invalid format")
+
+        # When/Then
+        with self.assertRaises(SourceError):
+            list(Migrator.run_iter(self.migrator, {}, True, True, manifest))
+        self.session.assert_has_calls([
+            call(),
+            call().rollback(),
+            call().close(),
+            ])
+        self.session().commit.assert_not_called()
+        manifest.rollback.assert_called_once_with()
+
+
+class MigratorRunSourcesTests(unittest.TestCase):
+    """ Tests for pata.migrate_units.Migrator.run_sources """
+
+    def setUp(self):
+        """ Global variables """
+        self.session = MagicMock()
+        self.migrator = MagicMock(session_class=self.session)
+
+    @patch("pata.migrate_units.process_source")
+    @patch("pata.migrate_units.load_state")
+    def test_commit(self, state_mock, process_mock):
+        """ Test state is loaded once and dumps committed one by one. """
+        # Given
+        paths = ["1.json", "2.json"]
+        expected_result = {"1.json": {"insert": 1}, "2.json": {"update": 1}}
+
+        process_mock.side_effect = [{"insert": 1}, {"update": 1}]
+
+        # When
+        result = Migrator.run_sources(self.migrator, paths, True, True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        state_mock.assert_called_once_with(self.session())
+        process_mock.assert_has_calls([
+            call(self.session(), "1.json", state_mock(), True, True),
+            call(self.session(), "2.json", state_mock(), True, True),
+            ])
+        self.session.assert_has_calls([
+            call(),
+            call().commit(),
+            call().commit(),
+            call().close(),
+            ])
+
+    @patch("pata.migrate_units.process_source")
+    @patch("pata.migrate_units.load_state")
+    def test_report(self, _, process_mock):
+        """ Test counts of every dump are written to the report. """
+        # Given
+        paths = ["1.json", "2.json"]
+        report = MagicMock()
+
+        process_mock.side_effect = [{"insert": 1}, {"update": 1}]
+
+        # When
+        Migrator.run_sources(self.migrator, paths, report=report)
+
+        # Then
+        report.add_source.assert_has_calls([
+            call("1.json", {"insert": 1}),
+            call("2.json", {"update": 1}),
+            ])
+
+    @patch("pata.migrate_units.process_source")
+    @patch("pata.migrate_units.load_state")
+    def test_rollback(self, state_mock, process_mock):
+        """ Test dumps after a failure are not processed. """
+        # Given
+        paths = ["1.json", "2.json", "3.json"]
+        expected_result = {"1.json": {"insert": 1}}
+
+        process_mock.side_effect = [{"insert": 1}, SQLAlchemyError()]
+
+        # When
+        result = Migrator.run_sources(self.migrator, paths, insert=True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(process_mock.call_count, 2)
+        self.session.assert_has_calls([
+            call(),
+            call().commit(),
+            call().rollback(),
+            call().close(),
+            ])
+        state_mock.assert_called_once_with(self.session())
+
+    @patch("pata.migrate_units.process_source")
+    @patch("pata.migrate_units.load_state")
+    def test_source_error(self, _, process_mock):
+        """ Test a dump that can't be read is rolled back and raised. """
+        # Given
+        paths = ["1.json", "2.json", "3.json"]
+
+        process_mock.side_effect = [{"insert": 1}, SourceError("2.json")]
+
+        # When/Then
+        with self.assertRaises(SourceError):
+            Migrator.run_sources(self.migrator, paths, insert=True)
+        self.assertEqual(process_mock.call_count, 2)
+        self.session.assert_has_calls([
+            call(),
+            call().commit(),
+            call().rollback(),
+            call().close(),
+            ])
+
+
+class MigratorRunCommandDirtyTests(unittest.TestCase):
+    """ Tests fail cases for pata.migrate_units.Migrator.run_command """
+
+    def setUp(self):
+        """ Global variables """
+        self.migrator = MagicMock(url="sqlite:///db.sqlite", statements=None)
+        patcher = patch("pata.migrate_units.PhaseTimer")
+        self.timer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def use_database(self):
+        """ Run the migrator against an in-memory database. """
+        engine = create_engine("sqlite://")
+        BASE.metadata.create_all(engine)
+        self.addCleanup(engine.dispose)
+        self.migrator.session_class = sessionmaker(bind=engine)
+        self.migrator.run.side_effect = partial(Migrator.run, self.migrator)
+        self.migrator.run_iter.side_effect = partial(
+            Migrator.run_iter, self.migrator)
+        self.timer.iterate.side_effect = lambda name, items: items
+        return self.migrator.session_class()
+
+    def create_truncated_dump(self, directory):
+        """ Dump of two units, cut in the middle of the second one. """
+        path = os.path.join(directory, "units.json")
+        content = json.dumps({
+            name: create_unit_data(name) for name in ("unit1", "unit2")})
+        with open(path, "w") as data_file:
+            data_file.write(content[:-20])
+        return path
+
+    @patch("pata.migrate_units.iter_version")
+    def test_invalid(self, version_mock):
+        """ Test error when loading version fails the run. """
+        # Given
+        path = "/path/to/file"
+        expected_result = {
+            "status": "Failed", "phases": self.timer.summary()}
+
+        self.migrator.run.side_effect = SourceError("Invalid format")
+
+        # When/Then
+        for diff in (False, True):
+            with self.subTest(diff=diff):
+                result = Migrator.run_command(
+                    self.migrator, path, diff=diff, force=True)
+                self.assertEqual(result, expected_result)
+        version_mock.assert_called_with(path)
+
+    @patch("pata.migrate_units.find_sources")
+    def test_invalid_sources(self, _):
+        """ Test error when loading a dump fails the run. """
+        # Given
+        self.migrator.run_sources.side_effect = SourceError("Invalid format")
+
+        # When
+        result = Migrator.run_command(self.migrator, "/path/*.json")
+
+        # Then
+        self.assertEqual(result["status"], "Failed")
+
+    def test_truncated(self):
+        """ Test no unit of a truncated file is committed. """
+        # Given
+        session = self.use_database()
+
+        # When
+        with tempfile.TemporaryDirectory() as directory:
+            result = Migrator.run_command(
+                self.migrator, self.create_truncated_dump(directory),
+                insert=True, update=True, force=True)
+
+        # Then
+        self.assertEqual(result["status"], "Failed")
+        self.assertEqual(session.query(Units).count(), 0)
+        session.close()
+
+    def test_truncated_manifest(self):
+        """ Test the digest of a truncated file isn't saved. """
+        # Given
+        self.use_database()
+        self.migrator.url = "sqlite://"
+        data = {name: create_unit_data(name) for name in ("unit1", "unit2")}
+        expected_result = ["Done", "Failed", "Failed"]
+
+        # When
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "units.json")
+            with open(path, "w") as data_file:
+                json.dump(data, data_file)
+            with patch(
+                    "pata.migrate_units.MANIFEST_PATH",
+                    os.path.join(directory, "manifest.json")):
+                result = [Migrator.run_command(
+                    self.migrator, path, insert=True, update=True)]
+                self.create_truncated_dump(directory)
+                result.extend(
+                    Migrator.run_command(
+                        self.migrator, path, insert=True, update=True)
+                    for _ in range(2))
+
+        # Then
+        self.assertEqual(
+            [item["status"] for item in result], expected_result)
+
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    @patch("pata.migrate_units.Manifest")
+    def test_failed(self, manifest_mock, digest_mock, version_mock):
+        """ Test manifest is not saved when changes weren't committed. """
+        # Given
+        path = "/path/to/file"
+        manifest = MagicMock(file_digest="old", pending={"unit1": "digest"})
+        expected_result = {"status": "Done", "phases": self.timer.summary()}
+
+        manifest_mock.load.return_value = manifest
+        digest_mock.return_value = "new"
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, insert=True, update=True)
+
+        # Then
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.assertEqual(result, expected_result)
+        self.migrator.run.assert_called_once_with(
+            self.timer.iterate(), insert=True, update=True,
+            manifest=manifest, batch_size=None, checkpoint=None,
+            timer=self.timer, report=None)
+        manifest.save.assert_not_called()
+        self.assertEqual(manifest.file_digest, "old")
+
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    @patch("pata.migrate_units.Manifest")
+    def test_rolled_back(self, manifest_mock, digest_mock, version_mock):
+        """ Test manifest is not saved when a batch was rolled back. """
+        # Given
+        path = "/path/to/file"
+        manifest = MagicMock(file_digest="old", pending={}, failed=True)
+
+        manifest_mock.load.return_value = manifest
+        digest_mock.return_value = "new"
+
+        # When
+        Migrator.run_command(
+            self.migrator, path, insert=True, update=True, batch_size=10)
+
+        # Then
+        version_mock.assert_called_once_with(path)
+        manifest.save.assert_not_called()
+        self.assertEqual(manifest.file_digest, "old")
+
+
+class MigratorRunCommandCleanTests(unittest.TestCase):
+    """ Tests success cases for pata.migrate_units.Migrator.run_command """
+
+    def setUp(self):
+        """ Global variables """
+        self.migrator = MagicMock(url="sqlite:///db.sqlite", statements=None)
+        patcher = patch("pata.migrate_units.PhaseTimer")
+        self.timer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    @patch("pata.migrate_units.iter_version")
+    def test_no_diff(self, version_mock):
+        """ Test when diff param is not passed. """
+        # Given
+        path = "/path/to/file"
+        data = MagicMock()
+        expected_result = {"status": "Done", "phases": self.timer.summary()}
+
+        self.timer.iterate.return_value = data
+        self.migrator.run.return_value = MagicMock()
+
+        # When
+        result = Migrator.run_command(self.migrator, path, force=True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        version_mock.assert_called_once_with(path)
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.migrator.run.assert_called_once_with(
+            data, insert=False, update=False, manifest=None,
+            batch_size=None, checkpoint=None, timer=self.timer, report=None)
+
+    @patch("pata.migrate_units.Checkpoint")
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    def test_diff(self, digest_mock, version_mock, checkpoint_mock):
+        """ Test when diff param is passed (and batches are checkpointed). """
+        # Given
+        path = "/path/to/file"
+        data = MagicMock()
+        diff = MagicMock()
+        expected_result = diff
+
+        digest_mock.return_value = "digest"
+        self.timer.iterate.return_value = data
+        self.migrator.run.return_value = diff
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, True, True, True, True, 10)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        version_mock.assert_called_once_with(path)
+        checkpoint_mock.assert_called_once_with(
+            CHECKPOINT_PATH, "sqlite:///db.sqlite", "digest")
+        checkpoint_mock.load.assert_not_called()
+        self.migrator.run.assert_called_once_with(
+            data, insert=True, update=True, manifest=None,
+            batch_size=10, checkpoint=checkpoint_mock(), timer=self.timer,
+            report=None)
+
+    @patch("pata.migrate_units.Checkpoint")
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    def test_resume(self, digest_mock, version_mock, checkpoint_mock):
+        """ Test units committed by a previous run are skipped. """
+        # Given
+        path = "/path/to/file"
+        checkpoint = checkpoint_mock.load.return_value
+        expected_result = {"status": "Done", "phases": self.timer.summary()}
+
+        digest_mock.return_value = "digest"
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, insert=True, update=True, force=True,
+            batch_size=10, resume=True)
+
+        # Then
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.assertEqual(result, expected_result)
+        checkpoint_mock.load.assert_called_once_with(
+            CHECKPOINT_PATH, "sqlite:///db.sqlite", "digest")
+        checkpoint.skip.assert_called_once_with(self.timer.iterate())
+        self.migrator.run.assert_called_once_with(
+            checkpoint.skip(), insert=True, update=True, manifest=None,
+            batch_size=10, checkpoint=checkpoint, timer=self.timer,
+            report=None)
+
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    def test_sql_stats(self, _, version_mock):
+        """ Test statements are summarized per unit processed. """
+        # Given
+        path = "/path/to/file"
+        statements = MagicMock()
+        expected_result = {
+            "changes": {"unit1": {"insert": {}}, "unit2": {"nochange": {}}},
+            "statements": statements.summary(),
+            }
+
+        self.migrator.instrument.side_effect = lambda: setattr(
+            self.migrator, "statements", statements)
+        self.migrator.run.return_value = expected_result["changes"]
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, diff=True, force=True, sql_stats=True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.migrator.instrument.assert_called_once_with()
+        statements.summary.assert_called_with(2)
+
+    @patch("pata.migrate_units.open_report")
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    def test_output(self, _, version_mock, report_mock):
+        """ Test changes are streamed to the output (counts returned). """
+        # Given
+        path = "/path/to/file"
+        report = report_mock.return_value.__enter__.return_value
+        expected_result = {
+            "status": "Done",
+            "phases": self.timer.summary(),
+            "units": {"insert": 1, "update": 0, "nochange": 2},
+            "output": "changes.jsonl",
+            }
+
+        report.counts = {"insert": 1, "update": 0, "nochange": 2}
+        self.migrator.run.return_value = {}
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, diff=True, insert=True, force=True,
+            output="changes.jsonl")
+
+        # Then
+        self.assertEqual(result, expected_result)
+        report_mock.assert_called_once_with("changes.jsonl")
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.migrator.run.assert_called_once_with(
+            self.timer.iterate(), insert=True, update=False, manifest=None,
+            batch_size=None, checkpoint=None, timer=self.timer,
+            report=report)
+
+    @patch("pata.migrate_units.write_samples")
+    @patch("pata.migrate_units.get_samples")
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    def test_metrics(self, _, version_mock, samples_mock, write_mock):
+        """ Test metrics are written (statements are recorded). """
+        # Given
+        path = "/path/to/file"
+        statements = MagicMock()
+
+        self.migrator.instrument.side_effect = lambda: setattr(
+            self.migrator, "statements", statements)
+        self.migrator.run.return_value = {
+            "unit1": {"insert": {}}, "unit2": {"nochange": {}}}
+
+        # When
+        Migrator.run_command(
+            self.migrator, path, insert=True, force=True,
+            metrics_path="pata.prom")
+
+        # Then
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.migrator.instrument.assert_called_once_with()
+        samples_mock.assert_called_once_with(
+            {"insert": 1, "update": 0, "nochange": 1},
+            self.timer.summary(), statements.summary(),
+            labels={"database": self.migrator.database})
+        write_mock.assert_called_once_with("pata.prom", samples_mock())
+
+    @patch("pata.migrate_units.write_samples")
+    @patch("pata.migrate_units.get_samples")
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    @patch("pata.migrate_units.Manifest")
+    def test_unchanged_metrics(
+            self, manifest_mock, digest_mock, version_mock, samples_mock,
+            write_mock):
+        """ Test metrics are written when the file didn't change. """
+        # Given
+        path = "/path/to/file"
+
+        manifest_mock.load.return_value = MagicMock(file_digest="digest")
+        digest_mock.return_value = "digest"
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, insert=True, update=True,
+            metrics_path="pata.prom")
+
+        # Then
+        self.assertEqual(result, {"status": "Unchanged"})
+        version_mock.assert_not_called()
+        samples_mock.assert_called_once_with(
+            {}, self.timer.summary(), None,
+            labels={"database": self.migrator.database})
+        write_mock.assert_called_once_with("pata.prom", samples_mock())
+
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    @patch("pata.migrate_units.Manifest")
+    def test_unchanged(
+            self, manifest_mock, digest_mock, version_mock):
+        """ Test nothing is processed when the file didn't change. """
+        # Given
+        path = "/path/to/file"
+        expected_result = {"status": "Unchanged"}
+
+        manifest_mock.load.return_value = MagicMock(file_digest="digest")
+        digest_mock.return_value = "digest"
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, insert=True, update=True)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        manifest_mock.load.assert_called_once_with(
+            MANIFEST_PATH, "sqlite:///db.sqlite")
+        digest_mock.assert_called_once_with(path)
+        version_mock.assert_not_called()
+        self.migrator.run.assert_not_called()
+
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    @patch("pata.migrate_units.Manifest")
+    def test_manifest(
+            self, manifest_mock, digest_mock, version_mock):
+        """ Test manifest is saved after changes are committed. """
+        # Given
+        path = "/path/to/file"
+        manifest = MagicMock(file_digest="old", pending={}, failed=False)
+        expected_result = {"status": "Done", "phases": self.timer.summary()}
+
+        manifest_mock.load.return_value = manifest
+        digest_mock.return_value = "new"
+
+        # When
+        result = Migrator.run_command(
+            self.migrator, path, insert=True, update=True)
+
+        # Then
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.assertEqual(result, expected_result)
+        self.migrator.run.assert_called_once_with(
+            self.timer.iterate(), insert=True, update=True,
+            manifest=manifest, batch_size=None, checkpoint=None,
+            timer=self.timer, report=None)
+        self.assertEqual(manifest.file_digest, "new")
+        manifest.save.assert_called_once_with()
+
+    @patch("pata.migrate_units.iter_version")
+    @patch("pata.migrate_units.get_file_digest")
+    @patch("pata.migrate_units.Manifest")
+    def test_manifest_diff_only(
+            self, manifest_mock, digest_mock, version_mock):
+        """ Test manifest is not saved when nothing is inserted/updated. """
+        # Given
+        path = "/path/to/file"
+        manifest = MagicMock(file_digest="old", pending={}, failed=False)
+
+        manifest_mock.load.return_value = manifest
+        digest_mock.return_value = "new"
+
+        # When
+        Migrator.run_command(self.migrator, path, diff=True)
+
+        # Then
+        self.timer.iterate.assert_called_once_with("parse", version_mock())
+        self.migrator.run.assert_called_once_with(
+            self.timer.iterate(), insert=False, update=False,
+            manifest=manifest, batch_size=None, checkpoint=None,
+            timer=self.timer, report=None)
+        manifest.save.assert_not_called()
+
+    @patch("pata.migrate_units.find_sources")
+    @patch("pata.migrate_units.iter_version")
+    def test_sources(self, version_mock, sources_mock):
+        """ Test directories and globs are processed as several dumps. """
+        # Given
+        changes = {"units-2000-01-01.json": {"insert": 1, "update": 0}}
+        with tempfile.TemporaryDirectory() as directory:
+            data = {
+                "directory": (
+                    directory, False,
+                    {"status": "Done", "phases": self.timer.summary()}),
+                "glob": ("/path/to/*.json", True, changes),
+                }
+
+            # When/Then
+            for name, (path, diff, expected_result) in data.items():
+                with self.subTest(name):
+                    self.migrator.run_sources.return_value = changes
+
+                    result = Migrator.run_command(
+                        self.migrator, path, diff=diff, insert=True)
+
+                    self.assertEqual(result, expected_result)
+                    sources_mock.assert_called_with(path)
+                    self.migrator.run_sources.assert_called_with(
+                        sources_mock(), insert=True, update=False,
+                        timer=self.timer, report=None)
+
+        version_mock.assert_not_called()
+        self.migrator.run.assert_not_called()
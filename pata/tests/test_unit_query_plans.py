@@ -0,0 +1,233 @@
+"""
+Query plan regression tests for the hot queries of pata.
+
+Every query is captured while it's executed by pata (or built the same way
+consumers read the data) and checked with EXPLAIN QUERY PLAN, failing if
+SQLite falls back to a full table scan.
+
+"""
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from datetime import date
+
+from mock import MagicMock
+from sqlalchemy import (
+    create_engine,
+    event,
+    )
+from sqlalchemy.orm import sessionmaker
+
+from pata.migrate_units import (
+    bulk_insert_units,
+    load_to_values,
+    prefetch_units,
+    )
+from pata.models.units import (
+    BASE,
+    UnitChanges,
+    UnitLatestVersions,
+    Units,
+    UnitVersions,
+    )
+from pata.repository import UnitRepository
+
+
+logging.disable()
+
+
+# Root of the repository (alembic.ini and the migration scripts).
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def create_unit_data(name):
+    """ Source data (JSON) for a unit with all fields. """
+    return {
+        "name": name,
+        "position": "Top",
+        "unit_spell": "Unit",
+        "abilities": "ability X",
+        "attributes": {
+            "blocker": False, "fragile": True, "frontline": False,
+            "prompt": True, "build_time": 0, "exhaust_ability": 1,
+            "exhaust_turn": 0, "lifespan": 1, "stamina": 0, "supply": 1,
+            },
+        "change_history": {"2000-01-01": ["Change 1"]},
+        "costs": {"blue": 3, "energy": 0, "gold": 13, "green": 0, "red": 0},
+        "links": {"image": None, "panel": None, "path": f"/{name}"},
+        "stats": {"attack": 1, "health": 1},
+        }
+
+
+class QueryPlanTests(unittest.TestCase):
+    """ Tests hot queries don't need full table scans. """
+
+    def setUp(self):
+        """ Database with some units and capture of executed queries. """
+        self.engine = create_engine("sqlite://")
+        BASE.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        bulk_insert_units(self.session, [
+            load_to_values(create_unit_data(f"unit{index}"))
+            for index in range(10)])
+        self.session.flush()
+
+        self.statements = []
+        event.listen(
+            self.engine, "before_cursor_execute", self.capture_statement)
+
+    def tearDown(self):
+        """ Close connections. """
+        event.remove(
+            self.engine, "before_cursor_execute", self.capture_statement)
+        self.session.close()
+        self.engine.dispose()
+
+    def capture_statement(  # pylint: disable=too-many-arguments
+            self, conn, cursor, statement, parameters, context, executemany):
+        """ Keep SELECT statements executed. """
+        # pylint: disable=unused-argument
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def assert_no_scans(self, tables=()):
+        """
+        Check query plans for all captured statements (full scans of tables
+        are allowed, e.g. when reading all their rows).
+        """
+        self.assertTrue(self.statements)
+        cursor = self.session.connection().connection.cursor()
+        for statement, parameters in self.statements:
+            plan = [
+                row[-1]
+                for row in cursor.execute(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters)
+                ]
+            with self.subTest(statement=statement, plan=plan):
+                self.assertFalse([
+                    step for step in plan
+                    if step.startswith("SCAN ")
+                    and step.split()[1] not in tables])
+
+    def test_lookup_by_name(self):
+        """ Test units (with versions and changes) lookup by name. """
+        # When
+        prefetch_units(self.session, ["unit1", "unit2"])
+        self.session.query(Units).filter_by(name="unit3").first()
+
+        # Then
+        self.assert_no_scans()
+
+    def test_new_units(self):
+        """ Test resolving ids and latest versions for new units. """
+        # When
+        bulk_insert_units(self.session, [
+            load_to_values(create_unit_data("new_unit"))])
+
+        # Then
+        self.assert_no_scans()
+
+    def test_latest_version(self):
+        """ Test latest version for a unit. """
+        # When
+        self.session.query(UnitVersions).join(
+            UnitLatestVersions,
+            UnitLatestVersions.version_id == UnitVersions.id,
+            ).join(
+                Units, Units.id == UnitLatestVersions.unit_id,
+                ).filter(Units.name == "unit1").one()
+        self.session.query(UnitLatestVersions).get(1)
+
+        # Then
+        self.assert_no_scans()
+
+    def test_versions(self):
+        """ Test version history for a unit (Units.versions). """
+        # Given
+        unit = self.session.query(Units).filter_by(name="unit1").one()
+        self.session.expire(unit)
+
+        # When
+        list(unit.versions)
+
+        # Then
+        self.assert_no_scans()
+
+    def test_change_history(self):
+        """ Test change history for a unit (Units.changes). """
+        # Given
+        unit = self.session.query(Units).filter_by(name="unit1").one()
+        self.session.expire(unit)
+
+        # When
+        list(unit.changes)
+        self.session.query(UnitChanges).filter(
+            UnitChanges.unit_id == unit.id).order_by(
+                UnitChanges.day.desc()).all()
+
+        # Then
+        self.assert_no_scans()
+
+    def test_as_of(self):
+        """ Test versions of units valid on a day (pata.repository). """
+        # Given
+        self.session.commit()
+        repository = UnitRepository(MagicMock(
+            generation=0, session_class=sessionmaker(bind=self.engine)))
+
+        # When
+        repository.get_unit_as_of("unit1", date(2000, 1, 1))
+        repository.list_units_as_of(date(2000, 1, 1))
+
+        # Then
+        self.assert_no_scans(tables=("units",))
+
+
+def get_indexes(path):
+    """ Columns of the named indexes of a SQLite database by table. """
+    with sqlite3.connect(path) as connection:
+        indexes = connection.execute(
+            "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' "
+            "AND name NOT LIKE 'sqlite_autoindex_%'").fetchall()
+        return {
+            (table, name): [
+                row[2] for row in connection.execute(
+                    f"PRAGMA index_info('{name}')")]
+            for table, name in indexes}
+
+
+class MigrationIndexTests(unittest.TestCase):
+    """ Tests the migrations create the indexes declared on the models. """
+
+    def test_indexes(self):
+        """ Test indexes after upgrading to head match the metadata. """
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(ROOT_DIR, "alembic.ini")) as ini_file:
+                config = ini_file.read().replace(
+                    "script_location = alembic",
+                    "script_location = " + os.path.join(ROOT_DIR, "alembic"))
+            with open(os.path.join(directory, "alembic.ini"), "w") as ini_file:
+                ini_file.write(config)
+            metadata_path = os.path.join(directory, "metadata.sqlite")
+            engine = create_engine(f"sqlite:///{metadata_path}")
+            BASE.metadata.create_all(engine)
+            engine.dispose()
+
+            # When
+            process = subprocess.run(
+                [sys.executable, "-m", "alembic", "upgrade", "head"],
+                cwd=directory, capture_output=True, text=True, check=False,
+                env=dict(os.environ, PYTHONPATH=ROOT_DIR))
+
+            # Then
+            self.assertEqual(process.returncode, 0, process.stderr)
+            self.assertEqual(
+                get_indexes(os.path.join(directory, "pata.sqlite")),
+                get_indexes(metadata_path))
@@ -0,0 +1,104 @@
+""" Unit tests for pata.report """
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from datetime import date
+
+from mock import patch
+
+from pata.report import (
+    DiffReport,
+    open_report,
+    )
+
+
+class DiffReportTests(unittest.TestCase):
+    """ Tests for pata.report.DiffReport """
+
+    def test_add_unit(self):
+        """ Test a line is written per unit and results are counted. """
+        # Given
+        output = io.StringIO()
+        report = DiffReport(output)
+        changes = {"units": {"day": {"old": None, "new": date(2000, 1, 1)}}}
+        expected_result = [
+            {"unit": "unit1", "result": "insert", "changes": {}},
+            {
+                "unit": "unit2",
+                "result": "update",
+                "changes": {
+                    "units": {"day": {"old": None, "new": "2000-01-01"}}},
+                },
+            ]
+
+        # When
+        report.add_unit("unit1", {"insert": {}})
+        report.add_unit("unit2", {"update": changes})
+
+        # Then
+        self.assertEqual(
+            [json.loads(line) for line in output.getvalue().splitlines()],
+            expected_result)
+        self.assertEqual(
+            report.counts, {"insert": 1, "update": 1, "nochange": 0})
+        self.assertEqual(report.changed(), 2)
+
+    def test_add_source(self):
+        """ Test a line is written per dump and counts are added. """
+        # Given
+        output = io.StringIO()
+        report = DiffReport(output)
+
+        # When
+        report.add_source("1.json", {"insert": 1, "update": 0, "nochange": 2})
+        report.add_source("2.json", {"insert": 0, "update": 3, "nochange": 0})
+
+        # Then
+        self.assertEqual(
+            json.loads(output.getvalue().splitlines()[0]),
+            {"source": "1.json", "insert": 1, "update": 0, "nochange": 2})
+        self.assertEqual(
+            report.counts, {"insert": 1, "update": 3, "nochange": 2})
+
+
+class OpenReportTests(unittest.TestCase):
+    """ Tests for pata.report.open_report """
+
+    def test_none(self):
+        """ Test there's no report without path. """
+        # When
+        with open_report(None) as report:
+            # Then
+            self.assertIsNone(report)
+
+    @patch("pata.report.sys.stdout", new_callable=io.StringIO)
+    def test_stdout(self, stdout_mock):
+        """ Test "-" writes to the standard output. """
+        # When
+        with open_report("-") as report:
+            report.add_unit("unit1", {"nochange": {}})
+
+        # Then
+        self.assertEqual(
+            stdout_mock.getvalue(),
+            '{"unit": "unit1", "result": "nochange", "changes": {}}\n')
+
+    def test_file(self):
+        """ Test the file is written (and closed). """
+        with tempfile.TemporaryDirectory() as directory:
+            # Given
+            path = os.path.join(directory, "changes.jsonl")
+
+            # When
+            with open_report(path) as report:
+                report.add_unit("unit1", {"insert": {}})
+
+            # Then
+            self.assertTrue(report.output.closed)
+            with open(path) as report_file:
+                self.assertEqual(
+                    json.loads(report_file.read()),
+                    {"unit": "unit1", "result": "insert", "changes": {}})
@@ -0,0 +1,256 @@
+""" Unit tests for pata.repository """
+import logging
+import unittest
+
+from datetime import date
+
+from mock import (
+    MagicMock,
+    patch,
+    )
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from pata.migrate_units import (
+    bulk_insert_units,
+    load_to_values,
+    process_transaction,
+    )
+from pata.models.units import (
+    BASE,
+    Units,
+    )
+from pata.models.values import UnitChangeValue
+from pata.repository import (
+    LRUCache,
+    MISSING,
+    UnitRepository,
+    )
+from pata.tests.test_unit_query_plans import create_unit_data
+
+
+logging.disable()
+
+
+class LRUCacheTests(unittest.TestCase):
+    """ Tests for pata.repository.LRUCache """
+
+    def test_evict(self):
+        """ Test the least recently used entry is removed when full. """
+        # Given
+        cache = LRUCache(2, 60)
+        cache.set("key1", 1)
+        cache.set("key2", 2)
+
+        # When
+        cache.get("key1")
+        cache.set("key3", 3)
+
+        # Then
+        self.assertEqual(list(cache.entries), ["key1", "key3"])
+        self.assertIs(cache.get("key2"), MISSING)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    @patch("pata.repository.monotonic")
+    def test_expire(self, time_mock):
+        """ Test entries expire after ttl seconds. """
+        # Given
+        cache = LRUCache(2, 60)
+        data = {10: 1, 69: 1, 70: MISSING}
+
+        time_mock.return_value = 10
+        cache.set("key1", 1)
+
+        # When/Then
+        for now, expected_result in data.items():
+            with self.subTest(now):
+                time_mock.return_value = now
+                self.assertIs(cache.get("key1"), expected_result)
+
+    def test_clear(self):
+        """ Test all entries are removed. """
+        # Given
+        cache = LRUCache(2, 60)
+        cache.set("key1", None)
+
+        # When
+        cache.clear()
+
+        # Then
+        self.assertIs(cache.get("key1"), MISSING)
+
+
+class UnitRepositoryTests(unittest.TestCase):
+    """ Tests for pata.repository.UnitRepository """
+
+    def setUp(self):
+        """ Database with some units, read through a repository. """
+        self.engine = create_engine("sqlite://")
+        BASE.metadata.create_all(self.engine)
+        self.migrator = MagicMock(
+            generation=0, session_class=sessionmaker(bind=self.engine))
+        session = self.migrator.session_class()
+        bulk_insert_units(session, [
+            load_to_values(create_unit_data(name))
+            for name in ("unit2", "unit1")])
+        session.commit()
+        session.close()
+        self.repository = UnitRepository(self.migrator)
+
+    def tearDown(self):
+        """ Close connections. """
+        self.engine.dispose()
+
+    def rename(self, name, new_name):
+        """ Rename a unit in the database (committed). """
+        session = self.migrator.session_class()
+        session.query(Units).filter_by(name=name).update({"name": new_name})
+        session.commit()
+        session.close()
+
+    def update(self, name, attack, days):
+        """ Add a version of a unit (committed). """
+        data = create_unit_data(name)
+        data["stats"]["attack"] = attack
+        data["change_history"] = {day: ["Change"] for day in days}
+        session = self.migrator.session_class()
+        process_transaction(session, load_to_values(data), update=True)
+        session.commit()
+        session.close()
+
+    def test_get_unit(self):
+        """ Test units (and missing units) are read once. """
+        # When
+        first = self.repository.get_unit("unit1")
+        missing = self.repository.get_unit("unit3")
+        self.rename("unit1", "unit3")
+
+        # Then
+        self.assertEqual(first.name, "unit1")
+        self.assertEqual(first.wiki_path, "/unit1")
+        self.assertEqual(first.versions, ())
+        self.assertIsNone(missing)
+        self.assertEqual(self.repository.get_unit("unit1"), first)
+        self.assertIsNone(self.repository.get_unit("unit3"))
+        self.assertEqual(
+            self.repository.stats(), {"hits": 2, "misses": 2, "size": 2})
+
+    def test_generation(self):
+        """ Test reads after a commit of the migrator aren't outdated. """
+        # Given
+        self.repository.get_unit("unit1")
+        self.rename("unit1", "unit3")
+
+        # When
+        self.migrator.generation += 1
+
+        # Then
+        self.assertIsNone(self.repository.get_unit("unit1"))
+        self.assertEqual(self.repository.get_unit("unit3").name, "unit3")
+
+    def test_commit_while_reading(self):
+        """ Test reads aren't cached when a commit happens meanwhile. """
+        # Given
+        def read(session):
+            """ Commit of another thread. """
+            self.migrator.generation += 1
+            return session
+
+        # When
+        self.repository.cached("key", read)
+
+        # Then
+        self.assertEqual(self.repository.cache.entries, {})
+
+    def test_get_latest_version(self):
+        """ Test latest version of a unit. """
+        # When
+        result = self.repository.get_latest_version("unit1")
+
+        # Then
+        self.assertEqual(result.gold, 13)
+        self.assertEqual(result.fingerprint, result.get_fingerprint())
+        self.assertIsNone(self.repository.get_latest_version("unit3"))
+
+    def test_get_changes(self):
+        """ Test change history of a unit. """
+        # When
+        result = self.repository.get_changes("unit1")
+
+        # Then
+        self.assertEqual(
+            result, (UnitChangeValue(date(2000, 1, 1), "Change 1"),))
+        self.assertEqual(self.repository.get_changes("unit3"), ())
+
+    def test_list_units(self):
+        """ Test all units (by name) with their latest version. """
+        # When
+        result = self.repository.list_units()
+
+        # Then
+        self.assertEqual([unit.name for unit in result], ["unit1", "unit2"])
+        self.assertEqual(
+            result[0].versions,
+            (self.repository.get_latest_version("unit1"),))
+        self.assertEqual(result[0].fingerprint, result[0].get_fingerprint())
+
+    def test_get_unit_as_of(self):
+        """ Test units with the version they had on a day. """
+        # Given
+        self.update("unit1", 2, ["2000-01-01", "2000-02-01"])
+        # Fixed later, without a new change.
+        self.update("unit1", 3, ["2000-01-01", "2000-02-01"])
+        data = {
+            ("unit1", date(1999, 12, 31)): None,
+            ("unit1", date(2000, 1, 1)): 1,
+            ("unit1", date(2000, 1, 31)): 1,
+            ("unit1", date(2000, 2, 1)): 2,
+            ("unit1", date(2010, 1, 1)): 2,
+            ("unit1", date.today()): 3,
+            ("unit2", date(2010, 1, 1)): 1,
+            ("unit3", date(2010, 1, 1)): None,
+            }
+
+        # When/Then
+        for (name, day), expected_result in data.items():
+            with self.subTest(name=name, day=day):
+                result = self.repository.get_unit_as_of(name, day)
+                self.assertEqual(
+                    result and (result.name, result.versions[0].attack),
+                    expected_result and (name, expected_result))
+        self.assertEqual(
+            [version.attack
+             for version in self.repository.get_versions("unit1")],
+            [1, 2, 3])
+        self.assertEqual(self.repository.stats()["misses"], 5)
+
+    def test_list_units_as_of(self):
+        """ Test all units with the version they had on a day. """
+        # Given
+        self.update("unit1", 2, ["2000-01-01", "2000-02-01"])
+        data = {
+            date(1999, 12, 31): [],
+            date(2000, 1, 31): [("unit1", 1), ("unit2", 1)],
+            date(2000, 2, 1): [("unit1", 2), ("unit2", 1)],
+            }
+
+        # When/Then
+        for day, expected_result in data.items():
+            with self.subTest(day):
+                result = self.repository.list_units_as_of(day)
+                self.assertEqual(
+                    [(unit.name, unit.versions[0].attack) for unit in result],
+                    expected_result)
+                self.assertEqual(
+                    [unit.versions[0] for unit in result],
+                    [self.repository.get_unit_as_of(unit.name, day).versions[0]
+                     for unit in result])
+
+    @patch("pata.repository.get_migrator")
+    def test_default_migrator(self, migrator_mock):
+        """ Test the migrator of the default database is used. """
+        # When
+        result = UnitRepository()
+
+        # Then
+        self.assertEqual(result.migrator, migrator_mock.return_value)
@@ -0,0 +1,215 @@
+""" Unit tests for pata.snapshot """
+import logging
+import sys
+import unittest
+
+from datetime import date
+from importlib.util import find_spec
+
+from mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from pata.instrumentation import StatementStats
+from pata.migrate_units import (
+    bulk_insert_units,
+    load_to_values,
+    process_transaction,
+    )
+from pata.models.units import BASE
+from pata.snapshot import (
+    FLAGS,
+    INT_COLUMNS,
+    load_snapshot,
+    UnitSnapshot,
+    )
+from pata.tests.test_unit_query_plans import create_unit_data
+
+
+logging.disable()
+
+
+def create_row(name, unit_spell="Unit", position="Top", **values):
+    """ Row of a unit for UnitSnapshot.from_rows. """
+    flags = {flag: values.pop(flag, False) for flag in FLAGS}
+    return (
+        name, *[values.get(column, 0) for column in INT_COLUMNS],
+        *flags.values(), unit_spell, position)
+
+
+def create_units(session):
+    """ Insert unit1 (with two versions) and unit2. """
+    bulk_insert_units(session, [
+        load_to_values(create_unit_data(name))
+        for name in ("unit2", "unit1")])
+    data = create_unit_data("unit1")
+    data["stats"]["attack"] = 5
+    data["change_history"]["2000-02-01"] = ["Change 2"]
+    process_transaction(session, load_to_values(data), update=True)
+    session.flush()
+
+
+class UnitSnapshotTests(unittest.TestCase):
+    """ Tests for pata.snapshot.UnitSnapshot """
+
+    def setUp(self):
+        """ Snapshot of some units. """
+        self.snapshot = UnitSnapshot.from_rows([
+            create_row("unit1", gold=10, attack=1, fragile=True),
+            create_row(
+                "unit2", gold=5, attack=2, fragile=True, prompt=True,
+                position=None),
+            create_row(
+                "unit3", unit_spell="Spell", gold=20, attack=0,
+                blocker=True),
+            ])
+
+    def test_from_rows(self):
+        """ Test columns are arrays, flags bitmasks and categories codes. """
+        # When
+        result = self.snapshot
+
+        # Then
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result.names, ("unit1", "unit2", "unit3"))
+        self.assertEqual(list(result.columns["gold"]), [10, 5, 20])
+        self.assertEqual(result.columns["gold"].typecode, "l")
+        self.assertEqual(list(result.flags), [2, 10, 4])
+        self.assertEqual(list(result.codes["unit_spell"]), [0, 0, 1])
+        self.assertEqual(result.categories["unit_spell"], ("Unit", "Spell"))
+        self.assertEqual(result.categories["position"], ("Top", None))
+        self.assertIs(
+            result.categories["unit_spell"][0], sys.intern("Unit"))
+
+    def test_empty(self):
+        """ Test snapshot without units. """
+        # When
+        result = UnitSnapshot.from_rows([])
+
+        # Then
+        self.assertEqual(len(result), 0)
+        self.assertEqual(list(result.columns["gold"]), [])
+        self.assertEqual(result.categories["unit_spell"], ())
+        self.assertIsNone(result.mean("gold"))
+
+    def test_column(self):
+        """ Test values of integer, flag and category columns. """
+        # Given
+        data = {
+            "attack": [1, 2, 0],
+            "fragile": [True, True, False],
+            "position": ["Top", None, "Top"],
+            }
+
+        # When/Then
+        for name, expected_result in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    list(self.snapshot.column(name)), expected_result)
+
+    def test_where(self):
+        """ Test masks of units with all the values. """
+        # Given
+        data = [
+            ({}, [True, True, True]),
+            ({"fragile": True}, [True, True, False]),
+            ({"fragile": True, "prompt": False}, [True, False, False]),
+            ({"unit_spell": "Spell"}, [False, False, True]),
+            ({"unit_spell": "Missing"}, [False, False, False]),
+            ({"position": None, "attack": 2}, [False, True, False]),
+            ({"fragile": True, "attack": 1}, [True, False, False]),
+            ]
+
+        # When/Then
+        for values, expected_result in data:
+            with self.subTest(values):
+                self.assertEqual(
+                    self.snapshot.where(**values), expected_result)
+
+    def test_select(self):
+        """ Test snapshot of the selected units. """
+        # When
+        result = self.snapshot.select(self.snapshot.where(fragile=True))
+
+        # Then
+        self.assertEqual(result.names, ("unit1", "unit2"))
+        self.assertEqual(list(result.columns["attack"]), [1, 2])
+        self.assertEqual(list(result.flags), [2, 10])
+        self.assertEqual(result.column("position"), ["Top", None])
+        self.assertIs(result.categories, self.snapshot.categories)
+
+    def test_aggregate(self):
+        """ Test sum, mean and sum by category. """
+        # When/Then
+        self.assertEqual(self.snapshot.total("gold"), 35)
+        self.assertEqual(self.snapshot.mean("attack"), 1)
+        self.assertEqual(
+            self.snapshot.totals_by("unit_spell", "gold"),
+            {"Unit": 15, "Spell": 20})
+
+    def test_to_numpy(self):
+        """ Test numpy is only needed (and imported) by to_numpy. """
+        # Given
+        with patch.dict(sys.modules, {"numpy": None}):
+
+            # When/Then
+            with self.assertRaises(ImportError):
+                self.snapshot.to_numpy()
+
+    @unittest.skipIf(find_spec("numpy") is None, "numpy not installed")
+    def test_to_numpy_arrays(self):
+        """ Test columns as numpy arrays. """
+        # When
+        result = self.snapshot.to_numpy()
+
+        # Then
+        self.assertEqual(result["gold"].tolist(), [10, 5, 20])
+        self.assertEqual(result["fragile"].tolist(), [True, True, False])
+        self.assertEqual(result["unit_spell"].tolist(), [0, 0, 1])
+        self.assertEqual(result["name"].tolist(), list(self.snapshot.names))
+
+
+class LoadSnapshotTests(unittest.TestCase):
+    """ Tests for pata.snapshot.load_snapshot """
+
+    def setUp(self):
+        """ Database with some units. """
+        self.engine = create_engine("sqlite://")
+        BASE.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        create_units(self.session)
+        self.stats = StatementStats(1000, 1000)
+        self.stats.attach(self.engine)
+
+    def tearDown(self):
+        """ Close connections. """
+        self.stats.detach(self.engine)
+        self.session.close()
+        self.engine.dispose()
+
+    def test_latest(self):
+        """ Test latest version of all units, in a single query. """
+        # When
+        result = load_snapshot(self.session)
+
+        # Then
+        self.assertEqual(result.names, ("unit1", "unit2"))
+        self.assertEqual(list(result.columns["attack"]), [5, 1])
+        self.assertEqual(result.column("fragile"), [True, True])
+        self.assertEqual(self.stats.summary()["statements"], 1)
+
+    def test_day(self):
+        """ Test versions of all units valid on a day. """
+        # Given
+        data = {
+            date(1999, 12, 31): [],
+            date(2000, 1, 31): [1, 1],
+            date(2000, 2, 1): [5, 1],
+            }
+
+        # When/Then
+        for day, expected_result in data.items():
+            with self.subTest(day):
+                result = load_snapshot(self.session, day)
+                self.assertEqual(
+                    list(result.columns["attack"]), expected_result)
@@ -0,0 +1,82 @@
+""" Unit tests for pata.timing """
+import unittest
+
+from mock import patch
+
+from pata.timing import PhaseTimer
+
+
+class PhaseTimerTests(unittest.TestCase):
+    """ Tests for pata.timing.PhaseTimer """
+
+    def setUp(self):
+        """ Global variables """
+        patcher = patch("pata.timing.perf_counter")
+        self.wall_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("pata.timing.process_time")
+        self.cpu_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.wall_mock.return_value = 0
+        self.cpu_mock.return_value = 0
+        self.timer = PhaseTimer()
+
+    def test_phase(self):
+        """ Test time and items of blocks are accumulated by phase. """
+        # Given
+        self.wall_mock.side_effect = [1, 3, 3, 4]
+        self.cpu_mock.side_effect = [0, 1, 1, 1.5]
+
+        # When
+        with self.timer.phase("load", 10):
+            pass
+        with self.timer.phase("load", 5):
+            pass
+
+        # Then
+        self.assertEqual(self.timer.phases, {"load": [3, 1.5, 15]})
+
+    def test_phase_error(self):
+        """ Test block is timed when an exception is raised. """
+        # Given
+        self.wall_mock.side_effect = [1, 2]
+        self.cpu_mock.side_effect = [1, 2]
+
+        # When
+        with self.assertRaises(ValueError):
+            with self.timer.phase("commit", 1):
+                raise ValueError()
+
+        # Then
+        self.assertEqual(self.timer.phases, {"commit": [1, 1, 1]})
+
+    def test_iterate(self):
+        """ Test production of every item is timed. """
+        # Given
+        self.wall_mock.side_effect = [0, 1, 1, 3, 3, 3.5]
+        self.cpu_mock.side_effect = [0, 1, 1, 2, 2, 2]
+
+        # When
+        result = list(self.timer.iterate("parse", ["unit1", "unit2"]))
+
+        # Then
+        self.assertEqual(result, ["unit1", "unit2"])
+        self.assertEqual(self.timer.phases, {"parse": [3.5, 2, 2]})
+
+    def test_summary(self):
+        """ Test totals by phase and since the timer was created. """
+        # Given
+        self.timer.add("load", 0.1234567, 0.1, 10)
+        self.wall_mock.return_value = 2
+        self.cpu_mock.return_value = 1
+        expected_result = {
+            "load": {"wall": 0.123457, "cpu": 0.1, "count": 10},
+            "total": {"wall": 2, "cpu": 1, "count": 0},
+            }
+
+        # When
+        result = self.timer.summary()
+
+        # Then
+        self.assertEqual(result, expected_result)
@@ -0,0 +1,197 @@
+""" Unit tests for pata.units_file """
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from datetime import date
+
+from pata.units_file import (
+    CHANGE_RECORD,
+    FORMAT_VERSION,
+    HEADER,
+    INT_FIELDS,
+    UNIT_RECORD,
+    UnitRecord,
+    UnitsFile,
+    write_units_file,
+    )
+from pata.tests.test_unit_cli import ROOT_DIR
+
+
+def create_record(name, changes=(), **values):
+    """ UnitRecord with all fields set. """
+    data = dict.fromkeys(INT_FIELDS, 0)
+    data.update(
+        name=name, wiki_path=f"/{name}", image_url=None, panel_url=None,
+        unit_spell="Unit", position="Top", abilities="ability X",
+        frontline=False, fragile=False, blocker=False, prompt=False,
+        valid_from=date(2000, 1, 1), changes=changes)
+    data.update(values)
+    return UnitRecord(**data)
+
+
+class UnitsFileTests(unittest.TestCase):
+    """
+    Tests for pata.units_file.write_units_file and
+    pata.units_file.UnitsFile
+    """
+
+    def setUp(self):
+        """ Units file with some units. """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "units.bin")
+        self.units = [
+            create_record(
+                "unit2", attack=2, fragile=True, prompt=True,
+                valid_from=None),
+            create_record(
+                "unit1", gold=13, attack=1, position=None,
+                changes=(
+                    (date(2000, 2, 1), "Change 2"),
+                    (date(2000, 1, 1), "Change 1"))),
+            create_record(
+                "unit3", unit_spell="Spell", abilities="ability Ñ",
+                changes=((date(2000, 3, 1), "Change 1"),)),
+            ]
+        self.header = write_units_file(self.path, self.units, created=10)
+        self.units_file = UnitsFile(self.path)
+
+    def tearDown(self):
+        """ Clean up files. """
+        self.units_file.close()
+        self.directory.cleanup()
+
+    def test_write(self):
+        """ Test header, records and (deduplicated) strings. """
+        # Given
+        strings = {
+            "unit1", "unit2", "unit3", "/unit1", "/unit2", "/unit3", "Unit",
+            "Spell", "Top", "ability X", "ability Ñ", "Change 1", "Change 2"}
+
+        # When
+        result = self.header
+
+        # Then
+        self.assertEqual(
+            result[:6],
+            (b"PATAUNIT", FORMAT_VERSION, UNIT_RECORD.size,
+             CHANGE_RECORD.size, 3, 3))
+        self.assertEqual(result.units_offset, HEADER.size)
+        self.assertEqual(
+            result.strings_size,
+            sum(len(string.encode("utf-8")) for string in strings))
+        self.assertEqual(
+            os.path.getsize(self.path),
+            result.strings_offset + result.strings_size)
+        self.assertEqual(result.created, 10)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_read(self):
+        """ Test units are read (by name) as written. """
+        # When
+        result = list(self.units_file)
+
+        # Then
+        self.assertEqual(len(self.units_file), 3)
+        self.assertEqual(self.units_file.header, self.header)
+        self.assertEqual(
+            result, sorted(self.units, key=lambda unit: unit.name))
+        self.assertEqual(self.units_file[2], self.units[2])
+        with self.assertRaises(IndexError):
+            self.units_file[3]  # pylint: disable=pointless-statement
+
+    def test_get(self):
+        """ Test units are found by name. """
+        # Given
+        data = {
+            "unit1": self.units[1],
+            "unit2": self.units[0],
+            "unit3": self.units[2],
+            "unit0": None,
+            "unit4": None,
+            "": None,
+            }
+
+        # When/Then
+        for name, expected_result in data.items():
+            with self.subTest(name):
+                self.assertEqual(self.units_file.get(name), expected_result)
+
+    def test_column(self):
+        """ Test integer fields of all units. """
+        # When
+        result = self.units_file.column("attack")
+
+        # Then
+        self.assertEqual(result, [1, 2, 0])
+
+    def test_to_snapshot(self):
+        """ Test columnar snapshot of all units. """
+        # When
+        result = self.units_file.to_snapshot()
+
+        # Then
+        self.assertEqual(result.names, ("unit1", "unit2", "unit3"))
+        self.assertEqual(list(result.columns["gold"]), [13, 0, 0])
+        self.assertEqual(result.where(fragile=True), [False, True, False])
+        self.assertEqual(result.column("position"), [None, "Top", "Top"])
+
+    def test_empty(self):
+        """ Test file without units. """
+        # Given
+        write_units_file(self.path, [])
+
+        # When
+        with UnitsFile(self.path) as units_file:
+
+            # Then
+            self.assertEqual(len(units_file), 0)
+            self.assertEqual(list(units_file), [])
+            self.assertIsNone(units_file.get("unit1"))
+        self.assertTrue(units_file.map.closed)
+
+    def test_invalid(self):
+        """ Test files that aren't (supported) units files. """
+        # Given
+        with open(self.path, "rb") as units_file:
+            content = units_file.read()
+        other_version = HEADER.pack(*self.header._replace(version=0))
+        data = {
+            "empty": b"",
+            "short": content[:10],
+            "magic": b"X" * len(content),
+            "version": other_version + content[HEADER.size:],
+            "truncated": content[:-1],
+            }
+
+        # When/Then
+        for name, data_content in data.items():
+            with self.subTest(name):
+                path = os.path.join(self.directory.name, name)
+                with open(path, "wb") as units_file:
+                    units_file.write(data_content)
+                with self.assertRaises(ValueError):
+                    UnitsFile(path)
+
+    def test_lazy(self):
+        """ Test SQLAlchemy and the models aren't imported by readers. """
+        # Given
+        code = (
+            "import sys\n"
+            "from pata.units_file import UnitsFile\n"
+            f"UnitsFile({self.path!r}).get('unit1')\n"
+            "print(' '.join(sys.modules))")
+
+        # When
+        process = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True,
+            text=True, check=True)
+
+        # Then
+        result = process.stdout.split()
+        self.assertIn("pata.units_file", result)
+        self.assertFalse([
+            module for module in result
+            if module.startswith(("sqlalchemy", "pata.models"))])
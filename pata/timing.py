@@ -0,0 +1,132 @@
+""" Wall/CPU time of the phases of a migration. """
+from contextlib import contextmanager
+from time import (
+    perf_counter,
+    process_time,
+    )
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    )
+
+
+class PhaseTimer():
+    """
+    Accumulated wall time, CPU time and items processed by phase name.
+
+    Phases can be timed many times (e.g. once per batch), the totals are
+    reported by summary, together with the time since the timer was created.
+
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, List[float]] = {}
+        self.start = (perf_counter(), process_time())
+
+    def add(self, name: str, wall: float, cpu: float, count: int = 0) -> None:
+        """
+        Add time and items to a phase.
+
+        Parameters
+        ----------
+        name : str
+            Phase name.
+        wall : float
+            Wall time (seconds).
+        cpu : float
+            CPU time of the process (seconds).
+        count : int, optional
+            Items processed. Defaults to 0.
+
+        """
+        totals = self.phases.setdefault(name, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += count
+
+    @contextmanager
+    def phase(self, name: str, count: int = 0) -> Iterator[None]:
+        """
+        Time the block as part of a phase.
+
+        Parameters
+        ----------
+        name : str
+            Phase name.
+        count : int, optional
+            Items processed by the block. Defaults to 0.
+
+        """
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            self.add(
+                name, perf_counter() - wall, process_time() - cpu, count)
+
+    def iterate(
+            self, name: str, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Time the production of every item as part of a phase.
+
+        Used for lazy sources (like pata.migrate_units.iter_version), where
+        the work happens while the items are consumed.
+
+        Parameters
+        ----------
+        name : str
+            Phase name.
+        items : iterable
+            Items to time.
+
+        Returns
+        -------
+        generator
+
+        """
+        iterator = iter(items)
+        while True:
+            wall, cpu = perf_counter(), process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, perf_counter() - wall, process_time() - cpu)
+                return
+            self.add(name, perf_counter() - wall, process_time() - cpu, 1)
+            yield item
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Totals by phase, plus the "total" since the timer was created.
+
+        Returns
+        -------
+        dict
+
+        Example
+        -------
+        output:
+            {
+                "parse": {"wall": 0.25, "cpu": 0.24, "count": 1000},
+                ...
+                "total": {"wall": 1.5, "cpu": 1.2, "count": 0},
+            }
+
+        """
+        result = {
+            name: {
+                "wall": round(wall, 6),
+                "cpu": round(cpu, 6),
+                "count": int(count),
+                }
+            for name, (wall, cpu, count) in self.phases.items()
+            }
+        result["total"] = {
+            "wall": round(perf_counter() - self.start[0], 6),
+            "cpu": round(process_time() - self.start[1], 6),
+            "count": 0,
+            }
+        return result
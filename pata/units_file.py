@@ -0,0 +1,419 @@
+"""
+Binary file with the units, their latest version and change history (see
+pata.export), read through mmap.
+
+Only the standard library is imported, so readers (e.g. analytics workers)
+start without SQLAlchemy nor the models. The file is mapped read only, so
+processes reading the same file share its pages through the OS cache, and
+nothing is parsed up front: records are unpacked when accessed.
+
+Layout (little-endian):
+
+    header    HEADER (magic, format version, record sizes, counts and
+              offsets of the sections)
+    units     UNIT_RECORD per unit (sorted by name)
+    changes   CHANGE_RECORD per change (grouped by unit, latest first)
+    strings   UTF-8 strings (each distinct string written once)
+
+Strings are referenced by offset and length in the string table (offset
+NULL for None) and dates by their ordinal (0 for None).
+
+"""
+import mmap
+import os
+import struct
+
+from datetime import date
+from time import time
+from types import TracebackType
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    )
+
+
+MAGIC = b"PATAUNIT"
+
+# Incremented whenever the layout changes (older files are rejected).
+FORMAT_VERSION = 1
+
+# Offset of missing (None) strings.
+NULL = 0xFFFFFFFF
+
+
+class Header(NamedTuple):
+    """ Header of a units file. """
+    magic: bytes
+    version: int
+    unit_size: int
+    change_size: int
+    units: int
+    changes: int
+    units_offset: int
+    changes_offset: int
+    strings_offset: int
+    strings_size: int
+    created: float
+
+
+class UnitRecord(NamedTuple):
+    """ Unit with its latest version and change history. """
+    name: str
+    wiki_path: Optional[str]
+    image_url: Optional[str]
+    panel_url: Optional[str]
+    unit_spell: Optional[str]
+    position: Optional[str]
+    abilities: Optional[str]
+    gold: int
+    green: int
+    blue: int
+    red: int
+    energy: int
+    attack: int
+    health: int
+    supply: int
+    stamina: int
+    lifespan: int
+    build_time: int
+    exhaust_turn: int
+    exhaust_ability: int
+    frontline: bool
+    fragile: bool
+    blocker: bool
+    prompt: bool
+    valid_from: Optional[date]
+    changes: Tuple[Tuple[date, str], ...]
+
+
+# Fields of UnitRecord by type.
+STRING_FIELDS = UnitRecord._fields[:7]
+INT_FIELDS = UnitRecord._fields[7:20]
+FLAG_FIELDS = UnitRecord._fields[20:24]
+
+# Bit of every FLAG_FIELDS in the flags of a unit (as pata.snapshot.FLAGS).
+FLAG_BITS = (1, 2, 4, 8)
+
+HEADER = struct.Struct("<8sHHHIIQQQQd")
+
+# String references, integers, flags (and padding), valid_from and the
+# index and amount of its changes.
+UNIT_RECORD = struct.Struct(
+    "<" + "II" * len(STRING_FIELDS) + "i" * len(INT_FIELDS) + "B3xiII")
+
+# Day and description reference.
+CHANGE_RECORD = struct.Struct("<iII")
+
+
+class StringTable():  # pylint: disable=too-few-public-methods
+    """ UTF-8 strings of a units file, each distinct string written once. """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.refs: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, value: Optional[str]) -> Tuple[int, int]:
+        """
+        Add a string (unless already added).
+
+        Parameters
+        ----------
+        value : str or None
+            String to add.
+
+        Returns
+        -------
+        tuple(int, int)
+            Offset and length (bytes) of the string, (NULL, 0) for None.
+
+        """
+        if value is None:
+            return (NULL, 0)
+        ref = self.refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            ref = self.refs[value] = (len(self.data), len(encoded))
+            self.data += encoded
+        return ref
+
+
+def to_ordinal(day: Optional[date]) -> int:
+    """ Ordinal of a date (0 for None). """
+    return 0 if day is None else day.toordinal()
+
+
+def from_ordinal(ordinal: int) -> Optional[date]:
+    """ Date of an ordinal (None for 0). """
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def write_units_file(  # pylint: disable=too-many-locals
+        path: str, units: Iterable[UnitRecord],
+        created: Optional[float] = None) -> Header:
+    """
+    Write units to a file (replacing the previous one atomically, so
+    readers never map a partial file).
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+    units : iterable(UnitRecord)
+        Units to write (sorted by name in the file).
+    created : float, optional
+        Time of the data. Defaults to now.
+
+    Returns
+    -------
+    Header
+
+    """
+    strings = StringTable()
+    unit_data = bytearray()
+    change_data = bytearray()
+    changes = 0
+    units = sorted(units, key=lambda unit: unit.name)
+    for unit in units:
+        refs = [
+            item
+            for field in STRING_FIELDS
+            for item in strings.add(getattr(unit, field))]
+        flags = sum(
+            bit for bit, field in zip(FLAG_BITS, FLAG_FIELDS)
+            if getattr(unit, field))
+        unit_data += UNIT_RECORD.pack(
+            *refs, *[getattr(unit, field) for field in INT_FIELDS],
+            flags, to_ordinal(unit.valid_from), changes, len(unit.changes))
+        for day, description in unit.changes:
+            change_data += CHANGE_RECORD.pack(
+                to_ordinal(day), *strings.add(description))
+        changes += len(unit.changes)
+
+    changes_offset = HEADER.size + len(unit_data)
+    header = Header(
+        MAGIC, FORMAT_VERSION, UNIT_RECORD.size, CHANGE_RECORD.size,
+        len(units), changes, HEADER.size, changes_offset,
+        changes_offset + len(change_data), len(strings.data),
+        time() if created is None else created)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as units_file:
+        units_file.write(HEADER.pack(*header))
+        units_file.write(unit_data)
+        units_file.write(change_data)
+        units_file.write(strings.data)
+    os.replace(temp_path, path)
+    return header
+
+
+class UnitsFile():
+    """
+    Read access to a units file (see write_units_file) mapped in memory.
+
+    Records are unpacked from the mapping when accessed (nothing is read
+    up front), units are looked up by name with a binary search.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+
+    Raises
+    ------
+    ValueError
+        When the file isn't a units file, or its format version isn't
+        supported.
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as units_file:
+            try:
+                self.map = mmap.mmap(
+                    units_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty file.
+                raise ValueError(f"Not a units file: {path}") from None
+        self.buffer = memoryview(self.map)
+        try:
+            self.header = read_header(self.buffer, path)
+        except ValueError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """ Unmap the file. """
+        self.buffer.release()
+        self.map.close()
+
+    def __enter__(self) -> "UnitsFile":
+        return self
+
+    def __exit__(
+            self, exc_type: Optional[Type[BaseException]],
+            exc_value: Optional[BaseException],
+            traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """ Amount of units. """
+        return self.header.units
+
+    def __iter__(self) -> Iterator[UnitRecord]:
+        """ All units (by name). """
+        for values in UNIT_RECORD.iter_unpack(self.buffer[
+                self.header.units_offset:self.header.changes_offset]):
+            yield self.to_record(values)
+
+    def get_string(self, offset: int, length: int) -> Optional[str]:
+        """ String of the string table (None for NULL). """
+        if offset == NULL:
+            return None
+        start = self.header.strings_offset + offset
+        return str(self.buffer[start:start + length], "utf-8")
+
+    def get_name(self, index: int) -> Optional[str]:
+        """ Name of the unit at index (only its name is unpacked). """
+        return self.get_string(*struct.unpack_from(
+            "<II", self.buffer,
+            self.header.units_offset + index * UNIT_RECORD.size))
+
+    def find(self, name: str) -> Optional[int]:
+        """
+        Find a unit by name (binary search, units are sorted by name).
+
+        Parameters
+        ----------
+        name : str
+            Unit name.
+
+        Returns
+        -------
+        int or None
+            Index of the unit, None when missing.
+
+        """
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            middle_name = self.get_name(middle) or ""
+            if middle_name < name:
+                low = middle + 1
+            elif middle_name > name:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def get(self, name: str) -> Optional[UnitRecord]:
+        """ Unit by name (None when missing). """
+        index = self.find(name)
+        return None if index is None else self[index]
+
+    def __getitem__(self, index: int) -> UnitRecord:
+        """ Unit at index (by name). """
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.to_record(UNIT_RECORD.unpack_from(
+            self.buffer,
+            self.header.units_offset + index * UNIT_RECORD.size))
+
+    def to_record(self, values: Tuple[Any, ...]) -> UnitRecord:
+        """ UnitRecord of the values of a UNIT_RECORD. """
+        size = len(STRING_FIELDS) * 2
+        ints = values[size:size + len(INT_FIELDS)]
+        flags, valid_from, first, count = values[size + len(INT_FIELDS):]
+        start = self.header.changes_offset + first * CHANGE_RECORD.size
+        changes = tuple(
+            (date.fromordinal(day), self.get_string(offset, length) or "")
+            for day, offset, length in CHANGE_RECORD.iter_unpack(
+                self.buffer[start:start + count * CHANGE_RECORD.size]))
+        return UnitRecord._make([
+            *[self.get_string(*values[index:index + 2])
+              for index in range(0, size, 2)],
+            *ints,
+            *[bool(flags & bit) for bit in FLAG_BITS],
+            from_ordinal(valid_from),
+            changes])
+
+    def column(self, name: str) -> List[int]:
+        """
+        Values of an integer field (INT_FIELDS) of all units, without
+        unpacking the rest of the records.
+
+        Parameters
+        ----------
+        name : str
+            Field name.
+
+        Returns
+        -------
+        list(int)
+
+        """
+        index = len(STRING_FIELDS) * 2 + INT_FIELDS.index(name)
+        return [
+            values[index] for values in UNIT_RECORD.iter_unpack(self.buffer[
+                self.header.units_offset:self.header.changes_offset])]
+
+    def to_snapshot(self) -> Any:
+        """
+        Columnar snapshot of all units (see pata.snapshot, which imports
+        SQLAlchemy, so it's only imported here).
+
+        Returns
+        -------
+        pata.snapshot.UnitSnapshot
+
+        """
+        # pylint: disable=import-outside-toplevel
+        from pata.snapshot import (
+            CATEGORY_COLUMNS,
+            FLAGS,
+            INT_COLUMNS,
+            UnitSnapshot,
+            )
+
+        return UnitSnapshot.from_rows(
+            (unit.name, *[getattr(unit, name) for name in INT_COLUMNS],
+             *[getattr(unit, name) for name in FLAGS],
+             *[getattr(unit, name) for name in CATEGORY_COLUMNS])
+            for unit in self)
+
+
+def read_header(buffer: Any, path: str) -> Header:
+    """
+    Read and validate the header of a units file.
+
+    Parameters
+    ----------
+    buffer : memoryview
+        Content of the file.
+    path : str
+        Path to the file (for errors).
+
+    Returns
+    -------
+    Header
+
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError(f"Not a units file: {path}")
+    header = Header(*HEADER.unpack_from(buffer))
+    if header.magic != MAGIC:
+        raise ValueError(f"Not a units file: {path}")
+    if (header.version != FORMAT_VERSION
+            or header.unit_size != UNIT_RECORD.size
+            or header.change_size != CHANGE_RECORD.size):
+        raise ValueError(
+            f"Unsupported units file version {header.version}: {path}")
+    if header.strings_offset + header.strings_size > len(buffer):
+        raise ValueError(f"Truncated units file: {path}")
+    return header
@@ -23,6 +23,12 @@ setuptools.setup(
         "Operating System :: OS Independent",
         ],
     python_requires=">=3.6",
+    entry_points={
+        "console_scripts": [
+            "pata-migrate-units=pata.cli:main",
+            "pata-export-units=pata.cli:export_main",
+            ],
+        },
     install_requires=["SQLAlchemy==1.3.8", "alembic==1.2.1"],
     extras_require={
         "dev": ["pycodestyle", "pylint", "mypy"],